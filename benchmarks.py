@@ -0,0 +1,293 @@
+"""
+Benchmarks dos caminhos críticos: treino/inferência do LVQ, preparação dos
+dados, busca do GLVQ e análise de estabilidade.
+
+Uso:
+    python benchmarks.py                          # 10k, 100k e 1M linhas
+    python benchmarks.py --sizes 10000 --repeat 5
+    python benchmarks.py --cases lvq_predict filter_range
+    python benchmarks.py --compare                # última execução x commit anterior
+
+Os dados são sintéticos, no formato do EEG Eye State (14 canais em torno
+de 4000-4700 µV, alvo binário, alguns outliers), gerados com semente fixa.
+Cada caso grava uma linha JSON em `benchmark_history.jsonl` com o commit,
+a máquina e as estatísticas de tempo, para comparar execuções entre commits.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import platform
+import argparse
+import statistics
+import subprocess
+import warnings
+import tempfile
+
+import numpy as np
+
+HISTORY_FILE = "benchmark_history.jsonl"
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+SEED = 51
+N_FEATURES = 14
+
+
+# --- Dados sintéticos ---
+def eeg_like(n_rows, seed=SEED, outlier_rate=0.001):
+    """(X, y) com o formato do EEG Eye State: 14 canais, alvo binário, poucos outliers."""
+    rng = np.random.default_rng(seed)
+    means = rng.uniform(4000, 4600, N_FEATURES)
+    shift = rng.normal(0, 8, N_FEATURES)
+    # Alvo em blocos (olhos abertos/fechados duram vários segundos)
+    y = (np.sin(np.arange(n_rows) / 500 + rng.uniform(0, np.pi)) + rng.normal(0, 0.5, n_rows) > -0.2).astype(np.int64)
+    X = means + rng.normal(0, 30, (n_rows, N_FEATURES)) + np.outer(y, shift)
+    outliers = rng.random(n_rows) < outlier_rate
+    X[outliers] += rng.choice([-1, 1], (outliers.sum(), 1)) * rng.uniform(2000, 300000, (outliers.sum(), 1))
+    return X, y
+
+def _scaled(n_rows):
+    X, y = eeg_like(n_rows)
+    X = (X - X.mean(axis=0)) / X.std(axis=0)
+    return X, y
+
+
+# --- Casos ---
+# Cada caso é (nome, params, max_rows, setup), onde setup(n_rows) retorna a
+# função medida; o setup (geração de dados, imports) fica fora do tempo.
+def _lvq_fit(metric, init, batch_size, epochs):
+    def setup(n_rows):
+        from utils.lvq import LVQClassifier
+        X, y = _scaled(n_rows)
+        model = LVQClassifier(n_codebooks=20, lrate=0.3, epochs=epochs, init_strategy=init,
+                              distance_metric=metric, batch_size=batch_size, random_state=SEED)
+        return lambda: model.fit(X, y)
+    return setup
+
+def _lvq_predict(metric, n_codebooks=30, algorithm='auto'):
+    def setup(n_rows):
+        from utils.lvq import LVQClassifier
+        X, y = _scaled(n_rows)
+        model = LVQClassifier(n_codebooks=n_codebooks, epochs=1, distance_metric=metric, batch_size=1024,
+                              algorithm=algorithm, random_state=SEED).fit(X[:10_000], y[:10_000])
+        return lambda: model.predict(X)
+    return setup
+
+def _filter_range(n_rows):
+    import pandas as pd
+    from utils import filter_range
+    X, y = eeg_like(n_rows)
+    X = pd.DataFrame(X, columns=[f"ch{i}" for i in range(N_FEATURES)])
+    y = pd.Series(y)
+    return lambda: filter_range(3000, 6000, X, y, verbose=False)
+
+def _scaler_prep(n_rows):
+    # Mesmos passos de `lvq.prepare` depois do filtro
+    from sklearn.model_selection import train_test_split #type:ignore
+    from sklearn.preprocessing import StandardScaler #type:ignore
+    X, y = eeg_like(n_rows)
+
+    def run():
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=SEED, stratify=y)
+        scaler = StandardScaler()
+        return scaler.fit_transform(X_train), scaler.transform(X_test)
+    return run
+
+def _glvq_grid_slice(native):
+    def setup(n_rows):
+        import lvq
+        from sklearn.model_selection import StratifiedKFold, cross_val_score #type:ignore
+        if native:
+            from utils.lvq import GLVQClassifier as GLVQ
+        else:
+            from sklvq.models import GLVQ #type:ignore
+        X, y = _scaled(n_rows)
+        grid = [
+            {'distance_type': 'squared-euclidean', 'activation_type': a, 'solver_type': 'lbfgs'}
+            for a in lvq.glvq_param_dist['activation_type']
+        ]
+        cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=SEED)
+        return lambda: [cross_val_score(GLVQ(random_state=SEED, **p), X, y, cv=cv, error_score='raise') for p in grid]
+    return setup
+
+def _stability(n_rows):
+    import lvq
+    import matplotlib #type:ignore
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt #type:ignore
+    from utils.lvq import LVQClassifier
+    from utils.eval_cache import EvaluationCache
+    X, y = _scaled(n_rows)
+    data = {'X_train': X, 'y_train': y}
+    param_list = [
+        {'n_codebooks': n, 'epochs': 2, 'batch_size': 1024, 'distance_metric': m}
+        for n in (10, 20) for m in ('euclidean', 'manhattan')
+    ]
+
+    def run():
+        # Cache vazio a cada repetição: mede a validação cruzada, não o cache
+        with tempfile.TemporaryDirectory() as cache_dir:
+            lvq._eval_cache = EvaluationCache(cache_dir)
+            lvq.cross_val_stability_analysis(LVQClassifier, param_list, data=data)
+        lvq._eval_cache = None
+        plt.close("all")
+    return run
+
+def all_cases():
+    cases = []
+    for metric in ('euclidean', 'manhattan', 'chebyshev'):
+        for init in ('random', 'stratified_mean'):
+            # LVQ1 online percorre amostra a amostra: limitado a 100k linhas
+            cases.append(("lvq_fit_online", {'metric': metric, 'init': init, 'epochs': 1}, 100_000,
+                          _lvq_fit(metric, init, None, 1)))
+            cases.append(("lvq_fit_minibatch", {'metric': metric, 'init': init, 'epochs': 5, 'batch_size': 1024},
+                          None, _lvq_fit(metric, init, 1024, 5)))
+        cases.append(("lvq_predict", {'metric': metric, 'n_codebooks': 30}, None, _lvq_predict(metric)))
+        # Muitos protótipos: índice espacial (auto) x varredura completa
+        for algorithm in ('brute', 'auto'):
+            cases.append(("lvq_predict", {'metric': metric, 'n_codebooks': 1000, 'algorithm': algorithm}, None,
+                          _lvq_predict(metric, 1000, algorithm)))
+    cases.append(("filter_range", {}, None, _filter_range))
+    cases.append(("scaler_prep", {}, None, _scaler_prep))
+    cases.append(("glvq_grid_slice", {'candidates': 4, 'folds': 3}, 10_000, _glvq_grid_slice(native=False)))
+    cases.append(("glvq_native_grid_slice", {'candidates': 4, 'folds': 3}, 100_000, _glvq_grid_slice(native=True)))
+    cases.append(("cross_val_stability_analysis", {'candidates': 4, 'folds': 5}, 100_000, _stability))
+    return cases
+
+
+# --- Medição e histórico ---
+def measure(fn, repeat=3, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'repeat': repeat,
+    }
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    return {
+        'commit': _git("rev-parse", "HEAD"),
+        'dirty': bool(_git("status", "--porcelain", "--untracked-files=no")),
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+        },
+    }
+
+def case_id(name, params):
+    return name + "".join(f"[{k}={v}]" for k, v in sorted(params.items()))
+
+def run(sizes=DEFAULT_SIZES, repeat=3, only=None, history=HISTORY_FILE):
+    env = environment()
+    run_id = uuid.uuid4().hex[:12]
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+    results = []
+    for n_rows in sizes:
+        for name, params, max_rows, setup in all_cases():
+            if only and name not in only:
+                continue
+            record = {'run_id': run_id, 'timestamp': timestamp, **env,
+                      'case': case_id(name, params), 'n_rows': n_rows, 'seed': SEED}
+            if max_rows is not None and n_rows > max_rows:
+                record['skipped'] = f"n_rows > {max_rows}"
+            else:
+                try:
+                    record['stats'] = measure(setup(n_rows), repeat)
+                except Exception as e:
+                    # Dependência opcional ausente/incompatível: registra e segue
+                    record['skipped'] = f"{type(e).__name__}: {e}"
+            results.append(record)
+            _print_record(record)
+            with open(history, "a") as f:
+                f.write(json.dumps(record) + "\n")
+    return results
+
+def _print_record(record):
+    label = f"{record['case']} n={record['n_rows']}"
+    if 'stats' in record:
+        stats = record['stats']
+        print(f"{label:<95} {stats['median']:>9.4f}s  (min {stats['min']:.4f}s, ±{stats['stdev']:.4f})")
+    else:
+        print(f"{label:<95} skipped: {record['skipped']}")
+
+def load_history(history=HISTORY_FILE):
+    if not os.path.exists(history):
+        return []
+    with open(history) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def compare(history=HISTORY_FILE, baseline=None):
+    """
+    Compara a última execução com a última execução de `baseline` (um
+    commit; por padrão o commit anterior presente no histórico).
+
+    Imprime, por caso e tamanho, a razão entre as medianas (< 1 = mais rápido).
+    """
+    records = [r for r in load_history(history) if 'stats' in r]
+    if not records:
+        print("Empty benchmark history.")
+        return {}
+    latest_run = records[-1]['run_id']
+    current = {(r['case'], r['n_rows']): r for r in records if r['run_id'] == latest_run}
+    commit = records[-1]['commit']
+    if baseline is None:
+        older = [r for r in records if r['commit'] != commit]
+        if not older:
+            print("No run from another commit to compare against.")
+            return {}
+        baseline = older[-1]['commit']
+    base_records = [r for r in records if r['commit'] and r['commit'].startswith(baseline)]
+    if not base_records:
+        print(f"No runs found for commit {baseline}.")
+        return {}
+    base_run = base_records[-1]['run_id']
+    base = {(r['case'], r['n_rows']): r for r in base_records if r['run_id'] == base_run}
+
+    ratios = {}
+    print(f"{'case':<95} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for key, record in current.items():
+        if key not in base:
+            continue
+        old, new = base[key]['stats']['median'], record['stats']['median']
+        ratios[key] = new / old
+        print(f"{key[0] + ' n=' + str(key[1]):<95} {old:>9.4f}s {new:>9.4f}s {ratios[key]:>6.2f}x")
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmarks.py', description="Hot-path benchmarks on synthetic EEG-shaped data.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="dataset sizes (rows)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed repetitions per case (after 1 warmup)")
+    parser.add_argument('--cases', nargs='+', help="only run these case names")
+    parser.add_argument('--history', default=HISTORY_FILE, help="JSON lines history file")
+    parser.add_argument('--compare', nargs='?', const='', metavar='COMMIT',
+                        help="compare the latest run with COMMIT (default: previous commit in history) and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare is not None:
+        compare(args.history, args.compare or None)
+        return
+    warnings.filterwarnings('ignore')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    run(args.sizes, args.repeat, args.cases, args.history)
+
+
+if __name__ == '__main__':
+    main()
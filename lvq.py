@@ -1,375 +1,264 @@
-from ucimlrepo import fetch_ucirepo
-import numpy as np
-from tqdm.auto import tqdm
-from sklearn.model_selection import train_test_split, RandomizedSearchCV, StratifiedKFold, cross_val_score
-from sklearn.preprocessing import StandardScaler
-import warnings
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score
-)
+"""
+Pipeline do GLVQ: preparação dos dados, busca de hiperparâmetros, análise
+de estabilidade e avaliação final.
+
+Uso:
+    python lvq.py prepare      # baixa/filtra/padroniza e grava os arrays
+    python lvq.py search       # successive halving sobre a grade do GLVQ
+    python lvq.py stability    # escolhe o candidato mais estável
+    python lvq.py evaluate     # curva de aprendizado e métricas finais
+    python lvq.py all          # todas as etapas em sequência
+    python lvq.py all --native # GLVQ de utils.lvq em vez do sklvq
+
+Importar este módulo não executa nada. Bibliotecas pesadas (sklearn,
+matplotlib, seaborn, sklvq, pandas) só são importadas pela etapa que as
+usa; `--profile-startup` mostra o tempo de cada import e de cada etapa.
+`--profile PREFIXO` grava tempo de parede, CPU e pico de memória por etapa,
+candidato e fold em PREFIXO.json, PREFIXO.csv e PREFIXO.trace.json (trace
+do Chrome; ver `utils.profiling`).
+"""
+import os
+import sys
+import json
 import time
 import random
-import json
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import confusion_matrix, roc_curve, auc
-import collections
-import numpy as np
-from sklearn.model_selection import ParameterGrid
-from sklearn.model_selection import cross_val_score, StratifiedKFold
-from tqdm.auto import tqdm
+import argparse
+import warnings
+import importlib
+from contextlib import contextmanager
+
+_START = time.perf_counter()
 import numpy as np
+_NUMPY_IMPORT = time.perf_counter() - _START
+from utils import profiling
 
 RANDOM_STATE = 51
-random.seed(RANDOM_STATE)
+PREPARED_DIR = os.path.join("datasets", "eeg-prepared")
+GLVQ_NAME = 'glvq'
+GLVQ_NATIVE_NAME = 'glvq-native'
 
-warnings.filterwarnings('ignore')
+glvq_param_dist = {
+    'distance_type': ['squared-euclidean', 'euclidean'],
+    'activation_type': ['identity', 'sigmoid', 'soft+', 'swish'],
+    'solver_type': ['sgd', 'wgd', 'adam', 'lbfgs', 'bfgs'],
+}
 
-def filter_range(min_value, max_value, X, y):
-    """
-    Filtra o dataset removendo linhas que possuem valores fora do range especificado
-    
-    Parâmetros:
-    - min_value: valor mínimo aceitável
-    - max_value: valor máximo aceitável  
-    - X: DataFrame com as features
-    - y: DataFrame/Series com o target
-    
-    Retorna:
-    - X_filtrado: DataFrame X sem as linhas problemáticas
-    - y_filtrado: DataFrame/Series y sem as linhas problemáticas
-    """
-    
-    # Identificar linhas com valores fora do range
-    linhas_problematicas = set()
-    
-    for feature in X.columns:
-        mask_fora_range = (X[feature] < min_value) | (X[feature] > max_value)
-        indices_fora_range = X[mask_fora_range].index.tolist()
-        linhas_problematicas.update(indices_fora_range)
-    
-    linhas_problematicas = sorted(list(linhas_problematicas))
-    
-    # Remover linhas problemáticas
-    X_filtrado = X.drop(index=linhas_problematicas)
-    y_filtrado = y.drop(index=linhas_problematicas)
-    
-    # Calcular percentual de redução
-    percentual_original = len(X)
-    percentual_filtrado = len(X_filtrado)
-    percentual_removido = len(linhas_problematicas)
-    percentual_reducao = (percentual_removido / percentual_original) * 100
-    
-    print(f"📊 RESULTADO DA FILTRAGEM (Range: {min_value} - {max_value})")
-    print(f"Dataset original: {percentual_original} observações")
-    print(f"Dataset filtrado: {percentual_filtrado} observações")
-    print(f"Linhas removidas: {percentual_removido} ({percentual_reducao:.2f}%)")
-    print(f"Linhas mantidas: {100 - percentual_reducao:.2f}%")
-    
-    return X_filtrado, y_filtrado
-
-eeg_eye_state = fetch_ucirepo(id=264)
-
-X = eeg_eye_state.data.features
-y = eeg_eye_state.data.targets
-
-X, y = filter_range(3000, 6000, X, y)
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y)
-
-scaler = StandardScaler()
-X_train = scaler.fit_transform(X_train)
-X_test = scaler.transform(X_test)
-
-
-
-def plot_distribuicao_classes(distribuicao_classes):
-    plt.figure(figsize=(12, 5))
-
-    plt.subplot(1, 2, 1)
-    distribuicao_classes.plot(kind='bar', color=['skyblue', 'lightcoral'])
-    plt.title('Distribuição das Classes (Contagem)', fontsize=14, fontweight='bold')
-    plt.xlabel('Classe')
-    plt.ylabel('Número de Instâncias')
-    plt.xticks([0, 1], ['Olhos Fechados (0)', 'Olhos Abertos (1)'], rotation=0)
-
-    plt.subplot(1, 2, 2)
-    plt.pie(distribuicao_classes.values, labels=['Olhos Fechados (0)', 'Olhos Abertos (1)'], 
-            autopct='%1.1f%%', colors=['skyblue', 'lightcoral'])
-    plt.title('Distribuição das Classes (Percentual)', fontsize=14, fontweight='bold')
-
-    plt.tight_layout()
-    plt.show()
-
-def plotar_comparacao_feature(nome_feature, X, y, X_filtrado, y_filtrado):
+# Mesma grade para o `utils.lvq.GLVQClassifier` (--native), que não tem 'wgd'
+glvq_native_param_dist = {
+    **glvq_param_dist,
+    'solver_type': ['sgd', 'adam', 'lbfgs', 'bfgs'],
+}
+
+# Successive halving: todas as combinações são avaliadas primeiro em uma
+# fração do treino, com um único holdout, e só as melhores seguem para a
+# validação cruzada completa (40 + 20 x 5 = 140 ajustes na grade do sklvq).
+# GLVQ_BUDGETS define as frações de cada rodada (a última deve ser 1.0).
+# Cada fold roda em um processo isolado; um candidato que passa de GLVQ_TIMEOUT
+# segundos de parede em uma rodada (do início do seu primeiro fold) é
+# encerrado, e combinações que já falharam em execuções anteriores são puladas.
+GLVQ_BUDGETS = (0.25, 1.0)
+GLVQ_TIMEOUT = 600
+
+
+# --- Imports sob demanda e tempos de inicialização ---
+TIMINGS = [("import numpy", _NUMPY_IMPORT)]
+
+@contextmanager
+def timed(label, cat='stage'):
+    # Também vira um evento do profiler, se estiver ligado
+    start = time.perf_counter()
+    try:
+        with profiling.span(label, cat=cat):
+            yield
+    finally:
+        TIMINGS.append((label, time.perf_counter() - start))
+
+def _import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    with timed(f"import {name}", cat='import'):
+        return importlib.import_module(name)
+
+def _plots():
+    return _import('utils.plots')
+
+_eval_cache = None
+
+def eval_cache():
+    global _eval_cache
+    if _eval_cache is None:
+        _eval_cache = _import('utils.eval_cache').EvaluationCache()
+    return _eval_cache
+
+def _cv(random_state=RANDOM_STATE):
+    StratifiedKFold = _import('sklearn.model_selection').StratifiedKFold
+    return StratifiedKFold(n_splits=5, shuffle=True, random_state=random_state)
+
+def print_timings():
+    # Imports aparecem na ordem em que aconteceram, dentro da etapa que os pediu
+    print("\n--- Startup profile ---")
+    for label, seconds in TIMINGS:
+        print(f"{label:<40} {seconds:>9.3f}s")
+    print(f"{'total (since lvq.py import)':<40} {time.perf_counter() - _START:>9.3f}s")
+
+
+# --- Dados ---
+def prepare(output_dir=PREPARED_DIR, refresh=False):
     """
-    Cria um plot com 4 subgráficos comparando a feature antes e depois da filtragem
-    
-    Parâmetros:
-    - nome_feature: nome da feature a ser analisada
-    - X: DataFrame original
-    - y: target original
-    - X_filtrado: DataFrame filtrado
-    - y_filtrado: target filtrado
+    Carrega o dataset, filtra o range, separa treino/teste e padroniza.
+
+    Os arrays resultantes são gravados em `output_dir` como .npy, lidos
+    pelas demais etapas com `load_prepared`.
     """
-    
-    # Extrair dados da feature
-    dados_original = X[nome_feature]
-    dados_filtrado = X_filtrado[nome_feature]
-    
-    # Criar figura com 2x2 subplots
-    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-    fig.suptitle(f'Comparação: {nome_feature} - Original vs Filtrado', fontsize=16, fontweight='bold')
-    
-    # 1. Boxplot Original (superior esquerdo)
-    bp1 = axes[0,0].boxplot(dados_original, patch_artist=True, widths=0.6)
-    bp1['boxes'][0].set_facecolor('lightcoral')
-    axes[0,0].set_title('Boxplot - Dataset Original', fontsize=14, fontweight='bold')
-    axes[0,0].set_ylabel('Valor')
-    axes[0,0].grid(True, alpha=0.3)
-    
-    # Adicionar estatísticas no boxplot original
-    stats_orig = f'N: {len(dados_original)}\nMédia: {dados_original.mean():.1f}\nDP: {dados_original.std():.1f}\nMin: {dados_original.min():.1f}\nMax: {dados_original.max():.1f}'
-    axes[0,0].text(0.02, 0.98, stats_orig, transform=axes[0,0].transAxes, 
-                   verticalalignment='top', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-    
-    # 2. Distribuição Original (superior direito)
-    axes[0,1].hist(dados_original, bins=50, alpha=0.7, color='lightcoral', edgecolor='black')
-    axes[0,1].set_title('Distribuição - Dataset Original', fontsize=14, fontweight='bold')
-    axes[0,1].set_xlabel('Valor')
-    axes[0,1].set_ylabel('Frequência')
-    axes[0,1].grid(True, alpha=0.3)
-    
-    # 3. Boxplot Filtrado (inferior esquerdo)
-    bp2 = axes[1,0].boxplot(dados_filtrado, patch_artist=True, widths=0.6)
-    bp2['boxes'][0].set_facecolor('lightblue')
-    axes[1,0].set_title('Boxplot - Dataset Filtrado', fontsize=14, fontweight='bold')
-    axes[1,0].set_ylabel('Valor')
-    axes[1,0].grid(True, alpha=0.3)
-    
-    # Adicionar estatísticas no boxplot filtrado
-    stats_filt = f'N: {len(dados_filtrado)}\nMédia: {dados_filtrado.mean():.1f}\nDP: {dados_filtrado.std():.1f}\nMin: {dados_filtrado.min():.1f}\nMax: {dados_filtrado.max():.1f}'
-    axes[1,0].text(0.02, 0.98, stats_filt, transform=axes[1,0].transAxes, 
-                   verticalalignment='top', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-    
-    # 4. Distribuição Filtrada (inferior direito)
-    axes[1,1].hist(dados_filtrado, bins=50, alpha=0.7, color='lightblue', edgecolor='black')
-    axes[1,1].set_title('Distribuição - Dataset Filtrado', fontsize=14, fontweight='bold')
-    axes[1,1].set_xlabel('Valor')
-    axes[1,1].set_ylabel('Frequência')
-    axes[1,1].grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.show()
-    
-    # Imprimir resumo comparativo
-    print(f"\n📈 RESUMO COMPARATIVO - {nome_feature}")
-    print(f"{'='*50}")
-    print(f"{'Métrica':<20} {'Original':<12} {'Filtrado':<12} {'Melhoria':<10}")
-    print(f"{'='*50}")
-    print(f"{'Observações':<20} {len(dados_original):<12} {len(dados_filtrado):<12} {'-':<10}")
-    print(f"{'Média':<20} {dados_original.mean():<12.2f} {dados_filtrado.mean():<12.2f} {abs(dados_original.mean() - dados_filtrado.mean()):<10.2f}")
-    print(f"{'Desvio Padrão':<20} {dados_original.std():<12.2f} {dados_filtrado.std():<12.2f} {dados_original.std() - dados_filtrado.std():<10.2f}")
-    print(f"{'Mínimo':<20} {dados_original.min():<12.2f} {dados_filtrado.min():<12.2f} {'-':<10}")
-    print(f"{'Máximo':<20} {dados_original.max():<12.2f} {dados_filtrado.max():<12.2f} {'-':<10}")
-    
-    # Calcular melhoria percentual no desvio padrão
-    melhoria_dp = ((dados_original.std() - dados_filtrado.std()) / dados_original.std()) * 100
-    print(f"{'Melhoria DP (%)':<20} {'-':<12} {'-':<12} {melhoria_dp:<10.1f}")
-
-def plot_param_frequencies(best_params):
-    # Conta quantas vezes cada valor apareceu para cada parâmetro
-    param_counts = collections.defaultdict(collections.Counter)
-    
-    for d in best_params:
-        for k, v in d.items():
-            param_counts[k][v] += 1
-
-    # Plota individualmente para cada parâmetro, variando as cores
-    for param, counter in param_counts.items():
-        items = sorted(counter.items(), key=lambda x: -x[1])
-        labels, values = zip(*items)
-        colors = sns.color_palette("Set2", len(labels))
-        plt.figure(figsize=(6, 4))
-        plt.bar([str(l) for l in labels], values, color=colors)
-        plt.title(f'Frequência dos valores de {param}')
-        plt.ylabel('Frequência')
-        plt.xlabel(param)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.show()
-
-def plot_stability_vs_metric(stds, means, stable_idxs, unstable_idxs, metric):
-    plt.figure(figsize=(8, 5))
-    plt.scatter([stds[i] for i in stable_idxs], [means[i] for i in stable_idxs], c='g', label='Mais estáveis')
-    plt.scatter([stds[i] for i in unstable_idxs], [means[i] for i in unstable_idxs], c='r', label='Menos estáveis')
-    plt.xlabel('Desvio padrão da métrica (estabilidade)')
-    plt.ylabel(f'Média da métrica ({metric})')
-    plt.title('Estabilidade x Média da Métrica (Separado)')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
-
-def plot_metric_per_fold(scores, metric):
-    plt.figure(figsize=(7, 4))
-    plt.plot(range(1, 6), scores, marker='o')
-    plt.title(f'{metric} em cada fold para o modelo mais estável')
-    plt.xlabel('Fold')
-    plt.ylabel(metric)
-    plt.ylim(0, 1)
-    plt.grid(True)
-    plt.show()
-
-def plot_metric_evolution(percents, train_scores, test_scores, metric):
-    
-    plt.figure(figsize=(8, 5))
-    plt.plot(percents * 100, train_scores, label='Treino', color='b', linestyle='-')
-    plt.plot(percents * 100, test_scores, label='Teste', color='r', linestyle='--')
-    plt.xlabel('% do conjunto de treino utilizado')
-    plt.ylabel(f'{metric.capitalize()}')
-    plt.title(f'Evolução da {metric.capitalize()} no treino e teste')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
-
-def plot_confusion_matrix(y_test, y_pred_test, model_name):
-    cm = confusion_matrix(y_test, y_pred_test)
-    plt.figure(figsize=(5, 4))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-    plt.title(f"Matriz de Confusão (Conjunto de Teste) - Modelo {model_name}")
-    plt.xlabel('Predito')
-    plt.ylabel('Real')
-    plt.show()
-
-def plot_roc_curve(model, X_test, y_test, model_name):
-    if hasattr(model, "predict_proba"):
-        y_score = model.predict_proba(X_test)[:, 1]
-    else:
-        y_score = model.decision_function(X_test)
-    fpr, tpr, _ = roc_curve(y_test, y_score)
-    auc_score = auc(fpr, tpr)
-    plt.figure(figsize=(6, 5))
-    plt.plot(fpr, tpr, label=f'AUC = {auc_score:.3f}')
-    plt.plot([0, 1], [0, 1], 'k--')
-    plt.xlabel('FPR')
-    plt.ylabel('TPR')
-    plt.title(f'Curva ROC (Conjunto de Teste) - Modelo {model_name}')
-    plt.legend()
-    plt.grid(True)
-    plt.show()
-    return auc_score
-
-def plot_roc_curve_evolution(model, X_test, y_test, model_name):
-    if hasattr(model, "predict_proba"):
-        y_score = model.predict_proba(X_test)[:, 1]
-    else:
-        y_score = model.decision_function(X_test)
-    
-    y_true = y_test.values if hasattr(y_test, 'values') else y_test
-    
-    n_positives = np.sum(y_true == 1)
-    n_negatives = np.sum(y_true == 0)
-    
-    tp_cumsum = np.cumsum(y_true == 1)
-    fp_cumsum = np.cumsum(y_true == 0)
-    
-    tpr_evolution = tp_cumsum / n_positives
-    fpr_evolution = fp_cumsum / n_negatives
-    
-    tpr_evolution = np.concatenate([[0], tpr_evolution])
-    fpr_evolution = np.concatenate([[0], fpr_evolution])
-    
-    plt.figure(figsize=(8, 6))
-    
-    colors = plt.cm.plasma(np.linspace(0, 1, len(tpr_evolution)))
-    
-    for i in range(1, len(tpr_evolution)):
-        plt.plot([fpr_evolution[i-1], fpr_evolution[i]], 
-                [tpr_evolution[i-1], tpr_evolution[i]], 
-                color=colors[i], alpha=0.8, linewidth=1.5)
-    
-    step = max(1, len(fpr_evolution)//30)  # Mostrar ~30 pontos
-    scatter = plt.scatter(fpr_evolution[::step], 
-                         tpr_evolution[::step], 
-                         c=range(0, len(fpr_evolution), step), 
-                         cmap='plasma', s=40, alpha=0.9, 
-                         edgecolors='black', linewidth=0.5)
-    
-    plt.plot([0, 1], [0, 1], 'k--', alpha=0.6, label='Linha de referência')
-    plt.xlabel('Taxa de Falsos Positivos (FPR)')
-    plt.ylabel('Taxa de Verdadeiros Positivos (TPR)')
-    plt.title(f'Evolução Temporal da Curva ROC - {model_name}')
-    plt.grid(True, alpha=0.3)
-    
-    cbar = plt.colorbar(scatter)
-    cbar.set_label('Ordem Temporal das Amostras', rotation=270, labelpad=20)
-    
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-    
-def plot_main_metrics(metrics_dict, model_name):
-    labels = [
-        "Acurácia (Treino)", "Acurácia (Teste)",
-        "F1 (Treino)", "F1 (Teste)",
-        "Precisão (Treino)", "Precisão (Teste)",
-        "Recall (Treino)", "Recall (Teste)"
-    ]
-    metrics = [
-        metrics_dict["accuracy_train"], metrics_dict["accuracy_test"],
-        metrics_dict["f1_train"], metrics_dict["f1_test"],
-        metrics_dict["precision_train"], metrics_dict["precision_test"],
-        metrics_dict["recall_train"], metrics_dict["recall_test"]
-    ]
-    colors = sns.color_palette("Paired", 8)
-    plt.figure(figsize=(8, 4))
-    bars = plt.bar(range(len(metrics)), metrics, color=colors)
-    plt.xticks(range(len(metrics)), labels, rotation=25, ha='right')
-    plt.title(f'Métricas principais - Modelo {model_name}')
-    y_min = max(min(metrics) - 0.1, 0)  # considera o menor valor de todas as métricas
-    plt.ylim(y_min, 1)
-    plt.tight_layout(pad=1)
-    plt.show()
-
-def search_hyperparameters(estimator, params, estm_name, metric='accuracy', n_iter=20, qnt_params=20):
-    # checkpoint = load_checkpoint(estm_name)
-    checkpoint = {}
+    from utils import filter_range
+    load_dataset = _import('utils.dataset').load_dataset
+    train_test_split = _import('sklearn.model_selection').train_test_split
+    StandardScaler = _import('sklearn.preprocessing').StandardScaler
+
+    with profiling.span('load_dataset', cat='data'):
+        X, y = load_dataset(264, refresh=refresh)
+    with profiling.span('filter_range', cat='data'):
+        X, y = filter_range(3000, 6000, X, y)
+
+    with profiling.span('train_test_split', cat='data'):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y)
+
+    with profiling.span('standard_scaler', cat='data'):
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X_train)
+        X_test = scaler.transform(X_test)
+
+    data = {
+        'X_train': X_train,
+        'X_test': X_test,
+        'y_train': y_train.to_numpy().ravel(),
+        'y_test': y_test.to_numpy().ravel(),
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    for name, array in data.items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), array)
+    return data
+
+def load_prepared(output_dir=PREPARED_DIR):
+    """Arrays gravados por `prepare` (memory-mapped); roda `prepare` se faltarem."""
+    names = ('X_train', 'X_test', 'y_train', 'y_test')
+    paths = {name: os.path.join(output_dir, f"{name}.npy") for name in names}
+    if not all(os.path.exists(p) for p in paths.values()):
+        return prepare(output_dir)
+    with profiling.span('load_prepared', cat='data'):
+        return {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+
+
+# --- Busca de hiperparâmetros ---
+def search_hyperparameters(estimator, params, estm_name, metric='accuracy', n_iter=20, qnt_params=20, data=None):
+    checkpoint_mod = _import('utils.checkpoint')
+    checkpointed_search = _import('utils.search').checkpointed_search
+    shared = _import('utils.shared')
+    tqdm = _import('tqdm.auto').tqdm
+    data = data if data is not None else load_prepared()
+
+    checkpoint = checkpoint_mod.load_checkpoint(estm_name)
     best_params = checkpoint.get('best_params', [])
     total_time = checkpoint.get('total_time', 0)
-    
-    for i in tqdm(range(len(best_params),qnt_params), desc="Searching Hyperparameters"):
-        start_time = time.time()
-        
-        randomized_search = RandomizedSearchCV(
-            estimator,
-            param_distributions=params,
-            n_iter=n_iter,
-            scoring=metric,
-            cv=StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE + i),
-            random_state=RANDOM_STATE + i,
-            n_jobs=-1
-        )
-        randomized_search.fit(X_train, y_train)
-        
-        total_time += time.time() - start_time
-        best_params.append(randomized_search.best_params_)
-        # save_checkpoint(estm_name, {'best_params': best_params, 'total_time': total_time})
-    
-    plot_param_frequencies(best_params)
+
+    # Cada (candidato, fold) é gravado assim que termina: uma busca interrompida
+    # retoma exatamente do ponto em que parou
+    trial_log = checkpoint_mod.TrialLog(estm_name)
+
+    # Mesmos folds em todas as buscas (só o sorteio dos candidatos muda):
+    # um candidato sorteado de novo tem a mesma chave no cache de avaliação
+    cv = _cv()
+
+    # X e y publicados uma vez para todas as buscas, não a cada chamada
+    with shared.shared_arrays(shared.as_array(data['X_train']), shared.as_array(data['y_train']).ravel()) as (X_train, y_train):
+        for i in tqdm(range(len(best_params),qnt_params), desc="Searching Hyperparameters"):
+            start_time = time.time()
+
+            search_best_params, _, _ = checkpointed_search(
+                estimator,
+                params,
+                X_train,
+                y_train,
+                cv=cv,
+                trial_log=trial_log,
+                search_id=i,
+                n_iter=n_iter,
+                scoring=metric,
+                random_state=RANDOM_STATE + i,
+                n_jobs=-1,
+                eval_cache=eval_cache()
+            )
+
+            total_time += time.time() - start_time
+            best_params.append(search_best_params)
+            checkpoint_mod.save_checkpoint(estm_name, {'best_params': best_params, 'total_time': total_time})
+
+    _plots().plot_param_frequencies(best_params)
     print(f"Time taken for hyperparameter search: {total_time:.2f} seconds")
+    print(f"Evaluation cache: {eval_cache().stats()}")
     return best_params
 
 
-def cross_val_stability_analysis(estimator_class, param_list, metric='accuracy'):
-    means = []
-    stds = []
-    all_scores = []
-    for params in tqdm(param_list, desc="Cross-Validation for Params"):
-        model = estimator_class(**params)
-        scores = cross_val_score(model, X_train, y_train.values.ravel(), cv=StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE), scoring=metric)
-        means.append(np.mean(scores))
-        stds.append(np.std(scores))
-        all_scores.append(scores)
+def search_hyperparameters_tpe(estimator, params, estm_name, metric='accuracy', n_iter=100, qnt_params=20, data=None):
+    # Alternativa a `search_hyperparameters`: uma única busca TPE com `n_iter`
+    # candidatos no total (em vez de `qnt_params` buscas aleatórias de
+    # `n_iter`), usando os scores anteriores para propor os próximos.
+    # Retorna os `qnt_params` melhores candidatos, no mesmo formato de lista
+    tpe = _import('utils.tpe')
+    TrialLog = _import('utils.checkpoint').TrialLog
+    data = data if data is not None else load_prepared()
+
+    start_time = time.time()
+    candidates, scores = tpe.tpe_search(
+        estimator,
+        params,
+        data['X_train'],
+        data['y_train'],
+        cv=_cv(),
+        trial_log=TrialLog(estm_name),
+        search_id='tpe',
+        n_iter=n_iter,
+        scoring=metric,
+        random_state=RANDOM_STATE,
+        n_jobs=-1,
+        eval_cache=eval_cache()
+    )
+    best_params = tpe.top_candidates(candidates, scores, qnt_params)
+    total_time = time.time() - start_time
+
+    _plots().plot_param_frequencies(best_params)
+    print(f"Time taken for hyperparameter search: {total_time:.2f} seconds ({scores.size} fits)")
+    print(f"Evaluation cache: {eval_cache().stats()}")
+    return best_params
+
+
+def cross_val_stability_analysis(estimator_class, param_list, metric='accuracy', estm_name=None, data=None,
+                                 base_estimator=None):
+    # `base_estimator`: o mesmo estimador base da busca (ex. com random_state),
+    # para que os folds recalculados sejam os mesmos ajustes dos reaproveitados
+    # e tenham a mesma chave no cache de avaliação
+    search = _import('utils.search')
+    clone = _import('sklearn.base').clone
+    TrialLog = _import('utils.checkpoint').TrialLog
+    plots = _plots()
+    data = data if data is not None else load_prepared()
+
+    # Scores por fold já gravados na busca (TrialLog de `estm_name`) são
+    # reaproveitados; só os pares (candidato, fold) que faltam são avaliados
+    results = search.results_table(TrialLog(estm_name).load()) if estm_name else None
+    base_estimator = base_estimator if base_estimator is not None else estimator_class()
+    all_scores = search.stability_scores(
+        [clone(base_estimator).set_params(**params) for params in param_list],
+        param_list,
+        data['X_train'],
+        data['y_train'],
+        cv=_cv(),
+        scoring=metric,
+        results=results,
+        eval_cache=eval_cache()
+    )
+    means = list(all_scores.mean(axis=1))
+    stds = list(all_scores.std(axis=1))
 
     # Separar modelos mais estáveis (menor desvio padrão)
     stability_threshold = np.percentile(stds, 25)
@@ -377,7 +266,7 @@ def cross_val_stability_analysis(estimator_class, param_list, metric='accuracy')
     unstable_idxs = [i for i, s in enumerate(stds) if s > stability_threshold]
 
     # Plot separando estáveis e instáveis
-    plot_stability_vs_metric(stds, means, stable_idxs, unstable_idxs, metric)
+    plots.plot_stability_vs_metric(stds, means, stable_idxs, unstable_idxs, metric)
 
     # Selecionar o modelo mais estável com maior média da métrica
     best_idx = max(stable_idxs, key=lambda i: means[i]) if stable_idxs else np.argmax(means)
@@ -385,123 +274,215 @@ def cross_val_stability_analysis(estimator_class, param_list, metric='accuracy')
     best_scores = all_scores[best_idx]
 
     # Plot da métrica em cada fold para o melhor modelo
-    plot_metric_per_fold(best_scores, metric)
+    plots.plot_metric_per_fold(best_scores, metric)
 
     return best_params
 
-def evaluate_and_plot(params, model_class, metric='accuracy', model_name=None):
-    
-    model = model_class(**params, random_state=RANDOM_STATE) if 'random_state' in model_class().get_params() else model_class(**params)
-    train_scores, test_scores = [], []
-    percents = np.arange(0.2, 1.01, 0.05)
-    scorer = {
-        'accuracy': accuracy_score,
-        'f1': f1_score,
-        'precision': precision_score,
-        'recall': recall_score
-    }[metric]
-    for p in percents:
-        n = int(p * len(X_train))
-        model.fit(X_train[:n], y_train[:n])
-        y_pred_train = model.predict(X_train[:n])
-        y_pred_test = model.predict(X_test)
-        train_scores.append(scorer(y_train[:n], y_pred_train))
-        test_scores.append(scorer(y_test, y_pred_test))
-        
-    
-    plot_metric_evolution(percents, train_scores, test_scores, metric)
+def evaluate_and_plot(params, model_class, metric='accuracy', model_name=None, incremental=False, n_jobs=-1, data=None):
+    lc = _import('utils.learning_curve')
+    plots = _plots()
+    data = data if data is not None else load_prepared()
+    X_train, X_test, y_train, y_test = data['X_train'], data['X_test'], data['y_train'], data['y_test']
 
-    # Treinamento completo
     model = model_class(**params, random_state=RANDOM_STATE) if 'random_state' in model_class().get_params() else model_class(**params)
-    model.fit(X_train, y_train)
-    
-    y_pred_train = model.predict(X_train)
-    y_pred_test = model.predict(X_test)
+    percents = np.linspace(0.2, 1.0, 17)  # 20%, 25%, ..., 100%
+    # Sem incremental cada fração é retreinada do zero (em paralelo); com
+    # incremental=True o modelo é estendido via partial_fit/warm_start
+    with profiling.span('learning_curve', cat='evaluate', fractions=len(percents)):
+        curve = lc.learning_curve(
+            model, X_train, y_train, X_test, y_test, percents,
+            strategy='auto' if incremental else 'parallel', n_jobs=n_jobs
+        )
+    train_scores = [m[metric] for m in curve['train_metrics']]
+    test_scores = [m[metric] for m in curve['test_metrics']]
+
+    plots.plot_metric_evolution(percents, train_scores, test_scores, metric)
+
+    # Treinamento completo: reaproveita o ajuste da fração de 100% quando ele
+    # é um ajuste normal (com partial_fit cada amostra viu uma época só)
+    if curve['full_fit']:
+        model = curve['model']
+        train_metrics, test_metrics = curve['train_metrics'][-1], curve['test_metrics'][-1]
+        y_pred_test = model.predict(X_test)
+    else:
+        with profiling.span('final_fit', cat='evaluate'):
+            model.fit(X_train, y_train)
+        y_pred_test = model.predict(X_test)
+        train_metrics = lc.binary_metrics(y_train, model.predict(X_train))
+        test_metrics = lc.binary_metrics(y_test, y_pred_test)
 
-    plot_confusion_matrix(y_test, y_pred_test, model_class.__name__)
+    plots.plot_confusion_matrix(y_test, y_pred_test, model_class.__name__)
 
-    auc_score = plot_roc_curve(model, X_test, y_test, model_class.__name__)
+    auc_score = plots.plot_roc_curve(model, X_test, y_test, model_class.__name__)
 
     metrics_dict = {
-        "accuracy_train": accuracy_score(y_train, y_pred_train),
-        "accuracy_test": accuracy_score(y_test, y_pred_test),
-        "f1_train": f1_score(y_train, y_pred_train),
-        "f1_test": f1_score(y_test, y_pred_test),
-        "precision_train": precision_score(y_train, y_pred_train),
-        "precision_test": precision_score(y_test, y_pred_test),
-        "recall_train": recall_score(y_train, y_pred_train),
-        "recall_test": recall_score(y_test, y_pred_test),
+        "accuracy_train": train_metrics['accuracy'],
+        "accuracy_test": test_metrics['accuracy'],
+        "f1_train": train_metrics['f1'],
+        "f1_test": test_metrics['f1'],
+        "precision_train": train_metrics['precision'],
+        "precision_test": test_metrics['precision'],
+        "recall_train": train_metrics['recall'],
+        "recall_test": test_metrics['recall'],
         "auc": auc_score
     }
-    
+
     if model_name is None:
         model_name = model_class.__name__
-    
-    plot_main_metrics(metrics_dict, model_name)
-
-    return metrics_dict
-
-from sklvq.models import GLVQ
-
-glvq_param_dist = {
-    'distance_type': ['squared-euclidean', 'euclidean'],
-    'activation_type': ['identity', 'sigmoid', 'soft+', 'swish'],
-    'solver_type': ['sgd', 'wgd', 'adam', 'lbfgs', 'bfgs'],
-}
-
-# Display the created dictionary
-
 
+    plots.plot_main_metrics(metrics_dict, model_name)
 
-param_grid = ParameterGrid(glvq_param_dist)
-successful_params_with_scores = []
-failed_params = []
-
-print(f"Total number of parameter combinations to test: {len(param_grid)}")
-
-for i, params in enumerate(tqdm(param_grid, desc="Testing parameter combinations")):
-    try:
-        # Instantiate the GLVQ model with the current parameters
-        model = GLVQ(**params, random_state=RANDOM_STATE)
-
-        # Perform cross-validation to get a performance metric
-        # Using StratifiedKFold with 5 splits as in other functions
-        # Using accuracy as the scoring metric
-        scores = cross_val_score(model, X_train, y_train.values.ravel(), cv=StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE), scoring='accuracy', error_score='raise')
-        mean_score = np.mean(scores)
-
-        successful_params_with_scores.append((params, mean_score))
-
-    except  Exception as e:
-        #print(f"\nCombination {i+1}/{len(param_grid)} failed with error: {e}")
-        failed_params.append((params, str(e)))
-        # Continue to the next iteration even if an error occurs
-
-print("\n--- Summary ---")
-print(f"Successful parameter combinations: {len(successful_params_with_scores)}")
-print(f"Failed parameter combinations: {len(failed_params)}")
+    return metrics_dict
 
-# Sort the successful parameter combinations by their mean score in descending order
-successful_params_with_scores.sort(key=lambda x: x[1], reverse=True)
 
-# Select the top 20 parameter combinations
-top_20_params = [params for params, score in successful_params_with_scores[:20]]
+# --- Etapas do GLVQ ---
+def _glvq(native=False):
+    # (classe, nome do checkpoint, grade): sklvq ou a implementação de utils.lvq
+    if native:
+        return _import('utils.lvq').GLVQClassifier, GLVQ_NATIVE_NAME, glvq_native_param_dist
+    return _import('sklvq.models').GLVQ, GLVQ_NAME, glvq_param_dist
+
+def run_search(data=None, budgets=GLVQ_BUDGETS, timeout=GLVQ_TIMEOUT, top_n=20, native=False):
+    """Successive halving sobre a grade do GLVQ; grava os `top_n` melhores no checkpoint 'glvq' (ou 'glvq-native')."""
+    GLVQ, name, param_dist = _glvq(native)
+    search = _import('utils.search')
+    checkpoint_mod = _import('utils.checkpoint')
+    ParameterGrid = _import('sklearn.model_selection').ParameterGrid
+    data = data if data is not None else load_prepared()
+
+    print(f"Total number of parameter combinations to test: {len(ParameterGrid(param_dist))}")
+
+    start_time = time.time()
+    successful_params_with_scores, failed_params = search.successive_halving(
+        GLVQ(random_state=RANDOM_STATE),
+        param_dist,
+        data['X_train'],
+        data['y_train'],
+        cv=_cv(),
+        budgets=budgets,
+        keep=0.5,
+        min_keep=20,
+        scoring='accuracy',
+        random_state=RANDOM_STATE,
+        eval_cache=eval_cache(),
+        timeout=timeout,
+        incompatible=checkpoint_mod.IncompatibleParams(name),
+        trial_log=checkpoint_mod.TrialLog(name)
+    )
+
+    print("\n--- Summary ---")
+    print(f"Successful parameter combinations: {len(successful_params_with_scores)}")
+    print(f"Failed parameter combinations: {len(failed_params)}")
+
+    # Sort the successful parameter combinations by their mean score in descending order
+    successful_params_with_scores.sort(key=lambda x: x[1], reverse=True)
+
+    # Select the top 20 parameter combinations
+    top_params = [params for params, score in successful_params_with_scores[:top_n]]
+
+    print(f"\nTop {top_n} parameter combinations based on mean cross-validation accuracy:")
+    for i, params in enumerate(top_params):
+        print(f"{i+1}: {params}")
+
+    checkpoint_mod.save_checkpoint(name, {'best_params': top_params, 'total_time': time.time() - start_time})
+    _plots().plot_param_frequencies(top_params)
+    return top_params
+
+def run_stability(data=None, native=False):
+    """Análise de estabilidade dos candidatos gravados por `run_search`."""
+    GLVQ, name, _ = _glvq(native)
+    checkpoint_mod = _import('utils.checkpoint')
+
+    top_params = checkpoint_mod.load_checkpoint(name)['best_params']
+    if not top_params:
+        raise SystemExit("No GLVQ search results found; run `python lvq.py search` first.")
+
+    best_params = cross_val_stability_analysis(
+        GLVQ, top_params, metric='accuracy', estm_name=name, data=data,
+        base_estimator=GLVQ(random_state=RANDOM_STATE)  # como em `run_search`
+    )
+    checkpoint_mod.save_checkpoint(f"{name}-best", {'best_params': [best_params], 'total_time': 0})
+
+    print("\nBest parameters after stability analysis:")
+    print(best_params)
+    return best_params
 
-print("\nTop 20 parameter combinations based on mean cross-validation accuracy:")
-for i, params in enumerate(top_20_params):
-    print(f"{i+1}: {params}")
+def run_evaluate(data=None, params=None, output='metrics_lvq.json', native=False):
+    """Avaliação final do GLVQ com `params` (ou o resultado de `run_stability`)."""
+    GLVQ, name, _ = _glvq(native)
+    checkpoint_mod = _import('utils.checkpoint')
 
-plot_param_frequencies(top_20_params)
+    if params is None:
+        best = checkpoint_mod.load_checkpoint(f"{name}-best")['best_params']
+        if not best:
+            raise SystemExit("No GLVQ stability result found; run `python lvq.py stability` first.")
+        params = best[0]
 
-best_params = cross_val_stability_analysis(GLVQ, top_20_params, metric='accuracy')
+    metrics_dict = evaluate_and_plot(params, GLVQ, metric='accuracy', model_name='GLVQ', data=data)
+    print("\nMetrics after final evaluation:")
 
-print("\nBest parameters after stability analysis:")
-print(best_params)
+    with open(output, 'w') as f:
+        json.dump(metrics_dict, f, indent=4)
 
-metrics_dict = evaluate_and_plot(best_params, GLVQ, metric='accuracy', model_name='GLVQ')
-print("\nMetrics after final evaluation:")
+    print(json.dumps(metrics_dict, indent=4))
+    return metrics_dict
 
-with open('metrics_lvq.json', 'w') as f:
-    json.dump(metrics_dict, f, indent=4)
 
-print(json.dumps(metrics_dict, indent=4))
\ No newline at end of file
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='lvq.py', description="GLVQ pipeline on the EEG Eye State dataset.")
+    parser.add_argument('command', choices=['prepare', 'search', 'stability', 'evaluate', 'all'])
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print import and stage timings at the end")
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help="record per-stage/candidate/fold wall, CPU and peak memory to PREFIX.{json,csv,trace.json}")
+    parser.add_argument('--profile-no-memory', action='store_true',
+                        help="with --profile: skip tracemalloc (lower overhead, no peak memory)")
+    parser.add_argument('--figures', metavar='DIR',
+                        help="render figures to PNG files in DIR in the background instead of plt.show()")
+    parser.add_argument('--refresh', action='store_true', help="prepare: download the dataset again")
+    parser.add_argument('--timeout', type=float, default=GLVQ_TIMEOUT, help="search: per-candidate wall-clock timeout in seconds (all folds of a round)")
+    parser.add_argument('--params', type=json.loads, help="evaluate: GLVQ parameters as a JSON object")
+    parser.add_argument('--output', default='metrics_lvq.json', help="evaluate: metrics output file")
+    parser.add_argument('--native', action='store_true',
+                        help="use utils.lvq.GLVQClassifier instead of sklvq (checkpoints under 'glvq-native')")
+    args = parser.parse_args(argv)
+
+    random.seed(RANDOM_STATE)
+    warnings.filterwarnings('ignore')
+
+    stages = ['prepare', 'search', 'stability', 'evaluate'] if args.command == 'all' else [args.command]
+    if args.profile:
+        profiling.enable(memory=not args.profile_no_memory)
+    renderer = None
+    if args.figures:
+        renderer = _plots().FigureRenderer(args.figures)
+        _plots().set_renderer(renderer)
+    try:
+        data = None
+        for stage in stages:
+            with timed(f"stage {stage}"):
+                if stage == 'prepare':
+                    data = prepare(refresh=args.refresh)
+                elif stage == 'search':
+                    run_search(data, timeout=args.timeout, native=args.native)
+                elif stage == 'stability':
+                    run_stability(data, native=args.native)
+                else:
+                    run_evaluate(data, args.params, args.output, native=args.native)
+    finally:
+        if renderer is not None:
+            # Espera as figuras que ainda estão na fila
+            _plots().set_renderer(None)
+            with timed("render figures"):
+                paths = renderer.close()
+            print(f"{len(paths)} figures written to {args.figures}")
+        if args.profile_startup:
+            print_timings()
+        profiler = profiling.disable()
+        if profiler is not None:
+            print(f"Profile written to {', '.join(profiler.export(args.profile))}")
+
+
+if __name__ == '__main__':
+    main()
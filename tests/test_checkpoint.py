@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from sklearn.model_selection import StratifiedKFold #type:ignore
+from sklearn.neighbors import KNeighborsClassifier #type:ignore
+
+from utils.checkpoint import TrialLog
+from utils.search import checkpointed_search
+
+
+PARAMS = {'n_neighbors': [1, 3, 5, 7, 9, 11, 13]}
+
+class InterruptingKNN(KNeighborsClassifier):
+    # Conta os ajustes e simula um Ctrl+C no ajuste de número `interrupt_at`
+    fits = 0
+    interrupt_at = None
+
+    def fit(self, X, y):
+        InterruptingKNN.fits += 1
+        if InterruptingKNN.fits == InterruptingKNN.interrupt_at:
+            raise KeyboardInterrupt
+        return super().fit(X, y)
+
+def _data(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    y = (X[:, 0] + rng.normal(0, 0.5, n) > 0).astype(int)
+    return X, y
+
+def _search(trial_log, search_id=0):
+    X, y = _data()
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=0)
+    return checkpointed_search(InterruptingKNN(), PARAMS, X, y, cv, trial_log, search_id=search_id,
+                               n_iter=4, random_state=0, n_jobs=1)
+
+def _reset(interrupt_at=None):
+    InterruptingKNN.fits = 0
+    InterruptingKNN.interrupt_at = interrupt_at
+
+def test_interrupted_search_resumes_without_refitting(tmp_path):
+    _reset()
+    best, scores, candidates = _search(TrialLog('full', str(tmp_path)))
+
+    log = TrialLog('resumed', str(tmp_path))
+    _reset(interrupt_at=6)
+    with pytest.raises(KeyboardInterrupt):
+        _search(log)
+    assert len(log.load(search=0)) == 5
+
+    _reset()
+    resumed_best, resumed_scores, resumed_candidates = _search(log)
+    assert InterruptingKNN.fits == 4 * 3 - 5
+    assert resumed_candidates == candidates and resumed_best == best
+    assert np.array_equal(resumed_scores, scores)
+
+def test_finished_search_is_not_refitted(tmp_path):
+    log = TrialLog('knn', str(tmp_path))
+    _reset()
+    _search(log)
+    _reset()
+    _search(log)
+    assert InterruptingKNN.fits == 0
+    # Outra busca (search_id) não reaproveita o log
+    _search(log, search_id=1)
+    assert InterruptingKNN.fits == 4 * 3
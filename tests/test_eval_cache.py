@@ -0,0 +1,68 @@
+import os
+import numpy as np
+from sklearn.model_selection import StratifiedKFold #type:ignore
+from sklearn.neighbors import KNeighborsClassifier #type:ignore
+from sklearn.tree import DecisionTreeClassifier #type:ignore
+
+from utils.checkpoint import TrialLog
+from utils.eval_cache import EvaluationCache
+from utils.search import checkpointed_search, evaluate_folds, params_key
+
+
+def _data(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    y = (X[:, 0] + rng.normal(0, 0.5, n) > 0).astype(int)
+    return X, y
+
+def test_repeated_candidate_in_later_search_is_a_cache_hit(tmp_path):
+    X, y = _data()
+    cache = EvaluationCache(str(tmp_path / "cache"))
+    trial_log = TrialLog("knn", str(tmp_path))
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=51)
+    params = {'n_neighbors': [1, 3, 5, 7, 9, 11]}
+
+    _, _, first = checkpointed_search(KNeighborsClassifier(), params, X, y, cv, trial_log, search_id=0,
+                                      n_iter=3, random_state=51, n_jobs=1, eval_cache=cache)
+    hits_before = cache.hits
+    _, _, second = checkpointed_search(KNeighborsClassifier(), params, X, y, cv, trial_log, search_id=1,
+                                       n_iter=3, random_state=52, n_jobs=1, eval_cache=cache)
+
+    repeated = {params_key(p) for p in first} & {params_key(p) for p in second}
+    assert repeated, "the two seeds should sample at least one common candidate"
+    # Cada fold de cada candidato repetido vem do cache, sem novo ajuste
+    assert cache.hits - hits_before == len(repeated) * cv.get_n_splits()
+
+def test_different_splitter_is_a_cache_miss(tmp_path):
+    X, y = _data()
+    cache = EvaluationCache(str(tmp_path / "cache"))
+    estimator = KNeighborsClassifier()
+    fingerprint = "data"
+    fold_a = next(StratifiedKFold(n_splits=3, shuffle=True, random_state=1).split(X, y))
+    fold_b = next(StratifiedKFold(n_splits=3, shuffle=True, random_state=2).split(X, y))
+    assert cache.key(estimator, fingerprint, *fold_a, 'accuracy') != cache.key(estimator, fingerprint, *fold_b, 'accuracy')
+    same = next(StratifiedKFold(n_splits=3, shuffle=True, random_state=1).split(X, y))
+    assert cache.key(estimator, fingerprint, *fold_a, 'accuracy') == cache.key(
+        KNeighborsClassifier(), fingerprint, *same, 'accuracy'
+    )
+
+def test_unseeded_splitter_is_a_cache_miss(tmp_path):
+    # Mesmo repr, folds diferentes a cada chamada: nada pode vir do cache
+    X, y = _data()
+    cache = EvaluationCache(str(tmp_path / "cache"))
+    tasks = [(KNeighborsClassifier(), fold) for fold in range(3)]
+    for _ in range(2):
+        cv = StratifiedKFold(n_splits=3, shuffle=True)
+        evaluate_folds(tasks, X, y, cv, eval_cache=cache, n_jobs=1)
+    assert cache.hits == 0
+
+def test_unseeded_estimator_is_not_cached(tmp_path):
+    X, y = _data()
+    cache = EvaluationCache(str(tmp_path / "cache"))
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=0)
+    evaluate_folds([(DecisionTreeClassifier(), 0)], X, y, cv, eval_cache=cache, n_jobs=1)
+    evaluate_folds([(DecisionTreeClassifier(), 0)], X, y, cv, eval_cache=cache, n_jobs=1)
+    assert cache.hits == 0 and not os.listdir(cache.directory)
+    evaluate_folds([(DecisionTreeClassifier(random_state=0), 0)], X, y, cv, eval_cache=cache, n_jobs=1)
+    evaluate_folds([(DecisionTreeClassifier(random_state=0), 0)], X, y, cv, eval_cache=cache, n_jobs=1)
+    assert cache.hits == 1
@@ -0,0 +1,30 @@
+import time
+
+from utils.executor import run_isolated
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+def test_timeout_is_per_group_wall_clock():
+    # Cada chamada cabe no timeout sozinha, mas o grupo 0 (três chamadas em
+    # sequência) passa dele; o grupo 1 começa depois e tem o próprio relógio
+    calls = [(_sleep, (0.4,))] * 3 + [(_sleep, (0.1,))]
+    groups = [0, 0, 0, 1]
+    status = {i: s for i, s, _ in run_isolated(calls, n_jobs=1, timeout=1.0, groups=groups)}
+    assert [status[i] for i in range(3)] == ['ok', 'ok', 'timeout']
+    assert status[3] == 'ok'
+
+def test_group_timeout_stops_running_siblings():
+    calls = [(_sleep, (5,))] * 2 + [(_sleep, (0.1,))]
+    start = time.monotonic()
+    status = {i: s for i, s, _ in run_isolated(calls, n_jobs=3, timeout=0.5, groups=[0, 0, 1])}
+    assert time.monotonic() - start < 3
+    assert sorted([status[0], status[1]]) == ['cancelled', 'timeout']
+    assert status[2] == 'ok'
+
+def test_timeout_without_groups_is_per_call():
+    calls = [(_sleep, (0.4,))] * 3
+    status = [s for _, s, _ in run_isolated(calls, n_jobs=1, timeout=1.0)]
+    assert status == ['ok', 'ok', 'ok']
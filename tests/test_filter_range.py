@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from utils import FilterReport, filter_range
+
+
+def _data():
+    X = pd.DataFrame({'a': [3500, 2000, 4000, 7000], 'b': [3100, 3200, 5900, 4000]})
+    y = pd.Series([0, 1, 0, 1])
+    return X, y
+
+def test_return_report_without_printing(capsys):
+    X, y = _data()
+    X_kept, y_kept, report = filter_range(3000, 6000, X, y, verbose=False, return_report=True)
+    assert capsys.readouterr().out == ''
+    assert isinstance(report, FilterReport)
+    assert (report.n_original, report.n_kept, report.n_removed) == (4, 2, 2)
+    assert len(X_kept) == len(y_kept) == 2
+
+def test_mask_comes_before_report():
+    X, y = _data()
+    _, _, mask, report = filter_range(3000, 6000, X, y, verbose=False, return_mask=True, return_report=True)
+    assert np.array_equal(mask, [True, False, True, False])
+    assert report.n_kept == mask.sum()
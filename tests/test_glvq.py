@@ -0,0 +1,49 @@
+import pickle
+
+import joblib
+import numpy as np
+import pytest
+from scipy.optimize import check_grad #type:ignore
+from sklearn.utils.estimator_checks import check_estimators_pickle #type:ignore
+
+from utils.lvq import GLVQClassifier, GMLVQClassifier, glvq_cost_gradient
+
+
+def _data(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 5))
+    y = (X[:, 0] - X[:, 1] + rng.normal(0, 0.3, n) > 0).astype(int)
+    return X, y
+
+@pytest.mark.parametrize("estimator", [
+    GLVQClassifier(activation_type='swish', beta=2.0, random_state=0),
+    GMLVQClassifier(activation_type='sigmoid', random_state=0),
+])
+def test_fitted_estimator_pickles(estimator, tmp_path):
+    X, y = _data()
+    estimator.fit(X, y)
+    for restored in (pickle.loads(pickle.dumps(estimator)),
+                     joblib.load(joblib.dump(estimator, tmp_path / "model.joblib")[0])):
+        np.testing.assert_array_equal(restored.predict(X), estimator.predict(X))
+        np.testing.assert_array_equal(restored.predict_proba(X), estimator.predict_proba(X))
+
+@pytest.mark.parametrize("estimator", [GLVQClassifier(), GMLVQClassifier()])
+def test_sklearn_pickle_check(estimator):
+    check_estimators_pickle(type(estimator).__name__, estimator)
+
+@pytest.mark.parametrize("activation", ['identity', 'sigmoid', 'soft+', 'swish'])
+@pytest.mark.parametrize("squared", [True, False])
+def test_gradient_matches_finite_differences(activation, squared):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(50, 4))
+    labels = rng.integers(0, 3, 50)
+    prototype_labels = np.array([0, 0, 1, 1, 2, 2])
+    W = rng.normal(size=(6, 4))
+    omega = rng.normal(size=(3, 4))
+
+    def cost(w, o):
+        return glvq_cost_gradient(w.reshape(W.shape), o, X, labels, prototype_labels, squared, activation, 2.0)
+
+    assert check_grad(lambda w: cost(w, None)[0], lambda w: cost(w, None)[1].ravel(), W.ravel()) < 1e-6
+    assert check_grad(lambda o: cost(W.ravel(), o.reshape(omega.shape))[0],
+                      lambda o: cost(W.ravel(), o.reshape(omega.shape))[2].ravel(), omega.ravel()) < 1e-6
@@ -0,0 +1,27 @@
+import numpy as np
+from sklearn.model_selection import StratifiedKFold #type:ignore
+from sklearn.neighbors import KNeighborsClassifier #type:ignore
+
+from utils.search import successive_halving
+
+
+class CountingKNN(KNeighborsClassifier):
+    fits = 0
+
+    def fit(self, X, y):
+        CountingKNN.fits += 1
+        return super().fit(X, y)
+
+def test_low_budget_rungs_use_a_single_holdout():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 4))
+    y = (X[:, 0] + rng.normal(0, 0.5, 400) > 0).astype(int)
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=0)
+    grid = {'n_neighbors': [1, 3, 5, 7, 9, 11, 13, 15]}
+
+    CountingKNN.fits = 0
+    scored, failed = successive_halving(CountingKNN(), grid, X, y, cv, budgets=(0.5, 1.0), keep=0.5,
+                                        min_keep=4, random_state=0, n_jobs=1)
+    # 8 candidatos x 1 holdout + 4 promovidos x 5 folds
+    assert CountingKNN.fits == 8 + 4 * 5
+    assert len(scored) == 4 and not failed
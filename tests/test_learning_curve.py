@@ -0,0 +1,28 @@
+import numpy as np
+from sklearn.linear_model import SGDClassifier #type:ignore
+from sklearn.tree import DecisionTreeClassifier #type:ignore
+
+from utils.learning_curve import learning_curve
+
+
+def _data(n=203, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    y = (X[:, 0] + rng.normal(0, 0.5, n) > 0).astype(int)
+    return X[:150], y[:150], X[150:], y[150:]
+
+def test_last_fraction_uses_every_row():
+    X_train, y_train, X_test, y_test = _data()
+    # arange acumula erro: a última fração sai 0.9999999999999998
+    for percents in (np.arange(0.2, 1.01, 0.05), np.linspace(0.2, 1.0, 17)):
+        curve = learning_curve(DecisionTreeClassifier(random_state=0), X_train, y_train, X_test, y_test,
+                               percents, strategy='parallel', n_jobs=1)
+        assert curve['sizes'][-1] == len(X_train)
+        assert curve['full_fit']
+
+def test_partial_fit_model_is_not_a_full_fit():
+    X_train, y_train, X_test, y_test = _data()
+    curve = learning_curve(SGDClassifier(random_state=0), X_train, y_train, X_test, y_test,
+                           np.linspace(0.2, 1.0, 17), strategy='partial_fit')
+    assert curve['sizes'][-1] == len(X_train)
+    assert not curve['full_fit']
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('numba')
+
+from utils import lvq as lvq_module, lvq_numba
+from utils.lvq import (
+    CHUNK_BYTES, LVQClassifier, PrototypeIndex, chunk_rows, nearest_prototypes, get_pairwise_distance_function
+)
+
+METRICS = ['euclidean', 'manhattan', 'chebyshev']
+INIT_STRATEGIES = ['random', 'stratified_mean']
+DTYPES = [np.float64, np.float32]
+
+
+def _data(dtype, n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 14))
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(0, 0.5, n) > 0).astype(int)
+    return X.astype(dtype), y
+
+def _fit(backend, metric, init_strategy, dtype):
+    X, y = _data(dtype)
+    model = LVQClassifier(n_codebooks=8, lrate=0.3, epochs=5, init_strategy=init_strategy,
+                          distance_metric=metric, backend=backend, algorithm='brute', random_state=51)
+    return model.fit(X, y), X
+
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("init_strategy", INIT_STRATEGIES)
+@pytest.mark.parametrize("metric", METRICS)
+def test_online_training_gives_identical_codebooks(metric, init_strategy, dtype):
+    numpy_model, _ = _fit('numpy', metric, init_strategy, dtype)
+    numba_model, _ = _fit('numba', metric, init_strategy, dtype)
+    assert numba_model.backend_ == 'numba'
+    assert np.array_equal(numpy_model.prototypes_, numba_model.prototypes_)
+    assert np.array_equal(numpy_model.prototype_labels_, numba_model.prototype_labels_)
+
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("init_strategy", INIT_STRATEGIES)
+@pytest.mark.parametrize("metric", METRICS)
+def test_nearest_prototypes_parity(metric, init_strategy, dtype):
+    model, X = _fit('numpy', metric, init_strategy, dtype)
+    n_classes = len(model.classes_)
+    expected = nearest_prototypes(model.prototypes_, X, get_pairwise_distance_function(metric),
+                                  model.prototype_labels_, n_classes)
+    compiled = lvq_numba.nearest_prototypes(model.prototypes_, X, metric, model.prototype_labels_, n_classes)
+    for name, a, b in zip(('winners', 'distances', 'class_distances'), expected, compiled):
+        assert np.array_equal(a, b), name
+
+def test_chunk_rows_follow_the_byte_budget():
+    # 1000 codebooks x 14 features em float64: 4096 linhas dariam ~458 MB
+    rows = chunk_rows(1000, 14, 8, chunk_size=4096)
+    assert rows * 1000 * 14 * 8 <= CHUNK_BYTES
+    assert chunk_rows(2, 2, 8, chunk_size=4096) == 4096
+    assert chunk_rows(10**9, 14, 8) == 1
+
+@pytest.mark.parametrize("algorithm", ['brute', 'kd_tree'])
+def test_small_byte_budget_gives_the_same_predictions(monkeypatch, algorithm):
+    X, y = _data(np.float64)
+    model = LVQClassifier(n_codebooks=80, epochs=2, algorithm=algorithm, random_state=51).fit(X, y)
+    expected = nearest_prototypes(model.prototypes_, X, get_pairwise_distance_function('euclidean'),
+                                  model.prototype_labels_, len(model.classes_))
+    monkeypatch.setattr(lvq_module, 'CHUNK_BYTES', 80 * 14 * 8 * 7)
+    got = model.index_.query(X) if model.index_ is not None else nearest_prototypes(
+        model.prototypes_, X, get_pairwise_distance_function('euclidean'), model.prototype_labels_, len(model.classes_)
+    )
+    _assert_same(expected, got)
+
+# --- Índice espacial contra a varredura completa ---
+TREES = ['kd_tree', 'ball_tree']
+
+def _brute(prototypes, labels, X, metric, n_classes):
+    return nearest_prototypes(prototypes, X, get_pairwise_distance_function(metric), labels, n_classes)
+
+def _assert_same(expected, got):
+    for name, a, b in zip(('winners', 'distances', 'class_distances'), expected, got):
+        assert np.array_equal(a, b), name
+
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("algorithm", TREES)
+@pytest.mark.parametrize("metric", METRICS)
+def test_index_matches_brute_force(metric, algorithm, dtype):
+    rng = np.random.default_rng(1)
+    prototypes = rng.normal(size=(150, 14)).astype(dtype)
+    labels = rng.integers(0, 3, 150)
+    X = rng.normal(size=(500, 14)).astype(dtype)
+    index = PrototypeIndex(prototypes, labels, 3, metric, algorithm)
+    _assert_same(_brute(prototypes, labels, X, metric, 3), index.query(X))
+
+@pytest.mark.parametrize("algorithm", TREES)
+@pytest.mark.parametrize("metric", METRICS)
+def test_index_breaks_ties_like_brute_force(metric, algorithm):
+    # Grade inteira: muitas amostras a mesma distância de vários protótipos,
+    # mais protótipos repetidos (como no início 'stratified_mean')
+    rng = np.random.default_rng(2)
+    prototypes = rng.integers(-3, 4, size=(120, 4)).astype(np.float64)
+    prototypes[60:80] = prototypes[:20]
+    labels = rng.integers(0, 2, 120)
+    X = rng.integers(-3, 4, size=(400, 4)).astype(np.float64)
+    index = PrototypeIndex(prototypes, labels, 2, metric, algorithm)
+    _assert_same(_brute(prototypes, labels, X, metric, 2), index.query(X))
+
+@pytest.mark.parametrize("init_strategy", INIT_STRATEGIES)
+@pytest.mark.parametrize("algorithm", TREES)
+@pytest.mark.parametrize("metric", METRICS)
+def test_indexed_classifier_matches_brute_classifier(metric, algorithm, init_strategy):
+    X, y = _data(np.float64)
+    kwargs = dict(n_codebooks=100, epochs=2, init_strategy=init_strategy, distance_metric=metric, random_state=51)
+    brute = LVQClassifier(algorithm='brute', **kwargs).fit(X, y)
+    indexed = LVQClassifier(algorithm=algorithm, **kwargs).fit(X, y)
+    assert indexed.index_ is not None and brute.index_ is None
+    assert np.array_equal(indexed.predict(X), brute.predict(X))
+    assert np.array_equal(indexed.decision_function(X), brute.decision_function(X))
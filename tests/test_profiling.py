@@ -0,0 +1,38 @@
+import tracemalloc
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold #type:ignore
+from sklearn.neighbors import KNeighborsClassifier #type:ignore
+
+from utils import profiling
+from utils.search import evaluate_folds
+
+
+class TracingKNN(KNeighborsClassifier):
+    # Registra se o tracemalloc estava ligado durante o ajuste
+    tracing = []
+
+    def fit(self, X, y):
+        TracingKNN.tracing.append(tracemalloc.is_tracing())
+        return super().fit(X, y)
+
+def _run(memory):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(90, 3))
+    y = (X[:, 0] > 0).astype(int)
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=0)
+    TracingKNN.tracing = []
+    with profiling.profile(memory=memory) as profiler:
+        evaluate_folds([(TracingKNN(), f) for f in range(3)], X, y, cv, n_jobs=1)
+    return profiler
+
+def test_no_memory_profile_skips_tracemalloc_in_folds():
+    profiler = _run(memory=False)
+    assert TracingKNN.tracing == [False] * 3
+    folds = [e for e in profiler.events if e['cat'] == 'fold']
+    assert len(folds) == 3 and all(e['peak_memory'] is None for e in folds)
+
+def test_memory_profile_traces_folds():
+    profiler = _run(memory=True)
+    assert TracingKNN.tracing == [True] * 3
+    assert all(e['peak_memory'] is not None for e in profiler.events if e['cat'] == 'fold')
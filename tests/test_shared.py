@@ -0,0 +1,44 @@
+import numpy as np
+from collections import namedtuple
+from sklearn.model_selection import StratifiedKFold #type:ignore
+from sklearn.neighbors import KNeighborsClassifier #type:ignore
+
+from utils import shared
+from utils.search import evaluate_folds
+
+
+def _data(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    y = (X[:, 0] > 0).astype(int)
+    return X, y
+
+def _count_saves(monkeypatch):
+    saved = []
+    save = np.save
+    def counting_save(path, array):
+        saved.append(path)
+        save(path, array)
+    monkeypatch.setattr(shared.np, 'save', counting_save)
+    return saved
+
+def test_published_memmaps_are_not_copied_again(monkeypatch):
+    X, y = _data()
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=0)
+    tasks = [(KNeighborsClassifier(n_neighbors=k), fold) for k in (1, 3) for fold in range(3)]
+    with shared.shared_arrays(X, y) as (X_shared, y_shared):
+        saved = _count_saves(monkeypatch)
+        for _ in range(2):
+            records = evaluate_folds(tasks, X_shared, y_shared, cv, n_jobs=1)
+        assert saved == []
+    expected = evaluate_folds(tasks, X, y, cv, n_jobs=1)
+    assert [r['score'] for r in records] == [r['score'] for r in expected]
+
+def test_falls_back_to_disk_without_free_shared_memory(monkeypatch):
+    Usage = namedtuple('Usage', 'total used free')
+    monkeypatch.setattr(shared.shutil, 'disk_usage', lambda path: Usage(1, 1, 0))
+    X, y = _data()
+    with shared.shared_arrays(X, y) as (X_shared, y_shared):
+        assert isinstance(X_shared, np.memmap)
+        assert not X_shared.filename.startswith('/dev/shm')
+        assert np.array_equal(X_shared, X)
@@ -0,0 +1,31 @@
+import numpy as np
+from sklearn.model_selection import StratifiedKFold #type:ignore
+from sklearn.neighbors import KNeighborsClassifier #type:ignore
+
+from utils.search import evaluate_folds, params_key, results_table, stability_scores
+
+
+def _data(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    y = (X[:, 0] + rng.normal(0, 0.5, n) > 0).astype(int)
+    return X, y
+
+def _record(params, cv, fold, score):
+    return {'search': 0, 'params_key': params_key(params), 'params': params, 'cv': repr(cv),
+            'scoring': 'accuracy', 'fold': fold, 'score': score, 'fit_time': 0.0, 'score_time': 0.0}
+
+def test_only_folds_of_the_same_splitter_are_reused():
+    X, y = _data()
+    params = {'n_neighbors': 3}
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=0)
+    other = StratifiedKFold(n_splits=3, shuffle=True, random_state=1)
+    # Fold 0 gravado com o mesmo divisor; um conjunto completo de outro divisor
+    records = [_record(params, cv, 0, -1.0)] + [_record(params, other, f, -2.0) for f in range(3)]
+
+    scores = stability_scores([KNeighborsClassifier(**params)], [params], X, y, cv,
+                              results=results_table(records), n_jobs=1)
+
+    expected = [r['score'] for r in evaluate_folds([(KNeighborsClassifier(**params), f) for f in (1, 2)],
+                                                   X, y, cv, n_jobs=1)]
+    assert scores[0].tolist() == [-1.0] + expected
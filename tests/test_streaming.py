@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from utils.streaming import array_chunks, csv_chunks, stream_preprocess
+
+
+def _frame(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(rng.uniform(2500, 6500, size=(n, 3)), columns=['a', 'b', 'c'])
+    frame['label'] = rng.choice(['galaxy', 'qso', 'star'], size=n)
+    return frame
+
+def test_string_labels_are_encoded(tmp_path):
+    frame = _frame()
+    path = tmp_path / 'data.csv'
+    frame.to_csv(path, index=False)
+    # Blocos pequenos: cada rótulo aparece pela primeira vez em ordens diferentes
+    result = stream_preprocess(csv_chunks(path, 'label', chunk_size=7), tmp_path / 'out', random_state=0)
+
+    assert result['classes'].tolist() == ['galaxy', 'qso', 'star']
+    assert result['y_train'].dtype == np.int64
+    kept = frame[frame[['a', 'b', 'c']].apply(lambda col: col.between(3000, 6000)).all(axis=1)]
+    decoded = np.concatenate([result['classes'][result['y_train']], result['classes'][result['y_test']]])
+    assert sorted(decoded) == sorted(kept['label'])
+    assert len(decoded) == result['report'].n_kept
+
+def test_numeric_labels_are_kept(tmp_path):
+    frame = _frame()
+    y = (frame['label'] == 'star').astype(int).to_numpy()
+    result = stream_preprocess(array_chunks(frame[['a', 'b', 'c']].to_numpy(), y, chunk_size=50),
+                               tmp_path / 'out', random_state=0)
+    assert result['classes'] is None
+    assert result['y_train'].dtype == y.dtype
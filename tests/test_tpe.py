@@ -0,0 +1,86 @@
+import numpy as np
+from scipy.stats import uniform #type:ignore
+from sklearn.model_selection import StratifiedKFold #type:ignore
+from sklearn.neighbors import KNeighborsClassifier #type:ignore
+
+from utils.checkpoint import TrialLog
+from utils.search import params_key
+from utils.tpe import TPESampler, tpe_search
+
+
+SPACE = {'n_neighbors': list(range(1, 30)), 'weights': ['uniform', 'distance']}
+
+class CountingKNN(KNeighborsClassifier):
+    fits = 0
+
+    def fit(self, X, y):
+        CountingKNN.fits += 1
+        return super().fit(X, y)
+
+def _data(n=150, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    y = (X[:, 0] + rng.normal(0, 0.5, n) > 0).astype(int)
+    return X, y
+
+def _score(params):
+    return -abs(params['x'] - 0.3)
+
+def test_ask_tell_is_deterministic_and_never_repeats():
+    runs = []
+    for _ in range(2):
+        sampler = TPESampler(SPACE, n_startup=5, random_state=0)
+        proposals = []
+        for _ in range(8):
+            batch = sampler.ask(3)
+            for params in batch:
+                sampler.tell(params, -abs(params['n_neighbors'] - 7))
+            proposals.extend(batch)
+        runs.append(proposals)
+    assert runs[0] == runs[1]
+    keys = [params_key(p) for p in runs[0]]
+    assert len(keys) == len(set(keys))
+
+def test_model_based_proposals_move_towards_the_optimum():
+    sampler = TPESampler({'x': uniform(0, 1)}, n_startup=10, random_state=0)
+    for _ in range(60):
+        params = sampler.ask(1)[0]
+        sampler.tell(params, _score(params))
+    observed = [p['x'] for p, _ in sampler.observations]
+    startup, guided = observed[:10], observed[-20:]
+    assert np.mean(np.abs(np.array(guided) - 0.3)) < np.mean(np.abs(np.array(startup) - 0.3))
+
+def test_ask_stops_when_the_grid_is_exhausted():
+    sampler = TPESampler({'k': [1, 2, 3]}, n_startup=1, random_state=0)
+    proposals = sampler.ask(10)
+    assert sorted(p['k'] for p in proposals) == [1, 2, 3]
+    assert sampler.exhausted
+
+def test_resumed_search_matches_an_uninterrupted_one(tmp_path):
+    X, y = _data()
+    cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=0)
+    kwargs = dict(search_id='tpe', batch_size=2, random_state=0, n_jobs=1, n_startup=3)
+
+    full, full_scores = tpe_search(CountingKNN(), SPACE, X, y, cv, TrialLog('full', str(tmp_path)), n_iter=8, **kwargs)
+
+    log = TrialLog('resumed', str(tmp_path))
+    tpe_search(CountingKNN(), SPACE, X, y, cv, log, n_iter=4, **kwargs)
+    CountingKNN.fits = 0
+    resumed, resumed_scores = tpe_search(CountingKNN(), SPACE, X, y, cv, log, n_iter=8, **kwargs)
+
+    assert resumed == full
+    assert np.array_equal(resumed_scores, full_scores)
+    # Só os 4 candidatos novos são ajustados
+    assert CountingKNN.fits == 4 * 3
+
+def test_resume_ignores_folds_of_another_splitter(tmp_path):
+    X, y = _data()
+    log = TrialLog('knn', str(tmp_path))
+    kwargs = dict(search_id='tpe', batch_size=2, random_state=0, n_jobs=1, n_startup=3, n_iter=4)
+    tpe_search(CountingKNN(), SPACE, X, y, StratifiedKFold(n_splits=3, shuffle=True, random_state=0), log, **kwargs)
+
+    CountingKNN.fits = 0
+    other = StratifiedKFold(n_splits=3, shuffle=True, random_state=1)
+    candidates, scores = tpe_search(CountingKNN(), SPACE, X, y, other, log, **kwargs)
+    assert CountingKNN.fits == len(candidates) * 3
+    assert not np.isnan(scores).any()
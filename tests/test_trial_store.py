@@ -0,0 +1,49 @@
+import multiprocessing as mp
+import pickle
+
+import joblib
+
+from utils.checkpoint import TrialStore, import_checkpoints
+
+
+def _write_trials(path, worker, n):
+    store = TrialStore(path)
+    for i in range(n):
+        store.append_trials('knn', [{'search': worker, 'params_key': f"{worker}-{i}", 'params': {'i': i},
+                                     'scoring': 'accuracy', 'fold': 0, 'score': float(i)}])
+
+def test_concurrent_writers_keep_every_trial(tmp_path):
+    path = str(tmp_path / 'trials.sqlite')
+    TrialStore(path)
+    ctx = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+    procs = [ctx.Process(target=_write_trials, args=(path, w, 50)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+
+    store = TrialStore(path)
+    trials = store.trials('knn')
+    assert len(trials) == 4 * 50
+    for w in range(4):
+        # Cada escritor aparece inteiro e na ordem em que gravou
+        assert [t['params']['i'] for t in store.trials('knn', search=w)] == list(range(50))
+
+def test_import_checkpoints_reads_legacy_files_once(tmp_path):
+    joblib.dump({'best_params': [{'n_neighbors': 3}], 'total_time': 12.5}, tmp_path / 'knn.pkl')
+    records = [{'search': 0, 'params_key': 'a', 'params': {'n_neighbors': 3}, 'scoring': 'accuracy',
+                'fold': f, 'score': 0.5} for f in range(3)]
+    with open(tmp_path / 'knn.trials.pkl', 'wb') as f:
+        for record in records:
+            pickle.dump(record, f)
+        f.write(b'\x80\x05truncated')  # final de um log interrompido
+
+    store = TrialStore(str(tmp_path / 'trials.sqlite'))
+    assert sorted(import_checkpoints(str(tmp_path), store)) == ['knn', 'knn']
+    assert store.load_checkpoint('knn') == {'best_params': [{'n_neighbors': 3}], 'total_time': 12.5}
+    assert store.trials('knn') == records
+
+    # Uma segunda importação não duplica nada
+    assert import_checkpoints(str(tmp_path), store) == []
+    assert len(store.trials('knn')) == 3
@@ -1,42 +1,93 @@
-def filter_range(min_value, max_value, X, y):
+import numpy as np
+
+
+class FilterReport:
+    """Resumo de uma filtragem por range (ver `filter_range`)."""
+
+    def __init__(self, min_value, max_value, n_original, n_kept):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.n_original = n_original
+        self.n_kept = n_kept
+
+    @property
+    def n_removed(self):
+        return self.n_original - self.n_kept
+
+    @property
+    def percent_removed(self):
+        return (self.n_removed / self.n_original) * 100 if self.n_original else 0.0
+
+    @classmethod
+    def from_mask(cls, mask, min_value, max_value):
+        return cls(min_value, max_value, len(mask), int(np.count_nonzero(mask)))
+
+    def __str__(self):
+        return "\n".join([
+            f"📊 RESULTADO DA FILTRAGEM (Range: {self.min_value} - {self.max_value})",
+            f"Dataset original: {self.n_original} observações",
+            f"Dataset filtrado: {self.n_kept} observações",
+            f"Linhas removidas: {self.n_removed} ({self.percent_removed:.2f}%)",
+            f"Linhas mantidas: {100 - self.percent_removed:.2f}%",
+        ])
+
+    def print(self):
+        print(self)
+
+
+def _bounds(value, columns, default):
+    # Escalar, sequência (uma posição por coluna) ou dict {coluna: valor}
+    if isinstance(value, dict):
+        return np.array([value.get(c, default) for c in columns], dtype=np.float64)
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (len(columns),))
+
+def range_mask(X, min_value, max_value):
+    """
+    Máscara booleana das linhas de X com todos os valores dentro do range.
+
+    `min_value` e `max_value` podem ser escalares (range global), sequências
+    com um valor por coluna ou dicts {coluna: valor}; colunas ausentes do
+    dict ficam sem limite.
+    """
+    values = X.to_numpy() if hasattr(X, "to_numpy") else np.asarray(X)
+    columns = X.columns if hasattr(X, "columns") else range(values.shape[1])
+    lower = _bounds(min_value, columns, -np.inf)
+    upper = _bounds(max_value, columns, np.inf)
+    out_of_range = (values < lower) | (values > upper)
+    return ~out_of_range.any(axis=1)
+
+def filter_range(min_value, max_value, X, y, verbose=True, return_mask=False, return_report=False):
     """
     Filtra o dataset removendo linhas que possuem valores fora do range especificado
-    
+
     Parâmetros:
-    - min_value: valor mínimo aceitável
-    - max_value: valor máximo aceitável  
+    - min_value: valor mínimo aceitável (escalar, um por coluna ou dict {coluna: valor})
+    - max_value: valor máximo aceitável (escalar, um por coluna ou dict {coluna: valor})
     - X: DataFrame com as features
     - y: DataFrame/Series com o target
-    
+    - verbose: imprime o `FilterReport` da filtragem
+    - return_mask: retorna também a máscara das linhas mantidas
+    - return_report: retorna também o `FilterReport` (ex. com verbose=False,
+      para usar `n_removed` sem imprimir)
+
     Retorna:
     - X_filtrado: DataFrame X sem as linhas problemáticas
     - y_filtrado: DataFrame/Series y sem as linhas problemáticas
+    - mask (opcional): array booleano com True nas linhas mantidas
+    - report (opcional): `FilterReport` da filtragem, depois da máscara
     """
-    
-    # Identificar linhas com valores fora do range
-    linhas_problematicas = set()
-    
-    for feature in X.columns:
-        mask_fora_range = (X[feature] < min_value) | (X[feature] > max_value)
-        indices_fora_range = X[mask_fora_range].index.tolist()
-        linhas_problematicas.update(indices_fora_range)
-    
-    linhas_problematicas = sorted(list(linhas_problematicas))
-    
-    # Remover linhas problemáticas
-    X_filtrado = X.drop(index=linhas_problematicas)
-    y_filtrado = y.drop(index=linhas_problematicas)
-    
-    # Calcular percentual de redução
-    percentual_original = len(X)
-    percentual_filtrado = len(X_filtrado)
-    percentual_removido = len(linhas_problematicas)
-    percentual_reducao = (percentual_removido / percentual_original) * 100
-    
-    print(f"📊 RESULTADO DA FILTRAGEM (Range: {min_value} - {max_value})")
-    print(f"Dataset original: {percentual_original} observações")
-    print(f"Dataset filtrado: {percentual_filtrado} observações")
-    print(f"Linhas removidas: {percentual_removido} ({percentual_reducao:.2f}%)")
-    print(f"Linhas mantidas: {100 - percentual_reducao:.2f}%")
-    
-    return X_filtrado, y_filtrado
\ No newline at end of file
+    mask = range_mask(X, min_value, max_value)
+
+    X_filtrado = X[mask]
+    y_filtrado = y[mask]
+
+    report = FilterReport.from_mask(mask, min_value, max_value)
+    if verbose:
+        report.print()
+
+    result = (X_filtrado, y_filtrado)
+    if return_mask:
+        result += (mask,)
+    if return_report:
+        result += (report,)
+    return result
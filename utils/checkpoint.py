@@ -1,13 +1,267 @@
 import os
+import glob
+import json
+import time
+import pickle
+import sqlite3
 import joblib
 
+STORE_FILE = "trials.sqlite"
+
+
+# --- Store de trials (SQLite) ---
+def _sql_value(value):
+    # Escalares numpy (ex. np.int64) não são aceitos pelo sqlite3
+    return value.item() if hasattr(value, "item") else value
+
+class TrialStore:
+    """
+    Banco SQLite com checkpoints de busca e trials por (candidato, fold).
+
+    Cada escrita é uma transação curta: um crash no meio dela não deixa o
+    banco corrompido, só descarta a transação. Em modo WAL vários processos
+    (ex. buscas rodando em notebooks diferentes) gravam no mesmo arquivo, e
+    uma escrita concorrente espera até `timeout` segundos pelo lock. Os
+    trials ficam indexados por nome, busca e parâmetros, então consultas
+    como "melhores N candidatos do estimador X" não carregam o histórico.
+    """
+
+    def __init__(self, path=os.path.join("checkpoints", STORE_FILE), timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._run(lambda conn: conn.executescript("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    name TEXT PRIMARY KEY,
+                    total_time REAL NOT NULL DEFAULT 0,
+                    updated_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS best_params (
+                    name TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    params BLOB NOT NULL,
+                    PRIMARY KEY (name, position)
+                );
+                CREATE TABLE IF NOT EXISTS trials (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    search,
+                    params_key TEXT,
+                    scoring TEXT,
+                    fold INTEGER,
+                    score REAL,
+                    record BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS trials_by_search ON trials (name, search);
+                CREATE INDEX IF NOT EXISTS trials_by_params ON trials (name, scoring, params_key);
+            """))
+
+    def _connect(self):
+        # Uma conexão por operação: conexões SQLite não podem ser herdadas por fork
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _run(self, fn):
+        conn = self._connect()
+        try:
+            with conn:  # commit ao sair, rollback em caso de exceção
+                return fn(conn)
+        finally:
+            conn.close()
+
+    # --- Checkpoints ---
+    def has_checkpoint(self, name):
+        return self._run(lambda conn: conn.execute(
+            "SELECT 1 FROM checkpoints WHERE name = ?", (name,)).fetchone() is not None)
+
+    def save_checkpoint(self, name, best_params, total_time):
+        def write(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, total_time, updated_at) VALUES (?, ?, ?)",
+                (name, float(total_time), time.time()),
+            )
+            conn.execute("DELETE FROM best_params WHERE name = ? AND position >= ?", (name, len(best_params)))
+            conn.executemany(
+                "INSERT OR REPLACE INTO best_params (name, position, params) VALUES (?, ?, ?)",
+                [(name, i, pickle.dumps(p, protocol=pickle.HIGHEST_PROTOCOL)) for i, p in enumerate(best_params)],
+            )
+        self._run(write)
+
+    def load_checkpoint(self, name):
+        def read(conn):
+            row = conn.execute("SELECT total_time FROM checkpoints WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            params = conn.execute(
+                "SELECT params FROM best_params WHERE name = ? ORDER BY position", (name,)).fetchall()
+            return {"best_params": [pickle.loads(p) for (p,) in params], "total_time": row[0]}
+        return self._run(read)
+
+    # --- Trials ---
+    def append_trials(self, name, records):
+        rows = [
+            (name, *(_sql_value(r.get(c)) for c in ("search", "params_key", "scoring", "fold", "score")),
+             pickle.dumps(r, protocol=pickle.HIGHEST_PROTOCOL))
+            for r in records
+        ]
+        self._run(lambda conn: conn.executemany(
+            "INSERT INTO trials (name, search, params_key, scoring, fold, score, record) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows))
+
+    def trials(self, name, search=None):
+        """Registros de `name` (opcionalmente só de uma busca), na ordem em que foram gravados."""
+        query, args = "SELECT record FROM trials WHERE name = ?", [name]
+        if search is not None:
+            query += " AND search = ?"
+            args.append(search)
+        rows = self._run(lambda conn: conn.execute(query + " ORDER BY id", args).fetchall())
+        return [pickle.loads(r) for (r,) in rows]
+
+    def has_trials(self, name):
+        return self._run(lambda conn: conn.execute(
+            "SELECT 1 FROM trials WHERE name = ? LIMIT 1", (name,)).fetchone() is not None)
+
+    def best_params(self, name, n=20, scoring="accuracy", min_folds=1):
+        """
+        Os `n` candidatos de `name` com maior média de score nos folds gravados.
+
+        Retorna uma lista de (params, média, número de folds), da maior para
+        a menor média. Folds que falharam (score NaN/NULL) não entram na média.
+        """
+        def read(conn):
+            top = conn.execute("""
+                SELECT MIN(id), AVG(score) AS mean, COUNT(score) AS n_folds
+                FROM trials
+                WHERE name = ? AND scoring = ? AND score IS NOT NULL
+                GROUP BY params_key
+                HAVING n_folds >= ?
+                ORDER BY mean DESC
+                LIMIT ?
+            """, (name, scoring, min_folds, n)).fetchall()
+            records = dict(conn.execute(
+                f"SELECT id, record FROM trials WHERE id IN ({','.join('?' * len(top))})",
+                [row[0] for row in top]).fetchall()) if top else {}
+            return [(pickle.loads(records[i])["params"], mean, n_folds) for i, mean, n_folds in top]
+        return self._run(read)
+
+
+def _read_pickle_log(path):
+    # Formato antigo do TrialLog: pickles concatenados, talvez com o final truncado
+    records = []
+    with open(path, "rb") as f:
+        while True:
+            try:
+                records.append(pickle.load(f))
+            except (EOFError, pickle.UnpicklingError, ValueError, AttributeError, IndexError):
+                break
+    return records
+
+def import_checkpoints(directory="checkpoints", store=None, overwrite=False):
+    """
+    Importa para o `TrialStore` os checkpoints antigos de `directory`:
+    os dicts `<name>.pkl` gravados com joblib e os logs `<name>.trials.pkl`.
+
+    Nomes que já existem no store são pulados, a menos que `overwrite=True`
+    (só para checkpoints; trials nunca são duplicados). Os arquivos antigos
+    não são apagados. Retorna a lista de nomes importados.
+    """
+    store = store or TrialStore(os.path.join(directory, STORE_FILE))
+    imported = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.pkl"))):
+        filename = os.path.basename(path)
+        if filename.endswith(".trials.pkl"):
+            name = filename[:-len(".trials.pkl")]
+            if not store.has_trials(name):
+                store.append_trials(name, _read_pickle_log(path))
+                imported.append(name)
+            continue
+        name = filename[:-len(".pkl")]
+        if store.has_checkpoint(name) and not overwrite:
+            continue
+        checkpoint = joblib.load(path)
+        store.save_checkpoint(name, checkpoint.get("best_params", []), checkpoint.get("total_time", 0))
+        imported.append(name)
+    return imported
+
+
+# --- API usada pelos notebooks ---
 def save_checkpoint(name, object):
-    os.makedirs("checkpoints", exist_ok=True)
-    path = os.path.join("checkpoints", f"{name}.pkl")
-    joblib.dump(object, path)
+    """Grava {'best_params': [...], 'total_time': t} de `name` no `TrialStore` padrão."""
+    TrialStore().save_checkpoint(name, object.get("best_params", []), object.get("total_time", 0))
 
 def load_checkpoint(name):
-    path = os.path.join("checkpoints", f"{name}.pkl")
-    if os.path.exists(path):
-        return joblib.load(path)
-    return {"best_params": [], "total_time": 0}
+    store = TrialStore()
+    checkpoint = store.load_checkpoint(name)
+    if checkpoint is None and os.path.exists(os.path.join("checkpoints", f"{name}.pkl")):
+        # Checkpoint antigo em pickle: importado uma única vez para o store
+        import_checkpoints()
+        checkpoint = store.load_checkpoint(name)
+    return checkpoint or {"best_params": [], "total_time": 0}
+
+
+class TrialLog:
+    """
+    Log append-only dos trials de `name`, gravado no `TrialStore` de
+    `directory`.
+
+    Cada registro é uma linha inserida em uma transação própria, então
+    salvar um trial custa só o tamanho dele, não o histórico inteiro, e um
+    crash no meio de uma escrita não corrompe os registros anteriores.
+    Um log antigo em `<name>.trials.pkl` é importado na primeira leitura.
+    """
+
+    def __init__(self, name, directory="checkpoints"):
+        self.name = name
+        self.directory = directory
+        self.store = TrialStore(os.path.join(directory, STORE_FILE))
+
+    def load(self, search=None):
+        legacy_path = os.path.join(self.directory, f"{self.name}.trials.pkl")
+        if os.path.exists(legacy_path) and not self.store.has_trials(self.name):
+            self.store.append_trials(self.name, _read_pickle_log(legacy_path))
+        return self.store.trials(self.name, search)
+
+    def append(self, record):
+        self.store.append_trials(self.name, [record])
+
+    def best_params(self, n=20, scoring="accuracy", min_folds=1):
+        return self.store.best_params(self.name, n, scoring, min_folds)
+
+
+class IncompatibleParams:
+    """
+    Lista persistida de combinações de parâmetros que sabidamente falham.
+
+    Gravada como JSON em `checkpoints/<name>.incompatible.json`, indexada
+    pela representação canônica dos parâmetros, para que execuções futuras
+    descartem essas combinações antes de qualquer ajuste.
+    """
+
+    def __init__(self, name, directory="checkpoints"):
+        self.path = os.path.join(directory, f"{name}.incompatible.json")
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = {e["key"]: e for e in json.load(f)}
+
+    @staticmethod
+    def key(params):
+        return repr(sorted(params.items()))
+
+    def __contains__(self, params):
+        return self.key(params) in self.entries
+
+    def error(self, params):
+        return self.entries[self.key(params)]["error"]
+
+    def add(self, params, error):
+        self.entries[self.key(params)] = {"key": self.key(params), "params": params, "error": error}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self.entries.values()), f, indent=4, default=repr)
+        os.replace(tmp_path, self.path)
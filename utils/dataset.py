@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = "datasets"
+
+
+def _dataset_dir(dataset_id, cache_dir):
+    return os.path.join(cache_dir, f"uci-{dataset_id}")
+
+def content_hash(features, targets, feature_names, target_names):
+    """Hash SHA-256 dos valores e nomes das colunas do dataset."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(feature_names), list(target_names)]).encode())
+    for array in (features, targets):
+        array = np.ascontiguousarray(array)
+        digest.update(str(array.dtype).encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def _write_cache(dataset_id, X, y, cache_dir):
+    features = X.to_numpy()
+    targets = y.to_numpy()
+    digest = content_hash(features, targets, X.columns, y.columns)
+
+    entry_dir = os.path.join(_dataset_dir(dataset_id, cache_dir), digest[:16])
+    os.makedirs(entry_dir, exist_ok=True)
+    np.save(os.path.join(entry_dir, "features.npy"), features)
+    np.save(os.path.join(entry_dir, "targets.npy"), targets)
+
+    manifest = {
+        "dataset_id": dataset_id,
+        "hash": digest,
+        "entry": digest[:16],
+        "feature_names": [str(c) for c in X.columns],
+        "target_names": [str(c) for c in y.columns],
+    }
+    # Escreve o manifesto por último e de forma atômica: um cache só passa a
+    # existir quando os dois arquivos .npy já estão completos
+    manifest_path = os.path.join(_dataset_dir(dataset_id, cache_dir), "manifest.json")
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+def _read_cache(dataset_id, cache_dir, verify):
+    manifest_path = os.path.join(_dataset_dir(dataset_id, cache_dir), "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    entry_dir = os.path.join(_dataset_dir(dataset_id, cache_dir), manifest["entry"])
+    features = np.load(os.path.join(entry_dir, "features.npy"), mmap_mode="r")
+    targets = np.load(os.path.join(entry_dir, "targets.npy"), mmap_mode="r")
+    if verify:
+        digest = content_hash(features, targets, manifest["feature_names"], manifest["target_names"])
+        if digest != manifest["hash"]:
+            raise ValueError(f"Corrupted dataset cache for id={dataset_id}: hash mismatch in {entry_dir}")
+
+    X = pd.DataFrame(features, columns=manifest["feature_names"], copy=False)
+    y = pd.DataFrame(targets, columns=manifest["target_names"], copy=False)
+    return X, y
+
+def load_dataset(dataset_id=264, cache_dir=CACHE_DIR, refresh=False, verify=False, return_timings=False):
+    """
+    Carrega um dataset do UCI usando um cache local.
+
+    Na primeira chamada o dataset é baixado com `fetch_ucirepo` e gravado em
+    `<cache_dir>/uci-<id>/<hash>/` como um par de arquivos .npy, indexado pelo
+    hash do conteúdo. As chamadas seguintes leem os arquivos via memory-map,
+    sem acesso à rede.
+
+    Parâmetros:
+    - dataset_id: id do dataset no UCI (264 = EEG Eye State)
+    - cache_dir: diretório do cache
+    - refresh: força um novo download e sobrescreve o cache
+    - verify: recalcula o hash do conteúdo ao ler do cache
+    - return_timings: retorna também um dict com os tempos de carga
+
+    Retorna:
+    - X: DataFrame com as features
+    - y: DataFrame com o target
+    - timings (opcional): {'source', 'fetch', 'write', 'read', 'total'} em segundos
+    """
+    start = time.perf_counter()
+    timings = {"source": "cache", "fetch": 0.0, "write": 0.0, "read": 0.0}
+
+    cached = None
+    if not refresh:
+        t = time.perf_counter()
+        cached = _read_cache(dataset_id, cache_dir, verify)
+        timings["read"] = time.perf_counter() - t
+
+    if cached is None:
+        from ucimlrepo import fetch_ucirepo
+
+        timings["source"] = "download"
+        t = time.perf_counter()
+        dataset = fetch_ucirepo(id=dataset_id)
+        timings["fetch"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        _write_cache(dataset_id, dataset.data.features, dataset.data.targets, cache_dir)
+        timings["write"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        cached = _read_cache(dataset_id, cache_dir, verify=False)
+        timings["read"] = time.perf_counter() - t
+
+    X, y = cached
+    timings["total"] = time.perf_counter() - start
+
+    if return_timings:
+        return X, y, timings
+    return X, y
@@ -0,0 +1,117 @@
+import os
+import hashlib
+import pickle
+import numpy as np
+
+
+def dataset_fingerprint(X, y):
+    """Hash SHA-256 do conteúdo de (X, y), usado para invalidar o cache quando os dados mudam."""
+    digest = hashlib.sha256()
+    for array in (np.asarray(X), np.asarray(y).ravel()):
+        array = np.ascontiguousarray(array)
+        digest.update(str(array.dtype).encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def estimator_key(estimator):
+    """Classe do estimador + parâmetros canônicos (ordenados por nome)."""
+    cls = type(estimator)
+    params = sorted(estimator.get_params(deep=False).items())
+    return f"{cls.__module__}.{cls.__qualname__}{params!r}"
+
+def is_deterministic(estimator):
+    """
+    False se o estimador (ou um sub-estimador) tem `random_state=None`: cada
+    ajuste sai diferente, então um score salvo não vale para o próximo.
+    """
+    return not any(
+        value is None
+        for name, value in estimator.get_params(deep=True).items()
+        if name == "random_state" or name.endswith("__random_state")
+    )
+
+
+class EvaluationCache:
+    """
+    Cache persistente de scores por fold, compartilhado entre execuções.
+
+    Cada entrada é indexada por (estimador + parâmetros, fingerprint do
+    dataset, índices de treino e teste do fold, métrica) e gravada como um
+    arquivo pequeno em `directory`. Os índices entram no hash no lugar do
+    `repr` do divisor, que é o mesmo para divisores com `random_state=None`
+    e folds diferentes a cada chamada. Estimadores não determinísticos (ver
+    `is_deterministic`) não devem ser cacheados. Uma leitura bem-sucedida atualiza o
+    mtime do arquivo, que serve de relógio para o descarte LRU quando o
+    diretório passa de `max_entries` arquivos ou `max_bytes` bytes.
+    """
+
+    def __init__(self, directory=os.path.join("checkpoints", "eval_cache"), max_entries=100_000,
+                 max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, estimator, data_fingerprint, train_idx, test_idx, scoring):
+        digest = hashlib.sha256(repr((estimator_key(estimator), data_fingerprint, scoring)).encode())
+        for indices in (train_idx, test_idx):
+            indices = np.ascontiguousarray(indices, dtype=np.int64)
+            digest.update(str(indices.shape).encode())
+            digest.update(indices.tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        """Retorna o registro salvo ou None, contabilizando hit/miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                record = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return record
+
+    def put(self, key, record):
+        # Grava em arquivo temporário e renomeia: leitores nunca veem uma entrada parcial
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """Remove as entradas usadas há mais tempo até respeitar os limites."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".pkl"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            removed += 1
+        return removed
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,101 @@
+import os
+import time
+import multiprocessing as mp
+from collections import deque
+from multiprocessing.connection import wait
+
+
+def _worker(conn, fn, args):
+    try:
+        conn.send(("ok", fn(*args)))
+    except BaseException as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+def _context():
+    # fork evita serializar X/y para cada processo; spawn fica como alternativa
+    # em plataformas sem fork
+    methods = mp.get_all_start_methods()
+    return mp.get_context("fork" if "fork" in methods else "spawn")
+
+def run_isolated(calls, n_jobs=-1, timeout=None, groups=None):
+    """
+    Executa `fn(*args)` para cada (fn, args) de `calls`, um processo por chamada.
+
+    Até `n_jobs` processos rodam ao mesmo tempo, e um processo que morre
+    (segfault, OOM) não derruba os demais. Sem `groups`, cada chamada que
+    passar de `timeout` segundos é encerrada. Com `groups` (um id por
+    chamada, ex. o candidato de cada fold), o `timeout` vale para o grupo
+    inteiro: é contado a partir do início da primeira chamada do grupo, e
+    quando estoura todas as chamadas do grupo em andamento ou na fila são
+    encerradas. Uma falha por crash também cancela o resto do grupo.
+
+    Gera tuplas (índice, status, valor) na ordem de conclusão, com status
+    'ok', 'error', 'timeout', 'crash' ou 'cancelled'.
+    """
+    ctx = _context()
+    n_jobs = (os.cpu_count() or 1) if n_jobs in (None, -1) else n_jobs
+    queue = deque(range(len(calls)))
+    running = {}
+    cancelled = set()
+    group_start = {}
+
+    def deadline_start(i, start):
+        # Início do relógio: o da própria chamada ou o da primeira do grupo
+        return start if groups is None else group_start[groups[i]]
+
+    def finish(i, status, value):
+        proc, conn, _ = running.pop(i)
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        conn.close()
+        return i, status, value
+
+    def cancel_group(group):
+        cancelled.add(group)
+        siblings = [j for j in running if groups[j] == group]
+        return [finish(j, "cancelled", "cancelled after a failure in the same group") for j in siblings]
+
+    while queue or running:
+        while queue and len(running) < n_jobs:
+            i = queue.popleft()
+            if groups is not None and groups[i] in cancelled:
+                yield i, "cancelled", "cancelled after a failure in the same group"
+                continue
+            if groups is not None and timeout is not None and groups[i] in group_start \
+                    and time.monotonic() - group_start[groups[i]] > timeout:
+                cancelled.add(groups[i])
+                yield i, "timeout", f"group timed out after {timeout}s"
+                continue
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            fn, args = calls[i]
+            proc = ctx.Process(target=_worker, args=(child_conn, fn, args), daemon=True)
+            proc.start()
+            child_conn.close()
+            running[i] = (proc, parent_conn, time.monotonic())
+            if groups is not None:
+                group_start.setdefault(groups[i], running[i][2])
+
+        wait([conn for _, conn, _ in running.values()], timeout=0.1)
+
+        now = time.monotonic()
+        for i in list(running):
+            if i not in running:  # já encerrado por cancelamento do grupo
+                continue
+            proc, conn, start = running[i]
+            if conn.poll():
+                try:
+                    status, value = conn.recv()
+                except EOFError:
+                    proc.join()
+                    status, value = "crash", f"worker exited with code {proc.exitcode}"
+            elif timeout is not None and now - deadline_start(i, start) > timeout:
+                status, value = "timeout", f"timed out after {timeout}s"
+            else:
+                continue
+
+            yield finish(i, status, value)
+            if status in ("timeout", "crash") and groups is not None:
+                yield from cancel_group(groups[i])
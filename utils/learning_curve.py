@@ -0,0 +1,126 @@
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone #type:ignore
+
+
+# --- Métricas a partir de uma única matriz de confusão ---
+def confusion_counts(y_true, y_pred, pos_label=1):
+    """Retorna (tn, fp, fn, tp) de um problema binário em uma única passada."""
+    true_pos = np.asarray(y_true).ravel() == pos_label
+    pred_pos = np.asarray(y_pred).ravel() == pos_label
+    tn, fp, fn, tp = np.bincount(true_pos * 2 + pred_pos, minlength=4)
+    return tn, fp, fn, tp
+
+def _ratio(num, den):
+    # Mesmo comportamento de zero_division=0 do sklearn
+    return float(num / den) if den else 0.0
+
+def binary_metrics(y_true, y_pred, pos_label=1):
+    """Acurácia, F1, precisão e recall (pos_label=1) da mesma matriz de confusão."""
+    tn, fp, fn, tp = confusion_counts(y_true, y_pred, pos_label)
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+    return {
+        'accuracy': _ratio(tp + tn, tn + fp + fn + tp),
+        'f1': _ratio(2 * tp, 2 * tp + fp + fn),
+        'precision': precision,
+        'recall': recall,
+    }
+
+
+# --- Curva de aprendizado ---
+def resolve_strategy(model, strategy='auto'):
+    """
+    Escolhe como estender o modelo entre as frações de treino.
+
+    - 'partial_fit': alimenta o mesmo modelo só com as amostras novas
+    - 'warm_start': reajusta no prefixo maior partindo da solução anterior
+    - 'parallel': reajusta cada fração do zero, em paralelo
+
+    Ensembles com `n_estimators` não usam warm_start: crescer o número de
+    estimadores a cada fração misturaria árvores treinadas em prefixos
+    diferentes, então cada ponto da curva deixaria de ser comparável.
+    """
+    if strategy != 'auto':
+        return strategy
+    if hasattr(model, 'partial_fit'):
+        return 'partial_fit'
+    params = model.get_params()
+    if 'warm_start' in params and 'n_estimators' not in params:
+        return 'warm_start'
+    return 'parallel'
+
+def _score_fraction(model, X_train, y_train, X_test, y_test, n):
+    train_metrics = binary_metrics(y_train[:n], model.predict(X_train[:n]))
+    test_metrics = binary_metrics(y_test, model.predict(X_test))
+    return train_metrics, test_metrics
+
+def _fit_fraction(model, X_train, y_train, X_test, y_test, n, keep_model):
+    model.fit(X_train[:n], y_train[:n])
+    train_metrics, test_metrics = _score_fraction(model, X_train, y_train, X_test, y_test, n)
+    return train_metrics, test_metrics, model if keep_model else None
+
+def learning_curve(model, X_train, y_train, X_test, y_test, percents, strategy='auto', n_jobs=-1):
+    """
+    Treina `model` em prefixos crescentes do treino e avalia treino e teste.
+
+    Parâmetros:
+    - model: estimador (não é modificado; cópias são feitas com `clone`)
+    - X_train, y_train, X_test, y_test: dados de treino e teste
+    - percents: frações do conjunto de treino, em ordem crescente
+    - strategy: 'auto', 'partial_fit', 'warm_start' ou 'parallel' (ver `resolve_strategy`)
+    - n_jobs: processos usados pela estratégia 'parallel'
+
+    Retorna:
+    - dict com 'train_metrics' e 'test_metrics' (uma lista de dicts de
+      `binary_metrics` por fração), 'sizes' (linhas de treino de cada
+      fração), 'strategy', 'model': o modelo da última fração, e
+      'full_fit': True quando esse modelo é um ajuste normal em todas as
+      linhas do treino, ou seja, reaproveitável como modelo final. Com
+      'partial_fit' nunca é: cada amostra passou por uma única época
+    """
+    X_train = np.asarray(X_train)
+    X_test = np.asarray(X_test)
+    y_train = np.asarray(y_train).ravel()
+    y_test = np.asarray(y_test).ravel()
+    # round: 0.2 + 16 * 0.05 dá 0.9999999999999998, e int() perderia a última linha
+    sizes = [min(int(round(p * len(X_train))), len(X_train)) for p in percents]
+    strategy = resolve_strategy(model, strategy)
+
+    train_metrics, test_metrics = [], []
+    if strategy == 'parallel':
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_fraction)(clone(model), X_train, y_train, X_test, y_test, n, i == len(sizes) - 1)
+            for i, n in enumerate(sizes)
+        )
+        for train_m, test_m, fitted in results:
+            train_metrics.append(train_m)
+            test_metrics.append(test_m)
+        model = results[-1][2]
+    elif strategy in ('partial_fit', 'warm_start'):
+        model = clone(model)
+        if strategy == 'warm_start':
+            model.set_params(warm_start=True)
+        classes = np.unique(y_train)
+        n_seen = 0
+        for n in sizes:
+            if strategy == 'partial_fit':
+                if n > n_seen:
+                    model.partial_fit(X_train[n_seen:n], y_train[n_seen:n], classes=classes)
+                n_seen = n
+            else:
+                model.fit(X_train[:n], y_train[:n])
+            train_m, test_m = _score_fraction(model, X_train, y_train, X_test, y_test, n)
+            train_metrics.append(train_m)
+            test_metrics.append(test_m)
+    else:
+        raise ValueError("Invalid strategy. Use 'auto', 'partial_fit', 'warm_start' or 'parallel'.")
+
+    return {
+        'train_metrics': train_metrics,
+        'test_metrics': test_metrics,
+        'sizes': sizes,
+        'strategy': strategy,
+        'model': model,
+        'full_fit': strategy != 'partial_fit' and sizes[-1] == len(X_train),
+    }
@@ -1,19 +1,23 @@
 import numpy as np
-from math import sqrt
 from sklearn.base import BaseEstimator, ClassifierMixin #type:ignore
 from sklearn.utils.validation import check_array #type:ignore
+from sklearn.exceptions import ConvergenceWarning #type:ignore
+from sklearn.neighbors import KDTree, BallTree #type:ignore
 from numpy.random import default_rng
+import warnings
+from . import lvq_numba
+from . import profiling
 
 
 # --- Distâncias suportadas ---
 def euclidean_distance(row1, row2):
-    return np.linalg.norm(row1[:-1] - row2[:-1])
+    return np.linalg.norm(row1 - row2)
 
 def manhattan_distance(row1, row2):
-    return np.sum(np.abs(row1[:-1] - row2[:-1]))
+    return np.sum(np.abs(row1 - row2))
 
 def chebyshev_distance(row1, row2):
-    return np.max(np.abs(row1[:-1] - row2[:-1]))
+    return np.max(np.abs(row1 - row2))
 
 def get_distance_function(name):
     if name == 'euclidean':
@@ -26,106 +30,861 @@ def get_distance_function(name):
         raise ValueError(f"Unsupported distance metric: {name}")
 
 
+# --- Distâncias vetorizadas (lote de amostras x todos os codebooks) ---
+# Retornam uma matriz (n_amostras, n_codebooks). Para uma única amostra, basta passar X[None, :].
+# A soma é feita feature a feature, no dtype dos dados, na mesma ordem dos
+# kernels de `utils.lvq_numba`, então os dois backends dão resultados
+# idênticos bit a bit; de quebra não se aloca o temporário (n, k, features).
+SMALL_REDUCTION = 1024
+
+def _reduce_features(X, prototypes, metric):
+    # `prototypes`: (1 ou n_amostras, n_codebooks, n_features)
+    shape = np.broadcast_shapes((len(X), 1), prototypes.shape[:2])
+    if shape[0] * shape[1] <= SMALL_REDUCTION:
+        # Poucos pares (ex. treino online): uma passada só; o cumsum soma na
+        # mesma ordem sequencial do laço abaixo, sem o custo do laço em Python
+        diff = X[:, None, :] - prototypes
+        if metric == 'euclidean':
+            return np.sqrt(np.cumsum(diff * diff, axis=-1)[..., -1])
+        elif metric == 'manhattan':
+            return np.cumsum(np.abs(diff), axis=-1)[..., -1]
+        return np.abs(diff).max(axis=-1)
+    acc = np.zeros(shape, dtype=np.result_type(X, prototypes))
+    for k in range(X.shape[1]):
+        diff = X[:, None, k] - prototypes[:, :, k]
+        if metric == 'euclidean':
+            acc += diff * diff
+        elif metric == 'manhattan':
+            acc += np.abs(diff)
+        else:
+            np.maximum(acc, np.abs(diff), out=acc)
+    return np.sqrt(acc) if metric == 'euclidean' else acc
+
+def euclidean_distances(X, prototypes):
+    return _reduce_features(X, prototypes[None], 'euclidean')
+
+def manhattan_distances(X, prototypes):
+    return _reduce_features(X, prototypes[None], 'manhattan')
+
+def chebyshev_distances(X, prototypes):
+    return _reduce_features(X, prototypes[None], 'chebyshev')
+
+def get_pairwise_distance_function(name):
+    if name == 'euclidean':
+        return euclidean_distances
+    elif name == 'manhattan':
+        return manhattan_distances
+    elif name == 'chebyshev':
+        return chebyshev_distances
+    else:
+        raise ValueError(f"Unsupported distance metric: {name}")
+
+
+# --- Tamanho dos blocos ---
+# Limite de memória dos temporários de um bloco de X; o pior caso é o
+# (linhas, protótipos, features), então o número de linhas sai dele
+CHUNK_BYTES = 64 * 2**20
+
+def chunk_rows(n_prototypes, n_features, itemsize, chunk_size=None, budget=None):
+    """Linhas por bloco que cabem em `budget` bytes (padrão `CHUNK_BYTES`), limitadas a `chunk_size`."""
+    budget = CHUNK_BYTES if budget is None else budget
+    rows = max(1, budget // max(1, n_prototypes * n_features * itemsize))
+    return rows if chunk_size is None else max(1, min(chunk_size, rows))
+
+
 # --- Seleção do Best Matching Unit ---
-def get_best_matching_unit(codebooks, test_row, distance_fn):
-    distances = np.array([distance_fn(codebook, test_row) for codebook in codebooks])
-    return codebooks[np.argmin(distances)]
+def get_best_matching_unit(prototypes, test_row, distance_fn):
+    distances = np.array([distance_fn(prototype, test_row) for prototype in prototypes])
+    return np.argmin(distances)
+
+def nearest_prototypes(prototypes, X, distance_fn, prototype_labels=None, n_classes=None, chunk_size=4096):
+    """
+    Busca em lote do BMU de cada linha de X.
+
+    Processa X em blocos para limitar a memória das distâncias: o número de
+    linhas sai de `CHUNK_BYTES` (ver `chunk_rows`), no máximo `chunk_size`.
+    Retorna os índices dos vencedores, a distância de cada amostra até o
+    seu vencedor e, se `prototype_labels` for informado, a menor distância
+    de cada amostra a cada classe (n_amostras, n_classes), calculada a
+    partir do mesmo bloco de distâncias.
+    """
+    n_samples = len(X)
+    winners = np.empty(n_samples, dtype=np.intp)
+    distances = np.empty(n_samples, dtype=np.float64)
+    class_distances = None
+    if prototype_labels is not None:
+        class_distances = np.full((n_samples, n_classes), np.inf)
+        class_masks = [prototype_labels == c for c in range(n_classes)]
+
+    rows = chunk_rows(len(prototypes), prototypes.shape[1], np.result_type(X, prototypes).itemsize, chunk_size)
+    for start in range(0, n_samples, rows):
+        stop = start + rows
+        block = distance_fn(X[start:stop], prototypes)
+        winners[start:stop] = np.argmin(block, axis=1)
+        distances[start:stop] = block[np.arange(len(block)), winners[start:stop]]
+        if class_distances is not None:
+            for c, mask in enumerate(class_masks):
+                if mask.any():
+                    class_distances[start:stop, c] = block[:, mask].min(axis=1)
+    return winners, distances, class_distances
+
+def best_matching_units(prototypes, X, distance_fn, chunk_size=4096):
+    winners, distances, _ = nearest_prototypes(prototypes, X, distance_fn, chunk_size=chunk_size)
+    return winners, distances
+
+# --- Índice espacial sobre os protótipos ---
+# Com poucos protótipos a varredura completa (`nearest_prototypes`) é mais
+# rápida; em 14 features o índice empata por volta de 32 protótipos
+INDEX_THRESHOLD = 64
+
+def _candidate_distances(X, candidates, metric):
+    # Mesmas operações das distâncias vetorizadas, para (amostra, candidatos da amostra)
+    return _reduce_features(X, candidates, metric)
+
+def _first_closest(distances, indices):
+    # Menor distância; em empate, o menor índice (como o np.argmin da varredura)
+    best = distances.min(axis=1)
+    winners = np.where(distances == best[:, None], indices, np.iinfo(np.intp).max).min(axis=1)
+    return winners, best
+
+class PrototypeIndex:
+    """
+    KD-tree ou ball tree (sklearn.neighbors) sobre os protótipos, uma árvore
+    por classe, para a busca do BMU com muitos protótipos.
+
+    O resultado é idêntico ao de `nearest_prototypes`: a árvore só propõe os
+    `n_candidates` protótipos mais próximos de cada classe, cujas distâncias
+    são recalculadas com as mesmas operações da varredura, e o empate é
+    resolvido pelo menor índice. Se o último candidato estiver empatado com
+    o melhor (pode haver mais empates fora da lista), a amostra é resolvida
+    por varredura completa daquela classe.
+
+    Parâmetros:
+    - prototypes, prototype_labels, n_classes: como em `nearest_prototypes`
+    - metric: 'euclidean', 'manhattan' ou 'chebyshev'
+    - algorithm: 'kd_tree' ou 'ball_tree'
+    """
+
+    def __init__(self, prototypes, prototype_labels, n_classes, metric, algorithm='kd_tree', leaf_size=40,
+                 n_candidates=4):
+        if algorithm not in ('kd_tree', 'ball_tree'):
+            raise ValueError("Invalid algorithm. Use 'kd_tree' or 'ball_tree'.")
+        tree_class = KDTree if algorithm == 'kd_tree' else BallTree
+        self.prototypes = prototypes
+        self.n_classes = n_classes
+        self.metric = metric
+        self.algorithm = algorithm
+        self.n_candidates = n_candidates
+        # Protótipos repetidos (ex. início 'stratified_mean') nunca vencem a
+        # primeira cópia, então só ela entra na árvore
+        self.members = []
+        for c in range(n_classes):
+            idx = np.flatnonzero(prototype_labels == c)
+            _, first = np.unique(prototypes[idx], axis=0, return_index=True)
+            self.members.append(idx[np.sort(first)])
+        self.trees = [
+            tree_class(prototypes[idx], leaf_size=leaf_size, metric=metric) if len(idx) else None
+            for idx in self.members
+        ]
+
+    def _query_class(self, X, c):
+        idx = self.members[c]
+        k = min(self.n_candidates, len(idx))
+        tree_distances, local = self.trees[c].query(X, k=k)
+        candidates = idx[local]
+        winners, best = _first_closest(_candidate_distances(X, self.prototypes[candidates], self.metric), candidates)
+
+        if k < len(idx):
+            # Candidatos além de k podem empatar (ou diferir só por arredondamento)
+            tol = 64 * np.finfo(best.dtype).eps
+            unsure = np.flatnonzero(tree_distances[:, -1] <= best * (1 + tol) + tol)
+            if len(unsure):
+                full = np.broadcast_to(idx, (len(unsure), len(idx)))
+                winners[unsure], best[unsure] = _first_closest(
+                    _candidate_distances(X[unsure], self.prototypes[full], self.metric), full
+                )
+        return winners, best
+
+    def query(self, X, chunk_size=4096):
+        """Mesmo retorno de `nearest_prototypes`: vencedores, distâncias e menor distância por classe."""
+        n_samples = len(X)
+        # Limite pela varredura completa de uma classe, o pior caso de `_query_class`
+        rows = chunk_rows(len(self.prototypes), self.prototypes.shape[1],
+                          np.result_type(X, self.prototypes).itemsize, chunk_size)
+        winners = np.empty(n_samples, dtype=np.intp)
+        distances = np.empty(n_samples, dtype=np.float64)
+        class_distances = np.full((n_samples, self.n_classes), np.inf)
+        class_winners = np.full((n_samples, self.n_classes), np.iinfo(np.intp).max)
+
+        for start in range(0, n_samples, rows):
+            stop = start + rows
+            for c, tree in enumerate(self.trees):
+                if tree is not None:
+                    class_winners[start:stop, c], class_distances[start:stop, c] = self._query_class(X[start:stop], c)
+            winners[start:stop], distances[start:stop] = _first_closest(
+                class_distances[start:stop], class_winners[start:stop]
+            )
+        return winners, distances, class_distances
+
+def build_prototype_index(prototypes, prototype_labels, n_classes, metric, algorithm='auto', leaf_size=40):
+    """
+    `PrototypeIndex` para os protótipos, ou None quando a varredura completa
+    é a melhor opção.
+
+    Com `algorithm='auto'` o índice só é criado a partir de INDEX_THRESHOLD
+    protótipos, com KD-tree até 16 features e ball tree acima disso.
+    """
+    if algorithm == 'brute':
+        return None
+    if algorithm == 'auto':
+        if len(prototypes) < INDEX_THRESHOLD:
+            return None
+        algorithm = 'kd_tree' if prototypes.shape[1] <= 16 else 'ball_tree'
+    return PrototypeIndex(prototypes, prototype_labels, n_classes, metric, algorithm, leaf_size)
+
+def relative_distance_proba(class_distances):
+    """
+    Converte as menores distâncias por classe em probabilidades.
+
+    Para cada classe c usa a distância relativa
+    mu_c = (d_c - d_outra) / (d_c + d_outra), onde d_outra é a menor distância
+    às demais classes, e normaliza (1 - mu_c) / 2. No caso binário isso
+    equivale a p_1 = d_0 / (d_0 + d_1).
+    """
+    n_classes = class_distances.shape[1]
+    if n_classes == 1:
+        return np.ones_like(class_distances)
+
+    # Menor distância às outras classes: a menor geral, exceto para a própria
+    # classe vencedora, que usa a segunda menor
+    order = np.argsort(class_distances, axis=1)
+    rows = np.arange(len(class_distances))
+    first = class_distances[rows, order[:, 0]]
+    second = class_distances[rows, order[:, 1]]
+    other = np.where(order[:, [0]] == np.arange(n_classes), second[:, None], first[:, None])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mu = (class_distances - other) / (class_distances + other)
+    mu = np.where(np.isinf(class_distances), 1.0, mu)  # classe sem protótipos
+    mu = np.nan_to_num(mu, nan=0.0)                    # empate em distância zero
+
+    scores = (1.0 - mu) / 2.0
+    return scores / scores.sum(axis=1, keepdims=True)
 
 
 # --- Estratégias de Inicialização ---
-def random_codebook(train, rng):
-    n_records = len(train)
-    return train[rng.integers(0, n_records)].copy()
-
-def stratified_mean_codebooks(train, n_codebooks, rng):
-    labels = np.unique(train[:, -1])
-    codebooks = []
-    per_class = n_codebooks // len(labels)
-    for label in labels:
-        class_samples = train[train[:, -1] == label]
-        for _ in range(per_class):
-            mean_vector = class_samples[:, :-1].mean(axis=0)
-            codebook = np.append(mean_vector, label)
-            codebooks.append(codebook)
-    while len(codebooks) < n_codebooks:
-        codebooks.append(random_codebook(train, rng))  # completa caso divisão não seja exata
-    return np.array(codebooks)
+# Os rótulos são índices inteiros em `classes_` (0..n_classes-1); cada
+# estratégia retorna a matriz de protótipos e o vetor de rótulos.
+def random_codebooks(X, labels, n_codebooks, rng):
+    n_records = len(X)
+    idx = np.array([rng.integers(0, n_records) for _ in range(n_codebooks)], dtype=np.intp)
+    return X[idx].copy(), labels[idx].copy()
+
+def stratified_mean_codebooks(X, labels, n_codebooks, rng):
+    n_classes = labels.max() + 1
+    per_class = n_codebooks // n_classes
+    means = np.array([X[labels == label].mean(axis=0) for label in range(n_classes)], dtype=X.dtype)
+    prototypes = np.repeat(means, per_class, axis=0)
+    prototype_labels = np.repeat(np.arange(n_classes), per_class)
+    missing = n_codebooks - len(prototypes)
+    if missing > 0:  # completa caso divisão não seja exata
+        extra, extra_labels = random_codebooks(X, labels, missing, rng)
+        prototypes = np.concatenate((prototypes, extra))
+        prototype_labels = np.concatenate((prototype_labels, extra_labels))
+    return prototypes, prototype_labels
 
 
 # --- Treinamento dos Codebooks ---
-def train_codebooks(train, n_codebooks, lrate, epochs, init_strategy, distance_fn, rng):
+def init_codebooks(X, labels, n_codebooks, init_strategy, rng):
     if init_strategy == 'random':
-        codebooks = np.array([random_codebook(train, rng) for _ in range(n_codebooks)])
+        return random_codebooks(X, labels, n_codebooks, rng)
     elif init_strategy == 'stratified_mean':
-        codebooks = stratified_mean_codebooks(train, n_codebooks, rng)
+        return stratified_mean_codebooks(X, labels, n_codebooks, rng)
     else:
         raise ValueError("Invalid init_strategy. Use 'random' or 'stratified_mean'.")
 
-    for epoch in range(epochs):
-        rate = lrate * (1.0 - (epoch / float(epochs)))
-        for row in train:
-            bmu = get_best_matching_unit(codebooks, row, distance_fn)
-            for i in range(len(row) - 1):
-                error = row[i] - bmu[i]
-                if bmu[-1] == row[-1]:
-                    bmu[i] += rate * error
-                else:
-                    bmu[i] -= rate * error
-    return codebooks
+def _online_epoch(features, labels, prototypes, prototype_labels, rate, distance_fn):
+    # LVQ1 clássico: uma amostra por vez, na ordem do dataset
+    for x, label in zip(features, labels):
+        winner = np.argmin(distance_fn(x[None, :], prototypes)[0])
+        if prototype_labels[winner] == label:
+            prototypes[winner] += rate * (x - prototypes[winner])
+        else:
+            prototypes[winner] -= rate * (x - prototypes[winner])
+
+def _minibatch_epoch(features, labels, prototypes, prototype_labels, rate, distance_fn, batch_size):
+    # Os vencedores do lote são calculados com os codebooks do início do lote;
+    # cada protótipo recebe a média dos passos LVQ1 das amostras que venceu.
+    for start in range(0, len(features), batch_size):
+        xb = features[start:start + batch_size]
+        winners = np.argmin(distance_fn(xb, prototypes), axis=1)
+        sign = np.where(prototype_labels[winners] == labels[start:start + batch_size], 1.0, -1.0)
+        steps = sign[:, None] * (xb - prototypes[winners])
+
+        update = np.zeros_like(prototypes)
+        np.add.at(update, winners, steps)
+        counts = np.bincount(winners, minlength=len(prototypes))
+        hit = counts > 0
+        prototypes[hit] += rate * update[hit] / counts[hit, None]
+
+def learning_rate(lrate, epoch, epochs):
+    # Decaimento linear; depois de `epochs` épocas (ex. em partial_fit)
+    # permanece na taxa da última época em vez de zerar
+    return lrate * (1.0 - (min(epoch, epochs - 1) / float(epochs)))
+
+def run_epoch(X, labels, prototypes, prototype_labels, rate, distance_fn, batch_size=None,
+              online_epoch=_online_epoch):
+    # Taxa no dtype dos protótipos: em float32 os passos não sobem para float64
+    rate = prototypes.dtype.type(rate)
+    if batch_size is None:
+        online_epoch(X, labels, prototypes, prototype_labels, rate, distance_fn)
+    else:
+        _minibatch_epoch(X, labels, prototypes, prototype_labels, rate, distance_fn, batch_size)
+
+def train_codebooks(X, labels, n_codebooks, lrate, epochs, init_strategy, distance_fn, rng, batch_size=None,
+                    online_epoch=_online_epoch):
+    """
+    Treina os codebooks com LVQ1.
+
+    `labels` são os índices inteiros das classes de cada linha de X.
+    `distance_fn` é uma função vetorizada (ver `get_pairwise_distance_function`).
+    Com `batch_size=None` o treino é online, amostra a amostra, e reproduz
+    exatamente a implementação original para o mesmo `rng`; com um inteiro,
+    usa o modo mini-batch. `online_epoch` permite trocar a época online
+    por um kernel compilado (ver `utils.lvq_numba`).
+
+    Retorna a matriz contígua de protótipos e o vetor de rótulos.
+    """
+    with profiling.span('init_codebooks', cat='lvq', strategy=init_strategy):
+        prototypes, prototype_labels = init_codebooks(X, labels, n_codebooks, init_strategy, rng)
+        prototypes = np.ascontiguousarray(prototypes)
+
+    with profiling.span('train', cat='lvq', epochs=epochs, batch_size=batch_size):
+        for epoch in range(epochs):
+            rate = learning_rate(lrate, epoch, epochs)
+            run_epoch(X, labels, prototypes, prototype_labels, rate, distance_fn, batch_size, online_epoch)
+    return prototypes, prototype_labels
+
+
+def resolve_backend(backend):
+    if backend == 'numpy':
+        return 'numpy'
+    elif backend == 'numba':
+        if not lvq_numba.NUMBA_AVAILABLE:
+            warnings.warn("numba is not installed; falling back to the NumPy backend.")
+            return 'numpy'
+        return 'numba'
+    else:
+        raise ValueError("Invalid backend. Use 'numpy' or 'numba'.")
 
 
 # --- Classificador LVQ ---
 class LVQClassifier(BaseEstimator, ClassifierMixin):
     def __init__(self, n_codebooks=10, lrate=0.1, epochs=100,
                  init_strategy='random', distance_metric='euclidean',
+                 batch_size=None, chunk_size=4096, backend='numpy', algorithm='auto', leaf_size=40,
                  random_state=None):
         self.n_codebooks = n_codebooks
         self.lrate = lrate
         self.epochs = epochs
         self.init_strategy = init_strategy
         self.distance_metric = distance_metric
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.backend = backend
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
         self.random_state = random_state
 
     def fit(self, X, y):
-        X = check_array(X)
-        y = np.array(y)
-        train = np.column_stack((X, y))
+        with profiling.span('fit', cat='lvq', n_samples=len(X), metric=self.distance_metric):
+            X = check_array(X, dtype=[np.float64, np.float32])
+            self.classes_, labels = np.unique(np.asarray(y).ravel(), return_inverse=True)
+            self._init_state()
 
+            self.prototypes_, self.prototype_labels_ = train_codebooks(
+                X,
+                labels,
+                self.n_codebooks,
+                self.lrate,
+                self.epochs,
+                self.init_strategy,
+                self.distance_fn_,
+                self.rng_,
+                self.batch_size,
+                self._online_epoch_fn()
+            )
+            self._build_index()
+        self.n_epochs_ = self.epochs
+        return self
+
+    def partial_fit(self, X, y, classes=None):
+        """
+        Executa uma época de LVQ1 sobre (X, y) mantendo o estado anterior.
+
+        Na primeira chamada os protótipos são inicializados com este lote e
+        `classes` (se informado) define todas as classes possíveis. A taxa de
+        aprendizado segue o mesmo decaimento linear de `fit`, contado em
+        chamadas: `epochs` chamadas com os mesmos dados equivalem a um `fit`.
+        Depois disso a taxa fica fixa no valor da última época.
+        """
+        X = check_array(X, dtype=[np.float64, np.float32])
+        y = np.asarray(y).ravel()
+
+        first_call = not hasattr(self, 'prototypes_')
+        if first_call:
+            self.classes_ = np.unique(y) if classes is None else np.unique(classes)
+            self._init_state()
+        else:
+            X = X.astype(self.prototypes_.dtype, copy=False)
+
+        if not np.isin(y, self.classes_).all():
+            raise ValueError("y contains labels not present in classes.")
+        labels = np.searchsorted(self.classes_, y)
+
+        if first_call:
+            if self.init_strategy == 'stratified_mean' and len(np.unique(labels)) < len(self.classes_):
+                raise ValueError("The first partial_fit batch must contain every class "
+                                 "when init_strategy='stratified_mean'.")
+            prototypes, self.prototype_labels_ = init_codebooks(
+                X, labels, self.n_codebooks, self.init_strategy, self.rng_
+            )
+            self.prototypes_ = np.ascontiguousarray(prototypes)
+            self.n_epochs_ = 0
+
+        rate = learning_rate(self.lrate, self.n_epochs_, self.epochs)
+        with profiling.span('partial_fit', cat='lvq', n_samples=len(X), epoch=self.n_epochs_):
+            run_epoch(
+                X,
+                labels,
+                self.prototypes_,
+                self.prototype_labels_,
+                rate,
+                self.distance_fn_,
+                self.batch_size,
+                self._online_epoch_fn()
+            )
+            self._build_index()
+        self.n_epochs_ += 1
+        return self
+
+    def _init_state(self):
         self.rng_ = default_rng(self.random_state)
-        self.distance_fn_ = get_distance_function(self.distance_metric)
-
-        self.codebooks_ = train_codebooks(
-            train,
-            self.n_codebooks,
-            self.lrate,
-            self.epochs,
-            self.init_strategy,
-            self.distance_fn_,
-            self.rng_
+        self.distance_fn_ = get_pairwise_distance_function(self.distance_metric)
+        self.backend_ = resolve_backend(self.backend)
+
+    def _build_index(self):
+        # Índice espacial para o BMU (ver `build_prototype_index`); None = varredura
+        with profiling.span('build_index', cat='lvq', n_prototypes=len(self.prototypes_)):
+            self.index_ = build_prototype_index(
+                self.prototypes_,
+                self.prototype_labels_,
+                len(self.classes_),
+                self.distance_metric,
+                self.algorithm,
+                self.leaf_size
+            )
+
+    def _online_epoch_fn(self):
+        if self.backend_ == 'numba':
+            return lvq_numba.make_online_epoch(self.distance_metric)
+        return _online_epoch
+
+    @property
+    def codebooks_(self):
+        # Layout antigo: features + rótulo como última coluna float
+        return np.column_stack((self.prototypes_, self.classes_[self.prototype_labels_]))
+
+    def __setstate__(self, state):
+        # Modelos serializados antes da separação entre protótipos e rótulos
+        codebooks = state.pop('codebooks_', None)
+        if codebooks is not None and 'prototypes_' not in state:
+            state['classes_'], state['prototype_labels_'] = np.unique(codebooks[:, -1], return_inverse=True)
+            state['prototypes_'] = np.ascontiguousarray(codebooks[:, :-1])
+            state['distance_fn_'] = get_pairwise_distance_function(state.get('distance_metric', 'euclidean'))
+        state.setdefault('batch_size', None)
+        state.setdefault('chunk_size', 4096)
+        state.setdefault('backend', 'numpy')
+        state.setdefault('backend_', 'numpy')
+        state.setdefault('algorithm', 'auto')
+        state.setdefault('leaf_size', 40)
+        state.setdefault('index_', None)
+        if 'prototypes_' in state:
+            state.setdefault('n_epochs_', state.get('epochs', 100))
+        super().__setstate__(state)
+
+    def _bmu(self, X):
+        with profiling.span('bmu', cat='lvq', n_samples=len(X), metric=self.distance_metric):
+            X = check_array(X, dtype=self.prototypes_.dtype)
+            if self.index_ is not None:
+                return self.index_.query(X, self.chunk_size)
+            if self.backend_ == 'numba':
+                return lvq_numba.nearest_prototypes(
+                    self.prototypes_,
+                    X,
+                    self.distance_metric,
+                    self.prototype_labels_,
+                    len(self.classes_)
+                )
+            return nearest_prototypes(
+                self.prototypes_,
+                X,
+                self.distance_fn_,
+                self.prototype_labels_,
+                len(self.classes_),
+                self.chunk_size
+            )
+
+    def predict(self, X):
+        winners, _, _ = self._bmu(X)
+        return self.classes_[self.prototype_labels_[winners]]
+
+    def predict_proba(self, X):
+        _, _, class_distances = self._bmu(X)
+        return relative_distance_proba(class_distances)
+
+    def decision_function(self, X):
+        _, distances, _ = self._bmu(X)
+        return distances
+
+
+# --- GLVQ / GMLVQ ---
+# Custo de Sato & Yamada: para cada amostra, mu = (d+ - d-) / (d+ + d-), com
+# d+ a distância ao protótipo mais próximo da classe correta e d- ao mais
+# próximo das demais; o custo é a média de f(mu). Custo e gradiente são
+# calculados para todas as amostras de uma vez, com produtos de matrizes.
+def _sigmoid(z):
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+# Funções de módulo (f(mu, beta), f'(mu, beta)), não closures: o estimador
+# guarda só o nome e continua serializável com pickle/joblib
+def _identity(mu, beta):
+    return mu
+
+def _identity_gradient(mu, beta):
+    return np.ones_like(mu)
+
+def _sigmoid_activation(mu, beta):
+    return _sigmoid(beta * mu)
+
+def _sigmoid_gradient(mu, beta):
+    s = _sigmoid(beta * mu)
+    return beta * s * (1.0 - s)
+
+def _soft_plus(mu, beta):
+    return np.logaddexp(0.0, beta * mu)
+
+def _soft_plus_gradient(mu, beta):
+    return beta * _sigmoid(beta * mu)
+
+def _swish(mu, beta):
+    return mu * _sigmoid(beta * mu)
+
+def _swish_gradient(mu, beta):
+    s = _sigmoid(beta * mu)
+    return s + beta * mu * s * (1.0 - s)
+
+GLVQ_ACTIVATIONS = {
+    'identity': (_identity, _identity_gradient),
+    'sigmoid': (_sigmoid_activation, _sigmoid_gradient),
+    'soft+': (_soft_plus, _soft_plus_gradient),
+    'swish': (_swish, _swish_gradient),
+}
+
+def glvq_activation(name):
+    """Retorna (f, f'), funções de (mu, beta), da ativação aplicada a mu."""
+    if name not in GLVQ_ACTIVATIONS:
+        raise ValueError("Invalid activation_type. Use 'identity', 'sigmoid', 'soft+' or 'swish'.")
+    return GLVQ_ACTIVATIONS[name]
+
+def squared_euclidean_distances(X, prototypes):
+    # ||x||² - 2 x·w + ||w||²: um produto de matrizes em vez do tensor (n, k, d)
+    D = (X * X).sum(axis=1)[:, None] - 2.0 * X @ prototypes.T + (prototypes * prototypes).sum(axis=1)[None, :]
+    return np.maximum(D, 0.0)
+
+def _closest_pairs(D, labels, prototype_labels):
+    # Índices e distâncias do protótipo mais próximo da classe correta (+) e
+    # do mais próximo das outras classes (-)
+    rows = np.arange(len(D))
+    same = labels[:, None] == prototype_labels[None, :]
+    plus = np.argmin(np.where(same, D, np.inf), axis=1)
+    minus = np.argmin(np.where(same, np.inf, D), axis=1)
+    return rows, plus, minus, D[rows, plus], D[rows, minus]
+
+def glvq_cost_gradient(prototypes, omega, X, labels, prototype_labels, squared=True, activation='identity',
+                       beta=1.0):
+    """
+    Custo GLVQ médio e gradientes em relação aos protótipos e a omega.
+
+    A distância é ||omega (x - w)||² (`omega=None` equivale à identidade,
+    ou seja, GLVQ) ou a sua raiz com `squared=False`. `activation` é um
+    nome de `GLVQ_ACTIVATIONS`, com inclinação `beta`.
+
+    Retorna (custo, gradiente dos protótipos, gradiente de omega ou None).
+    """
+    f, f_prime = glvq_activation(activation)
+    X_t, W_t = (X, prototypes) if omega is None else (X @ omega.T, prototypes @ omega.T)
+    S = squared_euclidean_distances(X_t, W_t)
+    D = S if squared else np.sqrt(S)
+
+    rows, plus, minus, d_plus, d_minus = _closest_pairs(D, labels, prototype_labels)
+    total = d_plus + d_minus + 1e-12
+    mu = (d_plus - d_minus) / total
+    n = len(X)
+    cost = f(mu, beta).mean()
+
+    # dC/dd+ e dC/dd-, levados à distância quadrada quando d = sqrt(s)
+    scale = f_prime(mu, beta) * 2.0 / (total * total * n)
+    a_plus, a_minus = scale * d_minus, -scale * d_plus
+    if not squared:
+        a_plus = a_plus / (2.0 * d_plus + 1e-12)
+        a_minus = a_minus / (2.0 * d_minus + 1e-12)
+
+    # ds/dw = -2 Λ (x - w): soma por protótipo como C^T X - (C^T 1) W
+    # (plus e minus nunca coincidem, são de classes diferentes)
+    C = np.zeros_like(S)
+    C[rows, plus] = a_plus
+    C[rows, minus] = a_minus
+    P = C.T @ X - C.sum(axis=0)[:, None] * prototypes
+    if omega is None:
+        return cost, -2.0 * P, None
+    grad_prototypes = -2.0 * (P @ omega.T) @ omega
+
+    # ds/dΩ = 2 Ω (x - w)(x - w)ᵀ, só para os dois protótipos de cada amostra
+    diff_plus, diff_minus = X - prototypes[plus], X - prototypes[minus]
+    M = (diff_plus * a_plus[:, None]).T @ diff_plus + (diff_minus * a_minus[:, None]).T @ diff_minus
+    return cost, grad_prototypes, 2.0 * omega @ M
+
+
+class GLVQClassifier(BaseEstimator, ClassifierMixin):
+    """
+    Generalized LVQ (Sato & Yamada, 1996) com custo e gradiente vetorizados.
+
+    Os nomes de `distance_type`, `activation_type` e `solver_type` seguem o
+    `sklvq.models.GLVQ`, então a mesma grade de busca serve aos dois
+    (exceto o solver 'wgd', que não existe aqui).
+
+    Parâmetros:
+    - prototypes_per_class: protótipos por classe, iniciados na média da classe
+    - distance_type: 'squared-euclidean' ou 'euclidean'
+    - activation_type: 'identity', 'sigmoid', 'soft+' ou 'swish' (inclinação `beta`)
+    - solver_type: 'lbfgs' ou 'bfgs' (scipy.optimize, lote completo), 'sgd' ou 'adam' (mini-batch)
+    - max_iter: iterações (lbfgs/bfgs) ou épocas (sgd/adam); padrão 2500 e 100
+    - batch_size: tamanho do mini-batch de sgd/adam
+    - step_size: taxa de aprendizado de sgd/adam; padrão 0.1 e 0.01
+    - tol: tolerância de parada (gradiente no lbfgs/bfgs, melhora relativa do custo por época em sgd/adam)
+    """
+
+    def __init__(self, prototypes_per_class=1, distance_type='squared-euclidean', activation_type='identity',
+                 beta=1.0, solver_type='lbfgs', max_iter=None, batch_size=256, step_size=None, tol=1e-5,
+                 random_state=None):
+        self.prototypes_per_class = prototypes_per_class
+        self.distance_type = distance_type
+        self.activation_type = activation_type
+        self.beta = beta
+        self.solver_type = solver_type
+        self.max_iter = max_iter
+        self.batch_size = batch_size
+        self.step_size = step_size
+        self.tol = tol
+        self.random_state = random_state
+
+    # --- Parâmetros treináveis (protótipos e, no GMLVQ, omega) ---
+    def _squared(self):
+        if self.distance_type not in ('squared-euclidean', 'euclidean'):
+            raise ValueError("Invalid distance_type. Use 'squared-euclidean' or 'euclidean'.")
+        return self.distance_type == 'squared-euclidean'
+
+    def _init_params(self, X, labels, rng):
+        n_classes = len(self.classes_)
+        means = np.array([X[labels == c].mean(axis=0) for c in range(n_classes)])
+        prototypes = np.repeat(means, self.prototypes_per_class, axis=0)
+        if self.prototypes_per_class > 1:
+            # Protótipos da mesma classe precisam começar em pontos diferentes
+            prototypes += rng.normal(0.0, 0.01, prototypes.shape) * X.std(axis=0)
+        self.prototype_labels_ = np.repeat(np.arange(n_classes), self.prototypes_per_class)
+        return [prototypes]
+
+    def _cost_gradient(self, params, X, labels):
+        cost, grad_prototypes, _ = glvq_cost_gradient(
+            params[0], None, X, labels, self.prototype_labels_, self._squared(), self.activation_type, self.beta
         )
+        return cost, [grad_prototypes]
+
+    def _set_params(self, params):
+        self.prototypes_ = params[0]
+
+    # --- Treino ---
+    def fit(self, X, y):
+        X = check_array(X, dtype=np.float64)
+        self.classes_, labels = np.unique(np.asarray(y).ravel(), return_inverse=True)
+        if len(self.classes_) < 2:
+            raise ValueError("GLVQ needs at least two classes.")
+        self._squared()
+        glvq_activation(self.activation_type)
+        rng = default_rng(self.random_state)
+
+        with profiling.span('fit', cat='glvq', n_samples=len(X), solver=self.solver_type):
+            params = self._init_params(X, labels, rng)
+            if self.solver_type in ('lbfgs', 'bfgs'):
+                params = self._fit_scipy(params, X, labels)
+            elif self.solver_type in ('sgd', 'adam'):
+                params = self._fit_minibatch(params, X, labels, rng)
+            else:
+                raise ValueError("Invalid solver_type. Use 'lbfgs', 'bfgs', 'sgd' or 'adam'.")
+        self._set_params(params)
         return self
 
+    def _fit_scipy(self, params, X, labels):
+        from scipy.optimize import minimize #type:ignore
+        shapes = [p.shape for p in params]
+        sizes = [p.size for p in params]
+
+        def unpack(theta):
+            return [part.reshape(shape) for part, shape in zip(np.split(theta, np.cumsum(sizes)[:-1]), shapes)]
+
+        def objective(theta):
+            cost, grads = self._cost_gradient(unpack(theta), X, labels)
+            return cost, np.concatenate([g.ravel() for g in grads])
+
+        result = minimize(
+            objective,
+            np.concatenate([p.ravel() for p in params]),
+            jac=True,
+            method='L-BFGS-B' if self.solver_type == 'lbfgs' else 'BFGS',
+            options={'maxiter': self.max_iter or 2500, 'gtol': self.tol},
+        )
+        self.n_iter_ = int(result.nit)
+        self.cost_ = float(result.fun)
+        if not result.success and self.n_iter_ >= (self.max_iter or 2500):
+            warnings.warn(f"GLVQ solver did not converge: {result.message}", ConvergenceWarning)
+        return unpack(result.x)
+
+    def _fit_minibatch(self, params, X, labels, rng):
+        adam = self.solver_type == 'adam'
+        step = self.step_size if self.step_size is not None else (0.01 if adam else 0.1)
+        m = [np.zeros_like(p) for p in params]
+        v = [np.zeros_like(p) for p in params]
+        beta1, beta2, t = 0.9, 0.999, 0
+        previous = np.inf
+        epochs = self.max_iter or 100
+
+        for epoch in range(epochs):
+            order = rng.permutation(len(X))
+            for start in range(0, len(X), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                _, grads = self._cost_gradient(params, X[batch], labels[batch])
+                t += 1
+                for p, g, m_p, v_p in zip(params, grads, m, v):
+                    if adam:
+                        m_p *= beta1
+                        m_p += (1 - beta1) * g
+                        v_p *= beta2
+                        v_p += (1 - beta2) * g * g
+                        p -= step * (m_p / (1 - beta1 ** t)) / (np.sqrt(v_p / (1 - beta2 ** t)) + 1e-8)
+                    else:
+                        p -= step * g
+                params = self._normalize(params)
+
+            cost, _ = self._cost_gradient(params, X, labels)
+            if abs(previous - cost) <= self.tol * max(1.0, abs(cost)):
+                break
+            previous = cost
+        self.n_iter_ = epoch + 1
+        self.cost_ = float(cost)
+        return params
+
+    def _normalize(self, params):
+        return params
+
+    # --- Predição ---
+    def _transform(self, X):
+        return X, self.prototypes_
+
+    def _class_distances(self, X):
+        X = check_array(X, dtype=np.float64)
+        X_t, W_t = self._transform(X)
+        _, _, class_distances = nearest_prototypes(
+            W_t, X_t, squared_euclidean_distances, self.prototype_labels_, len(self.classes_)
+        )
+        return class_distances
+
     def predict(self, X):
-        X = check_array(X)
-        return np.array([
-            get_best_matching_unit(self.codebooks_, row, self.distance_fn_)[-1]
-            for row in X
-        ])
+        return self.classes_[np.argmin(self._class_distances(X), axis=1)]
 
     def predict_proba(self, X):
-        X = check_array(X)
-        probabilities = []
-        for row in X:
-            bmu = get_best_matching_unit(self.codebooks_, row, self.distance_fn_)
-            label = int(bmu[-1])
-            prob = np.zeros(2)
-            prob[label] = 1.0
-            probabilities.append(prob)
-        return np.array(probabilities)
+        return relative_distance_proba(self._class_distances(X))
 
     def decision_function(self, X):
-        X = check_array(X)
-        return np.array([
-            self.distance_fn_(get_best_matching_unit(self.codebooks_, row, self.distance_fn_), row)
-            for row in X
-        ])
+        # Convenção do sklearn: no caso binário, positivo favorece classes_[1]
+        class_distances = self._class_distances(X)
+        if len(self.classes_) == 2:
+            d0, d1 = class_distances[:, 0], class_distances[:, 1]
+            return (d0 - d1) / (d0 + d1 + 1e-12)
+        return -class_distances
+
+
+class GMLVQClassifier(GLVQClassifier):
+    """
+    Generalized Matrix LVQ (Schneider et al., 2009): GLVQ com a distância
+    adaptativa d(x, w) = (x - w)ᵀ Λ (x - w), Λ = ΩᵀΩ, aprendida junto com os
+    protótipos. Ω é normalizada para traço(Λ) = 1.
+
+    Parâmetros (além dos do `GLVQClassifier`, sem `distance_type`):
+    - n_components: número de linhas de Ω (posto de Λ); padrão, o número de features
+
+    Atributos:
+    - omega_: matriz (n_components, n_features)
+    - relevance_matrix_: Λ, cuja diagonal indica a relevância de cada feature
+    """
+
+    def __init__(self, prototypes_per_class=1, n_components=None, activation_type='identity',
+                 beta=1.0, solver_type='lbfgs', max_iter=None, batch_size=256, step_size=None, tol=1e-5,
+                 random_state=None):
+        self.prototypes_per_class = prototypes_per_class
+        self.n_components = n_components
+        self.activation_type = activation_type
+        self.beta = beta
+        self.solver_type = solver_type
+        self.max_iter = max_iter
+        self.batch_size = batch_size
+        self.step_size = step_size
+        self.tol = tol
+        self.random_state = random_state
+
+    def _squared(self):
+        return True
+
+    def _init_params(self, X, labels, rng):
+        prototypes, = super()._init_params(X, labels, rng)
+        n_features = X.shape[1]
+        omega = np.eye(self.n_components or n_features, n_features)
+        return [prototypes, omega / np.linalg.norm(omega)]
+
+    def _cost_gradient(self, params, X, labels):
+        # Custo em função de Ω/||Ω||: invariante à escala de Ω, então os
+        # solvers do scipy não precisam da restrição traço(Λ) = 1
+        prototypes, omega = params
+        norm = np.linalg.norm(omega)
+        unit = omega / norm
+        cost, grad_prototypes, grad_unit = glvq_cost_gradient(
+            prototypes, unit, X, labels, self.prototype_labels_, True, self.activation_type, self.beta
+        )
+        grad_omega = (grad_unit - np.sum(grad_unit * unit) * unit) / norm
+        return cost, [grad_prototypes, grad_omega]
+
+    def _normalize(self, params):
+        prototypes, omega = params
+        return [prototypes, omega / np.linalg.norm(omega)]
+
+    def _set_params(self, params):
+        prototypes, omega = params
+        self.prototypes_ = prototypes
+        self.omega_ = omega / np.linalg.norm(omega)
+
+    @property
+    def relevance_matrix_(self):
+        return self.omega_.T @ self.omega_
+
+    def _transform(self, X):
+        return X @ self.omega_.T, self.prototypes_ @ self.omega_.T
@@ -0,0 +1,110 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba é opcional: sem ele o LVQClassifier usa o caminho NumPy
+    njit = None
+
+NUMBA_AVAILABLE = njit is not None
+
+METRIC_CODES = {'euclidean': 0, 'manhattan': 1, 'chebyshev': 2}
+
+
+def get_metric_code(name):
+    if name not in METRIC_CODES:
+        raise ValueError(f"Unsupported distance metric: {name}")
+    return METRIC_CODES[name]
+
+
+if NUMBA_AVAILABLE:
+
+    # --- Kernels compilados ---
+    @njit(cache=True, inline='always')
+    def _distance(x, prototype, metric):
+        # Acumula no dtype dos dados, feature a feature, como `utils.lvq._reduce_features`
+        acc = x.dtype.type(0)
+        if metric == 0:
+            for k in range(x.shape[0]):
+                d = x[k] - prototype[k]
+                acc += d * d
+            return np.sqrt(acc)
+        elif metric == 1:
+            for k in range(x.shape[0]):
+                acc += abs(x[k] - prototype[k])
+            return acc
+        else:
+            for k in range(x.shape[0]):
+                d = abs(x[k] - prototype[k])
+                if d > acc:
+                    acc = d
+            return acc
+
+    @njit(cache=True)
+    def _online_epoch_kernel(features, labels, prototypes, prototype_labels, rate, metric):
+        # Busca do BMU e atualização LVQ1 fundidas, sem temporários por amostra
+        n_prototypes = prototypes.shape[0]
+        n_features = prototypes.shape[1]
+        for i in range(features.shape[0]):
+            x = features[i]
+            winner = 0
+            best = _distance(x, prototypes[0], metric)
+            for j in range(1, n_prototypes):
+                d = _distance(x, prototypes[j], metric)
+                if d < best:
+                    best = d
+                    winner = j
+            if prototype_labels[winner] == labels[i]:
+                for k in range(n_features):
+                    prototypes[winner, k] += rate * (x[k] - prototypes[winner, k])
+            else:
+                for k in range(n_features):
+                    prototypes[winner, k] -= rate * (x[k] - prototypes[winner, k])
+
+    @njit(cache=True)
+    def _nearest_kernel(X, prototypes, prototype_labels, metric, winners, distances, class_distances):
+        for i in range(X.shape[0]):
+            x = X[i]
+            best = np.inf
+            for j in range(prototypes.shape[0]):
+                d = _distance(x, prototypes[j], metric)
+                if d < best:
+                    best = d
+                    winners[i] = j
+                c = prototype_labels[j]
+                if d < class_distances[i, c]:
+                    class_distances[i, c] = d
+            distances[i] = best
+
+
+def make_online_epoch(metric):
+    """
+    Retorna uma época LVQ1 compilada com a mesma assinatura de
+    `utils.lvq._online_epoch`; o argumento `distance_fn` é ignorado.
+    """
+    metric_code = get_metric_code(metric)
+
+    def online_epoch(features, labels, prototypes, prototype_labels, rate, distance_fn):
+        _online_epoch_kernel(features, labels, prototypes, prototype_labels, rate, metric_code)
+
+    return online_epoch
+
+
+def nearest_prototypes(prototypes, X, metric, prototype_labels, n_classes):
+    """
+    Equivalente compilado de `utils.lvq.nearest_prototypes`. Não aloca a
+    matriz de distâncias, então dispensa o processamento em blocos.
+    """
+    n_samples = len(X)
+    winners = np.zeros(n_samples, dtype=np.intp)
+    distances = np.empty(n_samples, dtype=np.float64)
+    class_distances = np.full((n_samples, n_classes), np.inf)
+    _nearest_kernel(
+        np.ascontiguousarray(X, dtype=prototypes.dtype),
+        prototypes,
+        np.asarray(prototype_labels, dtype=np.intp),
+        get_metric_code(metric),
+        winners,
+        distances,
+        class_distances
+    )
+    return winners, distances, class_distances
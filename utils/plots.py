@@ -1,11 +1,110 @@
+import os
+import re
+import itertools
 import matplotlib.pyplot as plt
 import seaborn as sns
+from matplotlib.collections import LineCollection
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from sklearn.metrics import confusion_matrix, roc_curve, auc
 import collections
 import numpy as np
 
-def plot_distribuicao_classes(distribuicao_classes):
-    plt.figure(figsize=(12, 5))
+from . import profiling
+from .executor import _context
+
+
+# --- Renderização: interativa (plt.show) ou em lote (arquivos) ---
+_renderer = None
+
+def _init_worker():
+    # Workers nunca abrem janelas: backend não interativo e sem figuras herdadas
+    plt.switch_backend("Agg")
+    plt.close("all")
+
+def _render(draw_name, args, kwargs, stem, formats, dpi):
+    fig = globals()[draw_name](*args, **kwargs)
+    paths = []
+    for fmt in formats:
+        path = f"{stem}.{fmt}"
+        fig.savefig(path, format=fmt, dpi=dpi)
+        paths.append(path)
+    plt.close(fig)
+    return paths
+
+
+class FigureRenderer:
+    """
+    Renderiza figuras em arquivos (PNG/SVG) em um pool de processos.
+
+    Enquanto um `FigureRenderer` estiver ativo (ver `batch_rendering`), as
+    funções de plot deste módulo não chamam `plt.show()`: elas preparam os
+    dados, enfileiram a especificação da figura (função de desenho +
+    argumentos) e retornam um `Future` com a lista de arquivos gerados. Os
+    workers usam o backend Agg, então nada bloqueia em servidores sem tela
+    e o desenho sai do caminho crítico da busca.
+    """
+
+    def __init__(self, output_dir="figures", formats=("png",), max_workers=None, dpi=100):
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.dpi = dpi
+        self.futures = []
+        self._counter = itertools.count()
+        os.makedirs(output_dir, exist_ok=True)
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=_context(), initializer=_init_worker)
+
+    def submit(self, draw, args=(), kwargs=None, name=None):
+        slug = re.sub(r"[^\w.-]+", "_", name or draw.__name__.lstrip("_").removeprefix("draw_")).strip("_")
+        stem = os.path.join(self.output_dir, f"{next(self._counter):04d}-{slug}")
+        future = self._pool.submit(_render, draw.__name__, args, kwargs or {}, stem, self.formats, self.dpi)
+        self.futures.append(future)
+        return future
+
+    def wait(self):
+        """Espera as figuras enfileiradas e retorna os caminhos, na ordem de envio."""
+        return [path for future in self.futures for path in future.result()]
+
+    def close(self):
+        paths = self.wait()
+        self._pool.shutdown()
+        return paths
+
+
+def set_renderer(renderer):
+    """Ativa a renderização em lote (`FigureRenderer`) ou volta ao `plt.show()` (None)."""
+    global _renderer
+    _renderer = renderer
+
+@contextmanager
+def batch_rendering(output_dir="figures", formats=("png",), max_workers=None, dpi=100):
+    """
+    Dentro do bloco, os plots viram arquivos renderizados em segundo plano.
+
+    Ao sair, espera todas as figuras e restaura o modo interativo; os
+    caminhos gerados ficam em `renderer.paths`.
+    """
+    renderer = FigureRenderer(output_dir, formats, max_workers, dpi)
+    previous = _renderer
+    set_renderer(renderer)
+    try:
+        yield renderer
+    finally:
+        set_renderer(previous)
+        renderer.paths = renderer.close()
+
+def _emit(draw, *args, name=None, **kwargs):
+    # Modo interativo: desenha e mostra agora; modo em lote: enfileira
+    with profiling.span(draw.__name__.removeprefix('_draw_'), cat='plot', batch=_renderer is not None):
+        if _renderer is None:
+            draw(*args, **kwargs)
+            plt.show()
+            return None
+        return _renderer.submit(draw, args, kwargs, name)
+
+
+def _draw_distribuicao_classes(distribuicao_classes):
+    fig = plt.figure(figsize=(12, 5))
 
     plt.subplot(1, 2, 1)
     distribuicao_classes.plot(kind='bar', color=['skyblue', 'lightcoral'])
@@ -15,74 +114,81 @@ def plot_distribuicao_classes(distribuicao_classes):
     plt.xticks([0, 1], ['Olhos Fechados (0)', 'Olhos Abertos (1)'], rotation=0)
 
     plt.subplot(1, 2, 2)
-    plt.pie(distribuicao_classes.values, labels=['Olhos Fechados (0)', 'Olhos Abertos (1)'], 
+    plt.pie(distribuicao_classes.values, labels=['Olhos Fechados (0)', 'Olhos Abertos (1)'],
             autopct='%1.1f%%', colors=['skyblue', 'lightcoral'])
     plt.title('Distribuição das Classes (Percentual)', fontsize=14, fontweight='bold')
 
     plt.tight_layout()
-    plt.show()
+    return fig
 
-def plotar_comparacao_feature(nome_feature, X, y, X_filtrado, y_filtrado):
-    """
-    Cria um plot com 4 subgráficos comparando a feature antes e depois da filtragem
-    
-    Parâmetros:
-    - nome_feature: nome da feature a ser analisada
-    - X: DataFrame original
-    - y: target original
-    - X_filtrado: DataFrame filtrado
-    - y_filtrado: target filtrado
-    """
-    
-    # Extrair dados da feature
-    dados_original = X[nome_feature]
-    dados_filtrado = X_filtrado[nome_feature]
-    
+def plot_distribuicao_classes(distribuicao_classes):
+    return _emit(_draw_distribuicao_classes, distribuicao_classes)
+
+def _draw_comparacao_feature(nome_feature, dados_original, dados_filtrado):
     # Criar figura com 2x2 subplots
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
     fig.suptitle(f'Comparação: {nome_feature} - Original vs Filtrado', fontsize=16, fontweight='bold')
-    
+
     # 1. Boxplot Original (superior esquerdo)
     bp1 = axes[0,0].boxplot(dados_original, patch_artist=True, widths=0.6)
     bp1['boxes'][0].set_facecolor('lightcoral')
     axes[0,0].set_title('Boxplot - Dataset Original', fontsize=14, fontweight='bold')
     axes[0,0].set_ylabel('Valor')
     axes[0,0].grid(True, alpha=0.3)
-    
+
     # Adicionar estatísticas no boxplot original
     stats_orig = f'N: {len(dados_original)}\nMédia: {dados_original.mean():.1f}\nDP: {dados_original.std():.1f}\nMin: {dados_original.min():.1f}\nMax: {dados_original.max():.1f}'
-    axes[0,0].text(0.02, 0.98, stats_orig, transform=axes[0,0].transAxes, 
+    axes[0,0].text(0.02, 0.98, stats_orig, transform=axes[0,0].transAxes,
                    verticalalignment='top', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-    
+
     # 2. Distribuição Original (superior direito)
     axes[0,1].hist(dados_original, bins=50, alpha=0.7, color='lightcoral', edgecolor='black')
     axes[0,1].set_title('Distribuição - Dataset Original', fontsize=14, fontweight='bold')
     axes[0,1].set_xlabel('Valor')
     axes[0,1].set_ylabel('Frequência')
     axes[0,1].grid(True, alpha=0.3)
-    
+
     # 3. Boxplot Filtrado (inferior esquerdo)
     bp2 = axes[1,0].boxplot(dados_filtrado, patch_artist=True, widths=0.6)
     bp2['boxes'][0].set_facecolor('lightblue')
     axes[1,0].set_title('Boxplot - Dataset Filtrado', fontsize=14, fontweight='bold')
     axes[1,0].set_ylabel('Valor')
     axes[1,0].grid(True, alpha=0.3)
-    
+
     # Adicionar estatísticas no boxplot filtrado
     stats_filt = f'N: {len(dados_filtrado)}\nMédia: {dados_filtrado.mean():.1f}\nDP: {dados_filtrado.std():.1f}\nMin: {dados_filtrado.min():.1f}\nMax: {dados_filtrado.max():.1f}'
-    axes[1,0].text(0.02, 0.98, stats_filt, transform=axes[1,0].transAxes, 
+    axes[1,0].text(0.02, 0.98, stats_filt, transform=axes[1,0].transAxes,
                    verticalalignment='top', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-    
+
     # 4. Distribuição Filtrada (inferior direito)
     axes[1,1].hist(dados_filtrado, bins=50, alpha=0.7, color='lightblue', edgecolor='black')
     axes[1,1].set_title('Distribuição - Dataset Filtrado', fontsize=14, fontweight='bold')
     axes[1,1].set_xlabel('Valor')
     axes[1,1].set_ylabel('Frequência')
     axes[1,1].grid(True, alpha=0.3)
-    
+
     plt.tight_layout()
-    plt.show()
-    
+    return fig
+
+def plotar_comparacao_feature(nome_feature, X, y, X_filtrado, y_filtrado):
+    """
+    Cria um plot com 4 subgráficos comparando a feature antes e depois da filtragem
+
+    Parâmetros:
+    - nome_feature: nome da feature a ser analisada
+    - X: DataFrame original
+    - y: target original
+    - X_filtrado: DataFrame filtrado
+    - y_filtrado: target filtrado
+    """
+
+    # Extrair dados da feature
+    dados_original = X[nome_feature]
+    dados_filtrado = X_filtrado[nome_feature]
+
+    figure = _emit(_draw_comparacao_feature, nome_feature, dados_original, dados_filtrado,
+                   name=f'comparacao_{nome_feature}')
+
     # Imprimir resumo comparativo
     print(f"\n📈 RESUMO COMPARATIVO - {nome_feature}")
     print(f"{'='*50}")
@@ -93,35 +199,42 @@ def plotar_comparacao_feature(nome_feature, X, y, X_filtrado, y_filtrado):
     print(f"{'Desvio Padrão':<20} {dados_original.std():<12.2f} {dados_filtrado.std():<12.2f} {dados_original.std() - dados_filtrado.std():<10.2f}")
     print(f"{'Mínimo':<20} {dados_original.min():<12.2f} {dados_filtrado.min():<12.2f} {'-':<10}")
     print(f"{'Máximo':<20} {dados_original.max():<12.2f} {dados_filtrado.max():<12.2f} {'-':<10}")
-    
+
     # Calcular melhoria percentual no desvio padrão
     melhoria_dp = ((dados_original.std() - dados_filtrado.std()) / dados_original.std()) * 100
     print(f"{'Melhoria DP (%)':<20} {'-':<12} {'-':<12} {melhoria_dp:<10.1f}")
+    return figure
+
+def _draw_param_frequency(param, counter):
+    items = sorted(counter.items(), key=lambda x: -x[1])
+    labels, values = zip(*items)
+    colors = sns.color_palette("Set2", len(labels))
+    fig = plt.figure(figsize=(6, 4))
+    plt.bar([str(l) for l in labels], values, color=colors)
+    plt.title(f'Frequência dos valores de {param}')
+    plt.ylabel('Frequência')
+    plt.xlabel(param)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    return fig
 
 def plot_param_frequencies(best_params):
     # Conta quantas vezes cada valor apareceu para cada parâmetro
     param_counts = collections.defaultdict(collections.Counter)
-    
+
     for d in best_params:
         for k, v in d.items():
             param_counts[k][v] += 1
 
     # Plota individualmente para cada parâmetro, variando as cores
-    for param, counter in param_counts.items():
-        items = sorted(counter.items(), key=lambda x: -x[1])
-        labels, values = zip(*items)
-        colors = sns.color_palette("Set2", len(labels))
-        plt.figure(figsize=(6, 4))
-        plt.bar([str(l) for l in labels], values, color=colors)
-        plt.title(f'Frequência dos valores de {param}')
-        plt.ylabel('Frequência')
-        plt.xlabel(param)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.show()
+    # (no modo em lote, uma figura por worker)
+    return [
+        _emit(_draw_param_frequency, param, counter, name=f'freq_{param}')
+        for param, counter in param_counts.items()
+    ]
 
-def plot_stability_vs_metric(stds, means, stable_idxs, unstable_idxs, metric):
-    plt.figure(figsize=(8, 5))
+def _draw_stability_vs_metric(stds, means, stable_idxs, unstable_idxs, metric):
+    fig = plt.figure(figsize=(8, 5))
     plt.scatter([stds[i] for i in stable_idxs], [means[i] for i in stable_idxs], c='g', label='Mais estáveis')
     plt.scatter([stds[i] for i in unstable_idxs], [means[i] for i in unstable_idxs], c='r', label='Menos estáveis')
     plt.xlabel('Desvio padrão da métrica (estabilidade)')
@@ -129,21 +242,26 @@ def plot_stability_vs_metric(stds, means, stable_idxs, unstable_idxs, metric):
     plt.title('Estabilidade x Média da Métrica (Separado)')
     plt.legend()
     plt.grid(True)
-    plt.show()
+    return fig
 
-def plot_metric_per_fold(scores, metric):
-    plt.figure(figsize=(7, 4))
-    plt.plot(range(1, 6), scores, marker='o')
+def plot_stability_vs_metric(stds, means, stable_idxs, unstable_idxs, metric):
+    return _emit(_draw_stability_vs_metric, stds, means, stable_idxs, unstable_idxs, metric)
+
+def _draw_metric_per_fold(scores, metric):
+    fig = plt.figure(figsize=(7, 4))
+    plt.plot(range(1, len(scores) + 1), scores, marker='o')
     plt.title(f'{metric} em cada fold para o modelo mais estável')
     plt.xlabel('Fold')
     plt.ylabel(metric)
     plt.ylim(0, 1)
     plt.grid(True)
-    plt.show()
+    return fig
 
-def plot_metric_evolution(percents, train_scores, test_scores, metric):
-    
-    plt.figure(figsize=(8, 5))
+def plot_metric_per_fold(scores, metric):
+    return _emit(_draw_metric_per_fold, scores, metric)
+
+def _draw_metric_evolution(percents, train_scores, test_scores, metric):
+    fig = plt.figure(figsize=(8, 5))
     plt.plot(percents * 100, train_scores, label='Treino', color='b', linestyle='-')
     plt.plot(percents * 100, test_scores, label='Teste', color='r', linestyle='--')
     plt.xlabel('% do conjunto de treino utilizado')
@@ -151,25 +269,31 @@ def plot_metric_evolution(percents, train_scores, test_scores, metric):
     plt.title(f'Evolução da {metric.capitalize()} no treino e teste')
     plt.legend()
     plt.grid(True)
-    plt.show()
+    return fig
 
-def plot_confusion_matrix(y_test, y_pred_test, model_name):
-    cm = confusion_matrix(y_test, y_pred_test)
-    plt.figure(figsize=(5, 4))
+def plot_metric_evolution(percents, train_scores, test_scores, metric):
+    return _emit(_draw_metric_evolution, percents, train_scores, test_scores, metric)
+
+def _draw_confusion_matrix(cm, model_name):
+    fig = plt.figure(figsize=(5, 4))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
     plt.title(f"Matriz de Confusão (Conjunto de Teste) - Modelo {model_name}")
     plt.xlabel('Predito')
     plt.ylabel('Real')
-    plt.show()
+    return fig
 
-def plot_roc_curve(model, X_test, y_test, model_name):
+def plot_confusion_matrix(y_test, y_pred_test, model_name):
+    cm = confusion_matrix(y_test, y_pred_test)
+    return _emit(_draw_confusion_matrix, cm, model_name)
+
+def _model_scores(model, X_test):
+    # Scores calculados no processo principal: os workers só recebem arrays
     if hasattr(model, "predict_proba"):
-        y_score = model.predict_proba(X_test)[:, 1]
-    else:
-        y_score = model.decision_function(X_test)
-    fpr, tpr, _ = roc_curve(y_test, y_score)
-    auc_score = auc(fpr, tpr)
-    plt.figure(figsize=(6, 5))
+        return model.predict_proba(X_test)[:, 1]
+    return model.decision_function(X_test)
+
+def _draw_roc_curve(fpr, tpr, auc_score, model_name):
+    fig = plt.figure(figsize=(6, 5))
     plt.plot(fpr, tpr, label=f'AUC = {auc_score:.3f}')
     plt.plot([0, 1], [0, 1], 'k--')
     plt.xlabel('FPR')
@@ -177,59 +301,108 @@ def plot_roc_curve(model, X_test, y_test, model_name):
     plt.title(f'Curva ROC (Conjunto de Teste) - Modelo {model_name}')
     plt.legend()
     plt.grid(True)
-    plt.show()
+    return fig
+
+def plot_roc_curve(model, X_test, y_test, model_name):
+    y_score = _model_scores(model, X_test)
+    fpr, tpr, _ = roc_curve(y_test, y_score)
+    auc_score = auc(fpr, tpr)
+    _emit(_draw_roc_curve, fpr, tpr, auc_score, model_name)
     return auc_score
 
-def plot_roc_curve_evolution(model, X_test, y_test, model_name):
-    if hasattr(model, "predict_proba"):
-        y_score = model.predict_proba(X_test)[:, 1]
-    else:
-        y_score = model.decision_function(X_test)
-    
+def _decimate_monotone(x, y, max_points):
+    """
+    Índices de um subconjunto dos pontos de uma curva monótona (x e y não
+    decrescentes, como a evolução da curva ROC) que preserva sua forma.
+
+    Primeiro mantém só os cantos (pontos onde a direção do passo muda), o
+    que é exato para uma escada. Se ainda sobrarem mais de `max_points`,
+    mantém o primeiro canto a cada 1/`max_points` do comprimento (L1) da
+    curva, com erro menor que esse passo.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    dx, dy = np.diff(x), np.diff(y)
+    # Direção de cada passo: 0 parado, 1 horizontal, 2 vertical, 3 diagonal
+    direction = (dx > 0) + 2 * (dy > 0)
+    corners = np.flatnonzero(direction[1:] != direction[:-1]) + 1
+    keep = np.concatenate([[0], corners, [n - 1]])
+    if len(keep) > max_points:
+        length = np.concatenate([[0], np.cumsum(dx + dy)])[keep]
+        bins = np.floor(length / max(length[-1], 1e-12) * (max_points - 1))
+        first = np.concatenate([[True], bins[1:] != bins[:-1]])
+        keep = np.union1d(keep[first], [n - 1])
+    return keep
+
+def _draw_roc_curve_evolution(fpr_evolution, tpr_evolution, order, n_samples, step, model_name):
+    fig, ax = plt.subplots(figsize=(8, 6))
+
+    # Um único LineCollection (em vez de um Line2D por amostra), colorido
+    # pela posição temporal da amostra que fecha cada segmento
+    points = np.column_stack([fpr_evolution, tpr_evolution])
+    lines = LineCollection(np.stack([points[:-1], points[1:]], axis=1),
+                           cmap='plasma', alpha=0.8, linewidth=1.5)
+    lines.set_array(order[1:])
+    lines.set_clim(0, n_samples)
+    ax.add_collection(lines)
+
+    marks = order % step == 0  # Mostrar ~30 pontos
+    scatter = ax.scatter(fpr_evolution[marks],
+                         tpr_evolution[marks],
+                         c=order[marks],
+                         cmap='plasma', s=40, alpha=0.9,
+                         edgecolors='black', linewidth=0.5)
+
+    ax.plot([0, 1], [0, 1], 'k--', alpha=0.6, label='Linha de referência')
+    ax.autoscale_view()
+    ax.set_xlabel('Taxa de Falsos Positivos (FPR)')
+    ax.set_ylabel('Taxa de Verdadeiros Positivos (TPR)')
+    ax.set_title(f'Evolução Temporal da Curva ROC - {model_name}')
+    ax.grid(True, alpha=0.3)
+
+    cbar = fig.colorbar(scatter)
+    cbar.set_label('Ordem Temporal das Amostras', rotation=270, labelpad=20)
+
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+def plot_roc_curve_evolution(model, X_test, y_test, model_name, max_points=4000):
+    """
+    Evolução da curva ROC na ordem temporal das amostras de teste.
+
+    Séries com mais de `max_points` pontos são dizimadas preservando a forma
+    (ver `_decimate_monotone`), então o custo de desenho não cresce com o
+    número de amostras.
+
+    A curva depende só dos rótulos, na ordem das amostras; `model` e
+    `X_test` ficam na assinatura por compatibilidade, sem inferência.
+    """
     y_true = y_test.values if hasattr(y_test, 'values') else y_test
-    
+    y_true = np.asarray(y_true).ravel()
+
     n_positives = np.sum(y_true == 1)
     n_negatives = np.sum(y_true == 0)
-    
+
     tp_cumsum = np.cumsum(y_true == 1)
     fp_cumsum = np.cumsum(y_true == 0)
-    
+
     tpr_evolution = tp_cumsum / n_positives
     fpr_evolution = fp_cumsum / n_negatives
-    
+
     tpr_evolution = np.concatenate([[0], tpr_evolution])
     fpr_evolution = np.concatenate([[0], fpr_evolution])
-    
-    plt.figure(figsize=(8, 6))
-    
-    colors = plt.cm.plasma(np.linspace(0, 1, len(tpr_evolution)))
-    
-    for i in range(1, len(tpr_evolution)):
-        plt.plot([fpr_evolution[i-1], fpr_evolution[i]], 
-                [tpr_evolution[i-1], tpr_evolution[i]], 
-                color=colors[i], alpha=0.8, linewidth=1.5)
-    
-    step = max(1, len(fpr_evolution)//30)  # Mostrar ~30 pontos
-    scatter = plt.scatter(fpr_evolution[::step], 
-                         tpr_evolution[::step], 
-                         c=range(0, len(fpr_evolution), step), 
-                         cmap='plasma', s=40, alpha=0.9, 
-                         edgecolors='black', linewidth=0.5)
-    
-    plt.plot([0, 1], [0, 1], 'k--', alpha=0.6, label='Linha de referência')
-    plt.xlabel('Taxa de Falsos Positivos (FPR)')
-    plt.ylabel('Taxa de Verdadeiros Positivos (TPR)')
-    plt.title(f'Evolução Temporal da Curva ROC - {model_name}')
-    plt.grid(True, alpha=0.3)
-    
-    cbar = plt.colorbar(scatter)
-    cbar.set_label('Ordem Temporal das Amostras', rotation=270, labelpad=20)
-    
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-    
-def plot_main_metrics(metrics_dict, model_name):
+
+    # Só os pontos mantidos (e os ~30 marcadores) vão para o desenho
+    step = max(1, len(fpr_evolution)//30)
+    keep = np.union1d(_decimate_monotone(fpr_evolution, tpr_evolution, max_points),
+                      np.arange(0, len(fpr_evolution), step))
+
+    return _emit(_draw_roc_curve_evolution, fpr_evolution[keep], tpr_evolution[keep], keep,
+                 len(fpr_evolution) - 1, step, model_name)
+
+def _draw_main_metrics(metrics_dict, model_name):
     labels = [
         "Acurácia (Treino)", "Acurácia (Teste)",
         "F1 (Treino)", "F1 (Teste)",
@@ -243,11 +416,14 @@ def plot_main_metrics(metrics_dict, model_name):
         metrics_dict["recall_train"], metrics_dict["recall_test"]
     ]
     colors = sns.color_palette("Paired", 8)
-    plt.figure(figsize=(8, 4))
+    fig = plt.figure(figsize=(8, 4))
     bars = plt.bar(range(len(metrics)), metrics, color=colors)
     plt.xticks(range(len(metrics)), labels, rotation=25, ha='right')
     plt.title(f'Métricas principais - Modelo {model_name}')
     y_min = max(min(metrics) - 0.1, 0)  # considera o menor valor de todas as métricas
     plt.ylim(y_min, 1)
     plt.tight_layout(pad=1)
-    plt.show()
\ No newline at end of file
+    return fig
+
+def plot_main_metrics(metrics_dict, model_name):
+    return _emit(_draw_main_metrics, metrics_dict, model_name)
@@ -0,0 +1,348 @@
+import os
+import csv
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# --- Pico de memória por trecho (tracemalloc) ---
+# O tracemalloc só guarda um pico global; para medir trechos aninhados cada
+# nível guarda (memória no início, maior pico visto) e repassa o pico ao pai
+_local = threading.local()
+
+def _mem_stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def _mem_enter():
+    current, peak = tracemalloc.get_traced_memory()
+    stack = _mem_stack()
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    stack.append([current, current])
+
+def _mem_exit():
+    current, peak = tracemalloc.get_traced_memory()
+    stack = _mem_stack()
+    start, peak_so_far = stack.pop()
+    peak_so_far = max(peak_so_far, peak)
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak_so_far)
+    tracemalloc.reset_peak()
+    return peak_so_far - start
+
+
+class Probe:
+    """
+    Mede um trecho fora do `Profiler`, ex. um fold dentro de um worker:
+    início (epoch), tempo de parede, tempo de CPU do processo e pico de
+    memória alocada (bytes acima do início, via tracemalloc).
+
+    `stop()` retorna um dict serializável, enviado de volta ao processo
+    principal junto com o resultado (ver `record_fold`).
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self._owns_tracing = memory and not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        if memory:
+            _mem_enter()
+        self.started = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def lap(self):
+        """Segundos de parede desde o início (para separar etapas do trecho)."""
+        return time.perf_counter() - self._wall
+
+    def stop(self, **extra):
+        stats = {
+            'start': self.started,
+            'wall': time.perf_counter() - self._wall,
+            'cpu': time.process_time() - self._cpu,
+            'peak_memory': _mem_exit() if self.memory else None,
+            'pid': os.getpid(),
+            **extra,
+        }
+        if self._owns_tracing:
+            tracemalloc.stop()
+        return stats
+
+
+# --- Profiler ---
+class _Span:
+    __slots__ = ('profiler', 'name', 'cat', 'args', 'start', 'cpu')
+
+    def __init__(self, profiler, name, cat, args):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        if self.profiler.memory:
+            _mem_enter()
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu
+        peak = _mem_exit() if self.profiler.memory else None
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.profiler.add(self.name, self.cat, self.start - self.profiler.origin, wall, cpu, peak, **self.args)
+        return False
+
+
+class Profiler:
+    """
+    Coleta eventos (trechos medidos) de uma execução.
+
+    Cada evento tem nome, categoria ('stage', 'import', 'search', 'fold',
+    'plot', 'lvq', ...), início em segundos desde a criação do profiler,
+    tempo de parede, tempo de CPU, pico de memória alocada (bytes, com
+    `memory=True`) e atributos livres em `args` (ex. candidato e fold).
+
+    Os folds avaliados em workers chegam via `record_fold` com o pid do
+    worker, então o trace mostra uma linha por processo.
+
+    Exporta para JSON (`to_json`), CSV (`to_csv`) e para o formato de trace
+    do Chrome (`to_chrome_trace`, abrir em chrome://tracing ou Perfetto).
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.events = []
+        self.origin = time.perf_counter()
+        self.origin_epoch = time.time()
+        self._owns_tracing = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        return self
+
+    def stop(self):
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+        return self
+
+    def add(self, name, cat, start, wall, cpu=None, peak_memory=None, pid=None, tid=None, **args):
+        event = {
+            'name': name,
+            'cat': cat,
+            'start': start,
+            'wall': wall,
+            'cpu': cpu,
+            'peak_memory': peak_memory,
+            'pid': pid if pid is not None else os.getpid(),
+            'tid': tid if tid is not None else threading.get_ident(),
+            'args': args,
+        }
+        with self._lock:
+            self.events.append(event)
+        return event
+
+    def span(self, name, cat='stage', **args):
+        return _Span(self, name, cat, args)
+
+    # --- Resumos ---
+    def stages(self, cat=None):
+        """Total por (categoria, nome): chamadas, parede, CPU e maior pico de memória."""
+        totals = {}
+        for e in self.events:
+            if cat is not None and e['cat'] != cat:
+                continue
+            t = totals.setdefault((e['cat'], e['name']), {
+                'cat': e['cat'], 'name': e['name'], 'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_memory': None
+            })
+            t['calls'] += 1
+            t['wall'] += e['wall']
+            t['cpu'] += e['cpu'] or 0.0
+            if e['peak_memory'] is not None:
+                t['peak_memory'] = max(t['peak_memory'] or 0, e['peak_memory'])
+        return sorted(totals.values(), key=lambda t: -t['wall'])
+
+    def candidates(self):
+        """
+        Um registro por candidato a partir dos folds: número de folds (e
+        quantos vieram do cache), score médio, soma de ajuste, score,
+        parede e CPU, e maior pico de memória.
+        """
+        rows = {}
+        for e in self.events:
+            if e['cat'] != 'fold':
+                continue
+            args = e['args']
+            row = rows.setdefault(args['candidate'], {
+                'candidate': args['candidate'], 'folds': 0, 'cached': 0, 'scores': [],
+                'fit_time': 0.0, 'score_time': 0.0, 'wall': 0.0, 'cpu': 0.0, 'peak_memory': None
+            })
+            row['folds'] += 1
+            row['cached'] += bool(args.get('cached'))
+            row['scores'].append(args.get('score'))
+            for key in ('fit_time', 'score_time'):
+                row[key] += args.get(key) or 0.0
+            row['wall'] += e['wall']
+            row['cpu'] += e['cpu'] or 0.0
+            if e['peak_memory'] is not None:
+                row['peak_memory'] = max(row['peak_memory'] or 0, e['peak_memory'])
+        for row in rows.values():
+            scores = [s for s in row.pop('scores') if s is not None and s == s]
+            row['mean_score'] = sum(scores) / len(scores) if scores else None
+        return list(rows.values())
+
+    def summary(self):
+        usage = {}
+        if resource is not None:
+            # ru_maxrss: KiB no Linux; inclui processos filhos já encerrados
+            usage = {
+                'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                'max_rss_children_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+            }
+        return {
+            'started': self.origin_epoch,
+            'wall': time.perf_counter() - self.origin,
+            'memory_tracing': self.memory,
+            **usage,
+            'stages': self.stages(),
+        }
+
+    # --- Exportação ---
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                'summary': self.summary(),
+                'candidates': self.candidates(),
+                'events': self.events,
+            }, f, indent=2, default=str)
+        return path
+
+    def to_csv(self, path):
+        columns = ['name', 'cat', 'start', 'wall', 'cpu', 'peak_memory', 'pid', 'tid', 'args']
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, columns)
+            writer.writeheader()
+            for e in self.events:
+                writer.writerow({**e, 'args': json.dumps(e['args'], default=str)})
+        return path
+
+    def to_chrome_trace(self, path):
+        events = []
+        for e in self.events:
+            args = {**e['args'], 'cpu_s': e['cpu']}
+            if e['peak_memory'] is not None:
+                args['peak_memory_bytes'] = e['peak_memory']
+            events.append({
+                'name': e['name'],
+                'cat': e['cat'],
+                'ph': 'X',
+                'ts': e['start'] * 1e6,
+                'dur': e['wall'] * 1e6,
+                'pid': e['pid'],
+                'tid': e['tid'],
+                'args': args,
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+        return path
+
+    def export(self, prefix):
+        """Grava `prefix`.json, `prefix`.csv e `prefix`.trace.json; retorna os caminhos."""
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return [
+            self.to_json(f"{prefix}.json"),
+            self.to_csv(f"{prefix}.csv"),
+            self.to_chrome_trace(f"{prefix}.trace.json"),
+        ]
+
+
+# --- Profiler global ---
+# Desligado por padrão: `span` devolve um contexto vazio compartilhado e
+# `enabled()` é uma comparação, então o custo sem profiler é desprezível
+_profiler = None
+_NULL = nullcontext()
+
+def enable(memory=True):
+    global _profiler
+    _profiler = Profiler(memory).start()
+    return _profiler
+
+def disable():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+def enabled():
+    return _profiler is not None
+
+def active():
+    return _profiler
+
+def memory_enabled():
+    """True se o profiler global está ligado e mede memória (tracemalloc)."""
+    return _profiler is not None and _profiler.memory
+
+@contextmanager
+def profile(memory=True):
+    """Liga o profiler global durante o bloco; `with profile() as p: ...; p.export('run')`."""
+    profiler = enable(memory)
+    try:
+        yield profiler
+    finally:
+        disable()
+
+def span(name, cat='stage', **args):
+    """Mede o bloco no profiler global (sem efeito se estiver desligado)."""
+    profiler = _profiler
+    if profiler is None:
+        return _NULL
+    return _Span(profiler, name, cat, args)
+
+def record_fold(candidate, fold, record, stats=None, **args):
+    """
+    Registra um fold avaliado (ver `utils.search.evaluate_folds`).
+
+    `stats` vem do `Probe` do worker; sem ele (resultado do cache ou falha
+    antes de medir) o evento tem duração zero e `cached` indica a origem.
+    """
+    profiler = _profiler
+    if profiler is None:
+        return None
+    fields = {
+        'candidate': candidate,
+        'fold': fold,
+        'score': record.get('score'),
+        'fit_time': record.get('fit_time'),
+        'score_time': record.get('score_time'),
+        'error': record.get('error'),
+        **args,
+    }
+    if stats is None:
+        return profiler.add('fold', 'fold', time.perf_counter() - profiler.origin, 0.0, **fields)
+    fields['copy_time'] = stats.get('copy_time')
+    return profiler.add(
+        'fold', 'fold', stats['start'] - profiler.origin_epoch, stats['wall'],
+        stats['cpu'], stats['peak_memory'], pid=stats['pid'], tid=0, **fields
+    )
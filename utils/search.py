@@ -0,0 +1,367 @@
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone #type:ignore
+from sklearn.metrics import get_scorer #type:ignore
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedShuffleSplit #type:ignore
+
+from .eval_cache import dataset_fingerprint, is_deterministic
+from .executor import run_isolated
+from . import profiling
+from .shared import as_array, shared_arrays
+
+
+def params_key(params):
+    """Representação canônica (independente da ordem) de um dict de parâmetros."""
+    return repr(sorted(params.items()))
+
+def _fit_and_score(index, estimator, X, y, train_idx, test_idx, scorer, profile=False, memory=True):
+    # Com `profile`, também mede CPU, pico de memória e o tempo de cópia dos
+    # dados do fold (ver `utils.profiling.Probe`), devolvidos como 6º item
+    probe = profiling.Probe(memory=memory) if profile else None
+    start = time.time()
+    error = None
+    copy_time = None
+    try:
+        X_train, y_train = X[train_idx], y[train_idx]
+        copy_time = time.time() - start
+        estimator.fit(X_train, y_train)
+        fit_time = time.time() - start
+        start = time.time()
+        score = scorer(estimator, X[test_idx], y[test_idx])
+    except Exception as e:
+        # Mesmo comportamento de error_score=np.nan do RandomizedSearchCV
+        fit_time = time.time() - start
+        score = np.nan
+        error = str(e)
+    score_time = time.time() - start
+    stats = probe.stop(copy_time=copy_time) if probe is not None else None
+    return index, score, fit_time, score_time, error, stats
+
+def _run_shared(tasks, pending, X, y, splits, scorer, n_jobs, profile=False, memory=True):
+    if not pending:
+        return
+    with shared_arrays(X, y) as (X_shared, y_shared):
+        jobs = (
+            delayed(_fit_and_score)(i, clone(tasks[i][0]), X_shared, y_shared, *splits[tasks[i][1]], scorer, profile, memory)
+            for i in pending
+        )
+        # Resultados na ordem em que terminam, para gravar cada fold o quanto antes
+        yield from Parallel(n_jobs=n_jobs, return_as='generator_unordered')(jobs)
+
+def _candidate_id(estimator):
+    return f"{type(estimator).__name__}{params_key(estimator.get_params(deep=False))}"
+
+def evaluate_folds(tasks, X, y, cv, scoring='accuracy', eval_cache=None, n_jobs=-1, on_result=None,
+                   timeout=None, groups=None):
+    """
+    Avalia uma lista de tarefas (estimador, fold) em paralelo.
+
+    Se `eval_cache` (ver `utils.eval_cache.EvaluationCache`) for informado,
+    tarefas já avaliadas com os mesmos parâmetros, dados e folds (os
+    índices de cada fold) são lidas do cache em vez de reajustadas;
+    estimadores com `random_state=None` sempre são reajustados.
+    `on_result(i, record)` é chamado assim que cada tarefa termina, na
+    ordem de conclusão.
+
+    Com `timeout` (segundos), cada tarefa roda em um processo isolado (ver
+    `utils.executor.run_isolated`): tarefas que estouram o tempo ou derrubam
+    o processo viram falhas (score NaN) sem interromper as demais, e
+    cancelam as outras tarefas do mesmo grupo em `groups`. Com `groups`, o
+    `timeout` é o tempo de parede do grupo inteiro (ex. todos os folds de
+    um candidato), não de cada tarefa.
+
+    Sem `timeout`, X e y são publicados uma vez em memória compartilhada
+    (ver `utils.shared.shared_arrays`) e os workers recebem só os índices
+    de cada fold; se X e y já são memmaps publicados (ex. pela busca que
+    chama esta função), são usados sem nova cópia.
+
+    Com o profiler ligado (ver `utils.profiling`), cada tarefa também é
+    registrada como um evento 'fold', com CPU e pico de memória do worker.
+
+    Retorna uma lista de registros {'score', 'fit_time', 'score_time', 'error'},
+    na ordem de `tasks`.
+    """
+    X = as_array(X)
+    y = as_array(y).ravel()
+    scorer = get_scorer(scoring)
+    splits = list(cv.split(X, y))
+    results = [None] * len(tasks)
+    profile = profiling.enabled()
+    memory = profiling.memory_enabled()  # --profile-no-memory: workers sem tracemalloc
+
+    # Chave None: sem cache (ex. `random_state=None`, cada ajuste sai diferente)
+    keys = [None] * len(tasks)
+    if eval_cache is not None:
+        fingerprint = dataset_fingerprint(X, y)
+        keys = [
+            eval_cache.key(est, fingerprint, *splits[fold], scoring) if is_deterministic(est) else None
+            for est, fold in tasks
+        ]
+
+    pending = []
+    for i in range(len(tasks)):
+        record = eval_cache.get(keys[i]) if keys[i] is not None else None
+        if record is None:
+            pending.append(i)
+            continue
+        results[i] = record
+        if profile:
+            profiling.record_fold(_candidate_id(tasks[i][0]), tasks[i][1], record, cached=True)
+        if on_result is not None:
+            on_result(i, record)
+
+    if timeout is None:
+        outcomes = _run_shared(tasks, pending, X, y, splits, scorer, n_jobs, profile, memory)
+    else:
+        # Processos isolados via fork já herdam X e y sem cópia
+        calls = [
+            (_fit_and_score, (i, clone(tasks[i][0]), X, y, *splits[tasks[i][1]], scorer, profile, memory))
+            for i in pending
+        ]
+        pending_groups = [groups[i] for i in pending] if groups is not None else None
+        outcomes = (
+            value if status == 'ok' else (pending[j], np.nan, 0.0, 0.0, f"{status}: {value}", None)
+            for j, status, value in run_isolated(calls, n_jobs, timeout, pending_groups)
+        )
+
+    for i, score, fit_time, score_time, error, stats in outcomes:
+        record = {'score': score, 'fit_time': fit_time, 'score_time': score_time, 'error': error}
+        results[i] = record
+        if profile:
+            profiling.record_fold(_candidate_id(tasks[i][0]), tasks[i][1], record, stats, cached=False)
+        # Falhas não entram no cache: podem ser transitórias (memória, timeout)
+        if keys[i] is not None and not np.isnan(score):
+            eval_cache.put(keys[i], record)
+        if on_result is not None:
+            on_result(i, record)
+
+    if eval_cache is not None:
+        eval_cache.evict()
+    return results
+
+def cross_validate_many(estimators, X, y, cv, scoring='accuracy', eval_cache=None, n_jobs=-1):
+    """Validação cruzada de vários estimadores em um único pool; retorna (n_estimadores, n_folds)."""
+    n_folds = cv.get_n_splits(X, y)
+    tasks = [(est, fold) for est in estimators for fold in range(n_folds)]
+    results = evaluate_folds(tasks, X, y, cv, scoring, eval_cache, n_jobs)
+    return np.array([r['score'] for r in results]).reshape(len(estimators), n_folds)
+
+def checkpointed_search(estimator, param_distributions, X, y, cv, trial_log, search_id=0, n_iter=20,
+                        scoring='accuracy', random_state=None, n_jobs=-1, eval_cache=None):
+    """
+    Equivalente ao RandomizedSearchCV com checkpoint por (candidato, fold).
+
+    Os candidatos são sorteados com o mesmo `ParameterSampler` do
+    RandomizedSearchCV, então para o mesmo `random_state` e `cv` o
+    resultado é o mesmo. Cada fold avaliado é gravado no `trial_log`
+    (ver `utils.checkpoint.TrialLog`) assim que termina; ao retomar, os
+    pares (candidato, fold) já gravados para este `search_id` não são
+    reavaliados. Com `eval_cache`, pares já avaliados em outras buscas
+    ou execuções também são reaproveitados.
+
+    Retorna:
+    - best_params: candidato com a maior média de score nos folds
+    - scores: array (n_candidatos, n_folds) com os scores de teste
+    - candidates: lista dos candidatos sorteados
+    """
+    candidates = list(ParameterSampler(param_distributions, n_iter, random_state=random_state))
+    n_folds = cv.get_n_splits(X, y)
+
+    # Folds gravados com outro divisor (ex. logs de antes dos folds fixos) não servem
+    done = {
+        (r['params_key'], r['fold']): r['score']
+        for r in trial_log.load(search=search_id)
+        if r.get('cv', repr(cv)) == repr(cv)
+    }
+    pending = [
+        (params, fold)
+        for params in candidates
+        for fold in range(n_folds)
+        if (params_key(params), fold) not in done
+    ]
+
+    def on_result(i, record):
+        params, fold = pending[i]
+        trial_log.append({
+            'search': search_id,
+            'params_key': params_key(params),
+            'params': params,
+            'cv': repr(cv),
+            'scoring': scoring,
+            'fold': fold,
+            **record,
+        })
+        done[(params_key(params), fold)] = record['score']
+
+    tasks = [(clone(estimator).set_params(**params), fold) for params, fold in pending]
+    with profiling.span('random_search', cat='search', search_id=search_id, candidates=len(candidates), folds=len(tasks)):
+        evaluate_folds(tasks, X, y, cv, scoring, eval_cache, n_jobs, on_result)
+
+    scores = np.array([
+        [done[(params_key(params), fold)] for fold in range(n_folds)]
+        for params in candidates
+    ])
+    means = np.where(np.isnan(scores).any(axis=1), -np.inf, scores.mean(axis=1))
+    best_params = candidates[int(np.argmax(means))]
+    return best_params, scores, candidates
+
+def successive_halving(estimator, param_grid, X, y, cv, budgets=(0.25, 1.0), keep=0.5, min_keep=20,
+                       scoring='accuracy', random_state=None, n_jobs=-1, eval_cache=None,
+                       timeout=None, incompatible=None, trial_log=None, rung_cv=None):
+    """
+    Busca em grade com successive halving sobre o tamanho do treino.
+
+    Cada rodada avalia os candidatos restantes em uma subamostra
+    estratificada de `budgets[r]` do treino e promove a fração `keep` dos
+    melhores (no mínimo `min_keep`) para a rodada seguinte. As rodadas com
+    `budget < 1` usam uma fidelidade mais barata, `rung_cv` (por padrão um
+    único holdout estratificado com a fração de teste de um fold de `cv`),
+    que só serve para ordenar os candidatos. A última rodada deve usar o
+    treino completo (`budgets[-1] == 1.0`) e roda a validação cruzada `cv`
+    inteira, então os scores finais são comparáveis aos de um
+    `cross_val_score` completo. Candidatos que falham em qualquer rodada são
+    descartados.
+
+    Ex.: 40 combinações, `budgets=(0.25, 1.0)`, `min_keep=20` e 5 folds dão
+    40 ajustes em 25% do treino + 20 x 5 no treino completo (140 ajustes,
+    contra 40 x 5 + 20 x 5 = 300 com validação cruzada em todas as rodadas).
+
+    Com `timeout`, os folds rodam em processos isolados e um candidato cujos
+    folds passam de `timeout` segundos de parede, contados do início do seu
+    primeiro fold na rodada, é encerrado e descartado. Com
+    `incompatible` (ver `utils.checkpoint.IncompatibleParams`), combinações
+    já registradas como falhas são puladas sem nenhum ajuste, e novas falhas
+    por exceção são gravadas nele (timeouts e crashes não, pois podem
+    depender da máquina).
+
+    Parâmetros:
+    - estimator: estimador base; os candidatos são aplicados com `set_params`
+    - param_grid: grade no formato do `ParameterGrid`
+    - budgets: frações do treino usadas em cada rodada, em ordem crescente
+    - keep: fração de candidatos promovida a cada rodada
+    - min_keep: número mínimo de candidatos promovidos
+    - timeout: tempo máximo de parede, em segundos, de cada candidato em uma rodada
+    - incompatible: registro persistido de combinações incompatíveis
+    - trial_log: se informado, recebe os scores por fold da última rodada
+      (ver `results_table`)
+    - rung_cv: divisor das rodadas com `budget < 1`; `None` usa o holdout
+      descrito acima
+
+    Retorna:
+    - successful: lista de (params, média do score) da última rodada
+    - failed: lista de (params, mensagem de erro)
+    """
+    if budgets[-1] != 1.0:
+        raise ValueError("The last budget must be 1.0 (full training set).")
+    # Publica X e y uma vez para todas as rodadas (ver `utils.shared`)
+    with shared_arrays(as_array(X), as_array(y).ravel()) as (X, y):
+        if rung_cv is None:
+            test_size = 1.0 / cv.get_n_splits(X, y)
+            rung_cv = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+
+        candidates = list(ParameterGrid(param_grid))
+        failed = []
+        if incompatible is not None:
+            failed = [(params, incompatible.error(params)) for params in candidates if params in incompatible]
+            candidates = [params for params in candidates if params not in incompatible]
+        for r, budget in enumerate(budgets):
+            if budget < 1.0:
+                with profiling.span('subsample', cat='data', budget=budget):
+                    splitter = StratifiedShuffleSplit(n_splits=1, train_size=budget, random_state=random_state)
+                    subset, _ = next(splitter.split(X, y))
+                    X_r, y_r = X[subset], y[subset]
+            else:
+                X_r, y_r = X, y
+            cv_r = rung_cv if budget < 1.0 else cv
+            n_folds = cv_r.get_n_splits(X_r, y_r)
+
+            tasks = [(clone(estimator).set_params(**params), fold) for params in candidates for fold in range(n_folds)]
+            groups = [c for c in range(len(candidates)) for _ in range(n_folds)]
+            with profiling.span('halving_round', cat='search', round=r, budget=budget, candidates=len(candidates), folds=n_folds):
+                records = evaluate_folds(tasks, X_r, y_r, cv_r, scoring, eval_cache, n_jobs, timeout=timeout, groups=groups)
+
+            scored = []
+            for c, params in enumerate(candidates):
+                fold_records = records[c * n_folds:(c + 1) * n_folds]
+                errors = [rec['error'] for rec in fold_records if rec.get('error')]
+                if errors:
+                    failed.append((params, errors[0]))
+                    if incompatible is not None and not errors[0].startswith(('timeout', 'crash', 'cancelled')):
+                        incompatible.add(params, errors[0])
+                else:
+                    scored.append((params, float(np.mean([rec['score'] for rec in fold_records]))))
+
+            scored.sort(key=lambda item: item[1], reverse=True)
+            if incompatible is not None:
+                incompatible.save()
+            if r == len(budgets) - 1:
+                if trial_log is not None:
+                    for k, ((_, fold), record) in enumerate(zip(tasks, records)):
+                        params = candidates[groups[k]]
+                        trial_log.append({
+                            'search': 'halving',
+                            'params_key': params_key(params),
+                            'params': params,
+                            'cv': repr(cv),
+                            'scoring': scoring,
+                            'fold': fold,
+                            **record,
+                        })
+
+                return scored, failed
+            n_keep = max(min_keep, int(np.ceil(len(scored) * keep)))
+            candidates = [params for params, _ in scored[:n_keep]]
+
+
+# --- Tabela de resultados por split ---
+RESULT_COLUMNS = ['search', 'params_key', 'params', 'cv', 'scoring', 'fold', 'score', 'fit_time', 'score_time']
+
+def results_table(records):
+    """
+    Tabela (DataFrame) com um registro por (candidato, split), montada a
+    partir dos registros de um `TrialLog`: score de teste, tempo de ajuste
+    e tempo de score de cada fold avaliado durante as buscas.
+    """
+    return pd.DataFrame([{c: r.get(c) for c in RESULT_COLUMNS} for r in records], columns=RESULT_COLUMNS)
+
+def _table_scores(results, params, scoring, cv_repr, n_folds):
+    # Folds do candidato gravados com o mesmo divisor; folds de outro divisor
+    # (ex. a semente de outra busca) são de outras divisões dos dados e
+    # misturariam variâncias. Retorna (scores, folds faltantes).
+    rows = results[
+        (results['params_key'] == params_key(params))
+        & (results['scoring'] == scoring)
+        & (results['cv'] == cv_repr)
+    ]
+    rows = rows.dropna(subset=['score']).drop_duplicates(['fold'])
+    scores = np.full(n_folds, np.nan)
+    scores[rows['fold'].to_numpy(dtype=int)] = rows['score'].to_numpy()
+    return scores, list(np.flatnonzero(np.isnan(scores)))
+
+def stability_scores(estimators, param_list, X, y, cv, scoring='accuracy', results=None, eval_cache=None, n_jobs=-1):
+    """
+    Scores por fold (n_candidatos, n_folds) para a análise de estabilidade.
+
+    Reaproveita os splits já avaliados em `results` (ver `results_table`)
+    com o mesmo divisor `cv` e só roda validação cruzada, em paralelo, para
+    os pares (candidato, fold) que faltam.
+    """
+    n_folds = cv.get_n_splits(X, y)
+    scores = np.full((len(param_list), n_folds), np.nan)
+    missing = []
+    for c, params in enumerate(param_list):
+        if results is None or results.empty:
+            missing.extend((c, fold) for fold in range(n_folds))
+            continue
+        scores[c], missing_folds = _table_scores(results, params, scoring, repr(cv), n_folds)
+        missing.extend((c, fold) for fold in missing_folds)
+
+    tasks = [(estimators[c], fold) for c, fold in missing]
+    with profiling.span('stability_scores', cat='search', candidates=len(param_list), missing_folds=len(tasks)):
+        with shared_arrays(as_array(X), as_array(y).ravel()) as (X, y):
+            records = evaluate_folds(tasks, X, y, cv, scoring, eval_cache, n_jobs)
+    for (c, fold), record in zip(missing, records):
+        scores[c, fold] = record['score']
+    return scores
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+
+
+# Folga exigida em /dev/shm além do tamanho dos arrays (memória compartilhada é RAM)
+SHM_HEADROOM = 1.25
+
+def as_array(array):
+    """
+    `np.asarray` que preserva arrays já publicados: para um `np.memmap` o
+    np.asarray devolve um ndarray comum, e o joblib voltaria a copiá-lo
+    para cada worker.
+    """
+    return array if isinstance(array, np.memmap) else np.asarray(array)
+
+def _default_directory(nbytes):
+    # /dev/shm quando existe e cabe; senão o diretório temporário em disco
+    if os.path.isdir("/dev/shm") and shutil.disk_usage("/dev/shm").free >= nbytes * SHM_HEADROOM:
+        return "/dev/shm"
+    return None
+
+@contextmanager
+def shared_arrays(*arrays, directory=None):
+    """
+    Publica arrays uma única vez em arquivos .npy memory-mapped.
+
+    Os arrays retornados são `np.memmap` somente leitura; o joblib envia
+    memmaps aos workers apenas como referência ao arquivo, então cada
+    processo acessa os mesmos dados sem cópia nem pickling. Arrays que já
+    são `np.memmap` são repassados como estão, então publicar de novo
+    dentro de um bloco já publicado não copia nada.
+
+    Por padrão usa `/dev/shm` (memória compartilhada) quando existe e tem
+    espaço livre para os arrays; senão, um diretório temporário em disco.
+    Os arquivos são removidos na saída do bloco `with`.
+    """
+    if directory is None:
+        nbytes = sum(np.asarray(a).nbytes for a in arrays if not isinstance(a, np.memmap))
+        directory = _default_directory(nbytes)
+    tmp_dir = tempfile.mkdtemp(prefix="crisp-shared-", dir=directory)
+    try:
+        views = []
+        for k, array in enumerate(arrays):
+            if isinstance(array, np.memmap):
+                views.append(array)
+                continue
+            path = os.path.join(tmp_dir, f"{k}.npy")
+            np.save(path, np.ascontiguousarray(array))
+            views.append(np.load(path, mmap_mode="r"))
+        yield views
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,145 @@
+import os
+import numpy as np
+import pandas as pd
+from numpy.random import default_rng
+from sklearn.preprocessing import StandardScaler #type:ignore
+
+from . import range_mask, FilterReport
+
+
+# --- Leitura em blocos ---
+def array_chunks(X, y, chunk_size=65536):
+    """Divide arrays/DataFrames (ou memmaps) já carregados em blocos (X, y)."""
+    for start in range(0, len(X), chunk_size):
+        stop = start + chunk_size
+        X_chunk = X.iloc[start:stop] if hasattr(X, "iloc") else X[start:stop]
+        y_chunk = y.iloc[start:stop] if hasattr(y, "iloc") else y[start:stop]
+        yield X_chunk, y_chunk
+
+def csv_chunks(path, target, chunk_size=65536, **read_csv_kwargs):
+    """Lê um CSV em blocos de `chunk_size` linhas, separando a coluna `target`."""
+    for frame in pd.read_csv(path, chunksize=chunk_size, **read_csv_kwargs):
+        yield frame.drop(columns=[target]), frame[target]
+
+
+# --- Pipeline ---
+def _encode(target, codes):
+    # Códigos inteiros dos rótulos do bloco; rótulos novos entram em `codes`
+    inverse, uniques = pd.factorize(target)
+    if (inverse < 0).any():
+        raise ValueError("Target has missing labels.")
+    return np.array([codes.setdefault(label, len(codes)) for label in uniques], dtype=np.int64)[inverse]
+
+def _transform_to_npy(raw_path, output_path, shape, dtype, chunk_size, transform=None):
+    if shape[0] == 0:  # np.memmap não aceita arquivos vazios
+        np.save(output_path, np.empty(shape, dtype=dtype))
+        os.remove(raw_path)
+        return np.load(output_path, mmap_mode="r")
+    raw = np.memmap(raw_path, dtype=dtype, mode="r", shape=shape)
+    out = np.lib.format.open_memmap(output_path, mode="w+", dtype=dtype, shape=shape)
+    for start in range(0, shape[0], chunk_size):
+        stop = start + chunk_size
+        out[start:stop] = transform(raw[start:stop]) if transform is not None else raw[start:stop]
+    out.flush()
+    del raw, out
+    os.remove(raw_path)
+    return np.load(output_path, mmap_mode="r")
+
+def stream_preprocess(chunks, output_dir, min_value=3000, max_value=6000, test_size=0.2,
+                      random_state=None, chunk_size=65536):
+    """
+    Versão em streaming da preparação (filter_range -> split -> StandardScaler).
+
+    Consome um iterável de blocos (X, y) uma única vez: filtra cada bloco
+    pelo range, sorteia as linhas de teste com probabilidade `test_size` e
+    ajusta o scaler incrementalmente (`partial_fit`) apenas com as linhas de
+    treino. As linhas mantidas são gravadas em arquivos brutos e, ao final,
+    padronizadas bloco a bloco em arquivos .npy memory-mapped. O pico de
+    memória depende de `chunk_size`, não do tamanho da gravação.
+
+    Rótulos não numéricos (ex. strings lidas por `csv_chunks`) são gravados
+    como códigos inteiros, com os rótulos originais em 'classes'.
+
+    Parâmetros:
+    - chunks: iterável de (X_chunk, y_chunk), ex. `csv_chunks` ou `array_chunks`
+    - output_dir: diretório onde são gravados X_train.npy, y_train.npy, X_test.npy e y_test.npy
+    - min_value, max_value: limites do range (como em `filter_range`)
+    - test_size: fração esperada de linhas no conjunto de teste
+    - random_state: semente do sorteio treino/teste
+    - chunk_size: tamanho dos blocos na etapa de padronização
+
+    Retorna:
+    - dict com os memmaps 'X_train', 'y_train', 'X_test', 'y_test',
+      o 'scaler' ajustado, o 'report' (FilterReport) da filtragem e
+      'classes': os rótulos em ordem, tais que `classes[y]` recupera o
+      rótulo original (None se o alvo já é numérico)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = default_rng(random_state)
+    scaler = StandardScaler()
+
+    splits = ("train", "test")
+    raw_paths = {
+        split: (os.path.join(output_dir, f"X_{split}.raw"), os.path.join(output_dir, f"y_{split}.raw"))
+        for split in splits
+    }
+    files = {split: (open(px, "wb"), open(py, "wb")) for split, (px, py) in raw_paths.items()}
+    counts = {split: 0 for split in splits}
+    n_input, n_features, y_dtype = 0, None, None
+    codes = None  # rótulo -> código, na ordem de aparição (alvo não numérico)
+
+    try:
+        for X_chunk, y_chunk in chunks:
+            values = np.asarray(X_chunk, dtype=np.float64)
+            target = np.asarray(y_chunk).ravel()
+            if n_features is None:
+                n_features, y_dtype = values.shape[1], target.dtype
+                # Strings/objetos não podem ir para o arquivo bruto como bytes
+                # (object grava ponteiros; U/S têm largura diferente por bloco)
+                if y_dtype.kind in "OUS":
+                    codes, y_dtype = {}, np.dtype(np.int64)
+            n_input += len(values)
+
+            mask = range_mask(values, min_value, max_value)
+            values = values[mask]
+            target = _encode(target[mask], codes) if codes is not None else target[mask].astype(y_dtype)
+            is_test = rng.random(len(values)) < test_size
+
+            for split, rows in (("train", ~is_test), ("test", is_test)):
+                if not rows.any():
+                    continue
+                fx, fy = files[split]
+                fx.write(np.ascontiguousarray(values[rows]).tobytes())
+                fy.write(np.ascontiguousarray(target[rows]).tobytes())
+                counts[split] += int(rows.sum())
+            if (~is_test).any():
+                scaler.partial_fit(values[~is_test])
+    finally:
+        for fx, fy in files.values():
+            fx.close()
+            fy.close()
+
+    if counts["train"] == 0:
+        raise ValueError("No training rows left after range filtering.")
+
+    # Códigos renumerados na ordem dos rótulos (como np.unique/LabelEncoder),
+    # independente da ordem em que apareceram nos blocos
+    classes, recode = None, None
+    if codes is not None:
+        classes = np.array(sorted(codes))
+        recode = np.empty(len(codes), dtype=np.int64)
+        recode[[codes[label] for label in classes.tolist()]] = np.arange(len(codes))
+
+    result = {"scaler": scaler, "classes": classes}
+    for split in splits:
+        raw_x, raw_y = raw_paths[split]
+        result[f"X_{split}"] = _transform_to_npy(
+            raw_x, os.path.join(output_dir, f"X_{split}.npy"),
+            (counts[split], n_features), np.float64, chunk_size, scaler.transform
+        )
+        result[f"y_{split}"] = _transform_to_npy(
+            raw_y, os.path.join(output_dir, f"y_{split}.npy"),
+            (counts[split],), y_dtype, chunk_size, (lambda y: recode[y]) if recode is not None else None
+        )
+    result["report"] = FilterReport(min_value, max_value, n_input, counts["train"] + counts["test"])
+    return result
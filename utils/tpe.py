@@ -0,0 +1,251 @@
+import os
+import numpy as np
+from scipy.stats import rv_discrete #type:ignore
+from sklearn.base import clone #type:ignore
+
+from . import profiling
+from .search import params_key, evaluate_folds
+from .shared import as_array, shared_arrays
+
+
+# --- Estimadores de Parzen por parâmetro ---
+class _Categorical:
+    """Lista de valores: frequências com suavização de Laplace."""
+
+    def __init__(self, values):
+        self.values = list(values)
+
+    def _index(self, value):
+        # Comparação por repr: listas com None, tuplas e números misturados
+        reprs = [repr(v) for v in self.values]
+        return reprs.index(repr(value))
+
+    def prior(self, rng, size):
+        return [self.values[i] for i in rng.integers(len(self.values), size=size)]
+
+    def fit(self, observed):
+        counts = np.ones(len(self.values))
+        for value in observed:
+            counts[self._index(value)] += 1
+        return counts / counts.sum()
+
+    def sample(self, density, rng, size):
+        return [self.values[i] for i in rng.choice(len(self.values), size=size, p=density)]
+
+    def log_pdf(self, density, candidates):
+        return np.log([density[self._index(c)] for c in candidates])
+
+
+class _Numeric:
+    """Distribuição do scipy: KDE gaussiano (em escala log para loguniform)."""
+
+    def __init__(self, dist):
+        self.dist = dist
+        self.log = getattr(dist.dist, 'name', '') in ('loguniform', 'reciprocal')
+        self.discrete = isinstance(dist.dist, rv_discrete)
+        self.low, self.high = dist.support()
+
+    def _to(self, values):
+        values = np.asarray(values, dtype=float)
+        return np.log(values) if self.log else values
+
+    def _from(self, values):
+        values = np.clip(np.exp(values) if self.log else values, self.low, self.high)
+        return [int(round(v)) for v in values] if self.discrete else list(values)
+
+    def prior(self, rng, size):
+        return self._from(self._to(self.dist.rvs(size=size, random_state=rng)))
+
+    def fit(self, observed):
+        points = self._to(observed)
+        # Regra de Scott, com piso para não degenerar quando os pontos coincidem
+        spread = points.std() if len(points) > 1 else 0.0
+        bandwidth = max(1.06 * spread * len(points) ** -0.2, 1e-3 * (abs(points.mean()) + 1e-12))
+        return points, bandwidth
+
+    def sample(self, density, rng, size):
+        points, bandwidth = density
+        centers = points[rng.integers(len(points), size=size)]
+        return self._from(centers + rng.normal(0.0, bandwidth, size=size))
+
+    def log_pdf(self, density, candidates):
+        points, bandwidth = density
+        z = (self._to(candidates)[:, None] - points[None, :]) / bandwidth
+        pdf = np.exp(-0.5 * z ** 2).mean(axis=1) / (bandwidth * np.sqrt(2 * np.pi))
+        return np.log(pdf + 1e-300)
+
+
+def _space(param_distributions):
+    return {
+        name: _Numeric(values) if hasattr(values, 'rvs') else _Categorical(values)
+        for name, values in sorted(param_distributions.items())
+    }
+
+def _grid_size(space):
+    if any(isinstance(dim, _Numeric) for dim in space.values()):
+        return np.inf
+    return int(np.prod([len(dim.values) for dim in space.values()]))
+
+
+# --- Amostrador TPE ---
+class TPESampler:
+    """
+    Tree-structured Parzen Estimator (Bergstra et al., 2011).
+
+    As observações são divididas pelo quantil `gamma` do score (no máximo
+    25 observações) em "boas" e "ruins"; para cada parâmetro são estimadas
+    as densidades l(x) (boas) e g(x) (ruins), e o próximo candidato é,
+    entre `n_ei_candidates` amostras de l(x), o que maximiza l(x)/g(x). Até `n_startup` observações os
+    candidatos são sorteados da priori, como no `ParameterSampler`.
+
+    Para propor vários candidatos de uma vez (`ask(n)`), cada proposta é
+    adicionada ao histórico com o pior score já visto ("constant liar"),
+    o que afasta as propostas seguintes da mesma região.
+
+    Parâmetros são listas (categóricos) ou distribuições do scipy.stats.
+    """
+
+    def __init__(self, param_distributions, n_startup=10, gamma=0.1, n_ei_candidates=24, random_state=None):
+        self.space = _space(param_distributions)
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_ei_candidates = n_ei_candidates
+        self.rng = np.random.default_rng(random_state)
+        self.observations = []  # (params, score)
+        self.seen = set()
+
+    @property
+    def exhausted(self):
+        return len(self.seen) >= _grid_size(self.space)
+
+    def tell(self, params, score):
+        # Falhas (NaN) contam como o pior resultado possível
+        self.observations.append((params, -np.inf if np.isnan(score) else float(score)))
+        self.seen.add(params_key(params))
+
+    def _prior(self):
+        return {name: dim.prior(self.rng, 1)[0] for name, dim in self.space.items()}
+
+    def _propose(self, observations):
+        if len(observations) < self.n_startup:
+            return [self._prior()]
+        scores = np.array([score for _, score in observations])
+        order = np.argsort(-scores, kind='stable')
+        n_good = min(max(1, int(np.ceil(self.gamma * len(observations)))), 25)
+        good = [observations[i][0] for i in order[:n_good]]
+        bad = [observations[i][0] for i in order[n_good:]] or good
+
+        log_ratio = np.zeros(self.n_ei_candidates)
+        candidates = [{} for _ in range(self.n_ei_candidates)]
+        for name, dim in self.space.items():
+            l_density = dim.fit([p[name] for p in good])
+            g_density = dim.fit([p[name] for p in bad])
+            values = dim.sample(l_density, self.rng, self.n_ei_candidates)
+            log_ratio += dim.log_pdf(l_density, values) - dim.log_pdf(g_density, values)
+            for candidate, value in zip(candidates, values):
+                candidate[name] = value
+        return [candidates[i] for i in np.argsort(-log_ratio, kind='stable')]
+
+    def ask(self, n=1):
+        """Propõe até `n` candidatos ainda não avaliados (menos se a grade se esgotar)."""
+        proposals = []
+        observations = list(self.observations)
+        worst = min((score for _, score in observations), default=0.0)
+        for _ in range(n):
+            if self.exhausted:
+                break
+            candidate = None
+            for attempt in range(100):
+                ranked = self._propose(observations) if attempt < 10 else [self._prior()]
+                candidate = next((c for c in ranked if params_key(c) not in self.seen), None)
+                if candidate is not None:
+                    break
+            if candidate is None:
+                break
+            proposals.append(candidate)
+            self.seen.add(params_key(candidate))
+            observations.append((candidate, worst))
+        return proposals
+
+
+# --- Busca ---
+def tpe_search(estimator, param_distributions, X, y, cv, trial_log, search_id='tpe', n_iter=100,
+               batch_size=None, scoring='accuracy', random_state=None, n_jobs=-1, eval_cache=None,
+               n_startup=10, gamma=0.1):
+    """
+    Busca sequencial baseada em modelo (TPE) com validação cruzada.
+
+    A cada rodada o `TPESampler` propõe `batch_size` candidatos a partir dos
+    scores anteriores, e todos os pares (candidato, fold) da rodada rodam em
+    paralelo em um único pool. Por padrão `batch_size` é o suficiente para
+    ocupar todos os núcleos (núcleos / folds).
+
+    Como em `checkpointed_search`, cada fold é gravado no `trial_log` assim
+    que termina. O amostrador é determinístico dado `random_state` e o
+    histórico, então ao retomar as mesmas propostas são refeitas e os
+    folds já gravados para este `search_id` não são reavaliados.
+
+    Retorna:
+    - candidates: lista dos candidatos avaliados, na ordem de proposta
+    - scores: array (n_candidatos, n_folds) com os scores de teste
+    """
+    n_folds = cv.get_n_splits(X, y)
+    if batch_size is None:
+        n_workers = (os.cpu_count() or 1) if n_jobs in (None, -1) else n_jobs
+        batch_size = max(1, -(-n_workers // n_folds))
+
+    sampler = TPESampler(param_distributions, n_startup, gamma, random_state=random_state)
+    # Folds gravados com outro divisor não são observações deste `cv`
+    done = {
+        (r['params_key'], r['fold']): r['score']
+        for r in trial_log.load(search=search_id)
+        if r.get('cv', repr(cv)) == repr(cv)
+    }
+    # Publica X e y uma vez para todas as rodadas (ver `utils.shared`)
+    with shared_arrays(as_array(X), as_array(y).ravel()) as (X, y):
+        candidates = []
+        while len(candidates) < n_iter and not sampler.exhausted:
+            with profiling.span('tpe_ask', cat='search', observations=len(sampler.observations)):
+                batch = sampler.ask(min(batch_size, n_iter - len(candidates)))
+            if not batch:
+                break
+            pending = [
+                (params, fold)
+                for params in batch
+                for fold in range(n_folds)
+                if (params_key(params), fold) not in done
+            ]
+
+            def on_result(i, record):
+                params, fold = pending[i]
+                trial_log.append({
+                    'search': search_id,
+                    'params_key': params_key(params),
+                    'params': params,
+                    'cv': repr(cv),
+                    'scoring': scoring,
+                    'fold': fold,
+                    **record,
+                })
+                done[(params_key(params), fold)] = record['score']
+
+            tasks = [(clone(estimator).set_params(**params), fold) for params, fold in pending]
+            with profiling.span('tpe_round', cat='search', search_id=search_id, candidates=len(batch), folds=len(tasks)):
+                evaluate_folds(tasks, X, y, cv, scoring, eval_cache, n_jobs, on_result)
+
+            for params in batch:
+                fold_scores = [done[(params_key(params), fold)] for fold in range(n_folds)]
+                sampler.tell(params, np.mean(fold_scores))
+            candidates.extend(batch)
+
+    scores = np.array([
+        [done[(params_key(params), fold)] for fold in range(n_folds)]
+        for params in candidates
+    ]).reshape(len(candidates), n_folds)
+    return candidates, scores
+
+def top_candidates(candidates, scores, n=20):
+    """Os `n` candidatos com maior média de score (falhas por último)."""
+    means = np.where(np.isnan(scores).any(axis=1), -np.inf, scores.mean(axis=1))
+    order = np.argsort(-means, kind='stable')[:n]
+    return [candidates[i] for i in order]